@@ -0,0 +1,112 @@
+"""
+Archive-free artifact bundles passed between stages.
+
+A bundle is a small JSON manifest whose members are stored as separate objects:
+
+    {
+      "format": "fave-bundle/1",
+      "members": {
+        "audio.wav": {"uri": "s3://.../media/audio.wav", "size": 1234, "content_type": "audio/wav"},
+        "video.mp4": {"uri": "s3://.../input/original.mp4", "size": null, "content_type": "video/mp4"}
+      },
+      "metadata": {}
+    }
+
+Stages fetch only the members they need, and a member can reference an object
+written by an earlier stage, so passing a file through costs no transfer at all.
+"""
+
+from __future__ import annotations
+
+import mimetypes
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+from storage_helper import download_file, read_json, upload_file, write_json
+
+BUNDLE_FORMAT = "fave-bundle/1"
+
+
+def _content_type(name: str) -> str:
+    return mimetypes.guess_type(name)[0] or "application/octet-stream"
+
+
+def write_bundle(
+    manifest_uri: str,
+    files: Optional[Dict[str, str | Path]] = None,
+    references: Optional[Dict[str, str]] = None,
+    metadata: Optional[Dict[str, Any]] = None,
+) -> str:
+    """
+    Upload local ``files`` next to the manifest and write the manifest itself.
+
+    Members in ``files`` are stored under ``<manifest_uri without .json>/<name>``;
+    ``references`` maps member names to URIs of objects that already exist.
+    """
+    base_uri = manifest_uri[: -len(".json")] if manifest_uri.endswith(".json") else manifest_uri
+    members: Dict[str, Dict[str, Any]] = {}
+
+    for name, uri in (references or {}).items():
+        members[name] = {"uri": uri, "size": None, "content_type": _content_type(name)}
+
+    def _upload(item):
+        name, path = item
+        content_type = _content_type(name)
+        uri = upload_file(path, f"{base_uri}/{name}", extra_args={"ContentType": content_type})
+        return name, {"uri": uri, "size": Path(path).stat().st_size, "content_type": content_type}
+
+    local = list((files or {}).items())
+    if local:
+        with ThreadPoolExecutor(max_workers=min(4, len(local))) as pool:
+            members.update(pool.map(_upload, local))
+
+    manifest = {"format": BUNDLE_FORMAT, "members": members, "metadata": metadata or {}}
+    return write_json(manifest, manifest_uri)
+
+
+def read_bundle(uri: str) -> Dict[str, Any]:
+    """Load and validate a bundle manifest."""
+    manifest = read_json(uri)
+    if manifest.get("format") != BUNDLE_FORMAT:
+        raise ValueError(f"Unsupported bundle format in {uri}: {manifest.get('format')!r}")
+    return manifest
+
+
+def member_uri(bundle: Dict[str, Any], name: str) -> Optional[str]:
+    """Return the object URI of a member, or None if the bundle does not have it."""
+    member = bundle.get("members", {}).get(name)
+    return member["uri"] if member else None
+
+
+def fetch_members(
+    bundle: Dict[str, Any],
+    names: Iterable[str],
+    dest_dir: str | Path,
+    required: bool = True,
+) -> Dict[str, Path]:
+    """
+    Download the named members into ``dest_dir`` concurrently.
+
+    Missing members raise FileNotFoundError when ``required`` is set and are
+    skipped otherwise.
+    """
+    dest = Path(dest_dir)
+    wanted = []
+    for name in names:
+        uri = member_uri(bundle, name)
+        if uri is None:
+            if required:
+                raise FileNotFoundError(f"Bundle has no member '{name}'")
+            continue
+        wanted.append((name, uri))
+
+    if not wanted:
+        return {}
+
+    def _download(item):
+        name, uri = item
+        return name, download_file(uri, dest / name)
+
+    with ThreadPoolExecutor(max_workers=min(4, len(wanted))) as pool:
+        return dict(pool.map(_download, wanted))
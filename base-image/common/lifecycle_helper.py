@@ -0,0 +1,215 @@
+"""
+Garbage collection for per-request artifacts in the shared store.
+
+Every request leaves its input copy, stage bundles, clips and frames under
+``requests/{request_id}/{stage}/``. ``collect_garbage`` walks that prefix with a
+paginated listing, applies a retention rule per stage prefix and removes the
+expired objects with batched DeleteObjects calls. Dry-run mode (the default)
+only reports what would be reclaimed.
+
+Bundles reference objects of earlier stages instead of copying them (a
+stage-deepspeech bundle points at the stage-ffmpeg-1 clip, the stage-ffmpeg-0
+bundle at the input copy), so an object that a retained bundle manifest still
+lists as a member is kept even when its own prefix has expired.
+
+Caches shared across requests (``cache/transcripts/``) live outside that root
+and have no request status; ``collect_cache_garbage`` expires them by age.
+"""
+
+from __future__ import annotations
+
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from bundle_helper import BUNDLE_FORMAT
+from storage_helper import delete_objects, list_objects, object_exists, read_json
+
+ARTIFACT_BUCKET = os.getenv("ARTIFACT_BUCKET", "fave-artifacts")
+TERMINAL_STATUSES = ["COMPLETED", "FAILED"]
+
+# Retention per stage prefix. ``max_age_hours`` expires objects older than the
+# limit; ``expire_on_status`` expires them as soon as the request reaches one of
+# the listed statuses. Prefixes without a rule (or with neither field set) are kept.
+DEFAULT_RETENTION_POLICY: Dict[str, Dict[str, Any]] = {
+    "input": {"max_age_hours": 72, "expire_on_status": ["COMPLETED"]},
+    "stage-ffmpeg-0": {"max_age_hours": 24, "expire_on_status": TERMINAL_STATUSES},
+    "stage-librosa": {"max_age_hours": 24, "expire_on_status": TERMINAL_STATUSES},
+    "stage-ffmpeg-1": {"max_age_hours": 24, "expire_on_status": TERMINAL_STATUSES},
+    "stage-ffmpeg-2": {"max_age_hours": 24, "expire_on_status": TERMINAL_STATUSES},
+    "stage-deepspeech": {"max_age_hours": 168},
+    "stage-ffmpeg-3": {"max_age_hours": 72, "expire_on_status": ["FAILED"]},
+    "stage-object-detector": {"max_age_hours": 168},
+    "metadata": {},
+}
+
+# Age limit per cross-request cache prefix. Cache hits do not rewrite the
+# object, so an entry expires this long after it was first written and the next
+# request for that audio simply misses and re-populates it.
+DEFAULT_CACHE_RETENTION_POLICY: Dict[str, Dict[str, Any]] = {
+    "cache/transcripts/": {"max_age_hours": 720},
+}
+
+
+def _is_expired(
+    obj: Dict[str, Any],
+    rule: Dict[str, Any],
+    status: Optional[str],
+    now: datetime,
+) -> bool:
+    max_age = rule.get("max_age_hours")
+    if max_age is not None:
+        age_hours = (now - obj["LastModified"]).total_seconds() / 3600.0
+        if age_hours >= max_age:
+            return True
+    return status is not None and status in rule.get("expire_on_status", [])
+
+
+def _new_report(bucket: str, root: str, dry_run: bool) -> Dict[str, Any]:
+    return {
+        "bucket": bucket,
+        "root": root,
+        "dry_run": dry_run,
+        "scanned_objects": 0,
+        "expired_objects": 0,
+        "reclaimed_bytes": 0,
+        "deleted_objects": 0,
+        "kept_referenced": 0,
+        "by_prefix": {},
+    }
+
+
+def _count_expired(report: Dict[str, Any], prefix: str, obj: Dict[str, Any]) -> None:
+    size = int(obj.get("Size", 0))
+    entry = report["by_prefix"].setdefault(prefix, {"objects": 0, "bytes": 0})
+    entry["objects"] += 1
+    entry["bytes"] += size
+    report["expired_objects"] += 1
+    report["reclaimed_bytes"] += size
+
+
+def _referenced_uris(bucket: str, objects: Iterable[Dict[str, Any]]) -> Set[str]:
+    """Member URIs listed by the bundle manifests among ``objects``."""
+    referenced: Set[str] = set()
+    for obj in objects:
+        if not obj["Key"].endswith(".json"):
+            continue
+        try:
+            manifest = read_json(f"s3://{bucket}/{obj['Key']}")
+        except Exception:  # pylint: disable=broad-except
+            continue
+        if isinstance(manifest, dict) and manifest.get("format") == BUNDLE_FORMAT:
+            referenced.update(member["uri"] for member in manifest.get("members", {}).values() if member.get("uri"))
+    return referenced
+
+
+def _sweep(report: Dict[str, Any], expired_uris: Iterator[str], batch_size: int) -> Dict[str, Any]:
+    if report["dry_run"]:
+        for _ in expired_uris:
+            pass
+    else:
+        report["deleted_objects"] = delete_objects(expired_uris, batch_size=batch_size)
+    return report
+
+
+def collect_garbage(
+    bucket: str = ARTIFACT_BUCKET,
+    root: str = "requests/",
+    policy: Optional[Dict[str, Dict[str, Any]]] = None,
+    dry_run: bool = True,
+    now: Optional[datetime] = None,
+    batch_size: int = 1000,
+) -> Dict[str, Any]:
+    """
+    Expire request artifacts according to ``policy`` and return a report.
+
+    The listing is processed one request at a time (keys are listed in order,
+    so a request's objects are contiguous): expired objects still referenced by
+    one of that request's retained bundle manifests are kept and counted in
+    ``kept_referenced``. Deletes are batched as the listing proceeds, so memory
+    is bounded by the largest request rather than the bucket. The report
+    contains the number of scanned/expired objects and the reclaimed bytes, in
+    total and per stage prefix.
+    """
+    policy = DEFAULT_RETENTION_POLICY if policy is None else policy
+    now = now or datetime.now(timezone.utc)
+    status_cache: Dict[str, Optional[str]] = {}
+
+    report = _new_report(bucket, root, dry_run)
+
+    def _request_status(request_id: str) -> Optional[str]:
+        if request_id not in status_cache:
+            uri = f"s3://{bucket}/{root}{request_id}/metadata/state.json"
+            status_cache[request_id] = read_json(uri).get("status") if object_exists(uri) else None
+        return status_cache[request_id]
+
+    def _requests() -> Iterator[Tuple[str, List[Tuple[str, Dict[str, Any]]]]]:
+        current, objects = None, []
+        for obj in list_objects(f"s3://{bucket}/{root}", max_keys=None):
+            report["scanned_objects"] += 1
+            parts = obj["Key"][len(root):].split("/")
+            if len(parts) < 3:
+                continue
+            if parts[0] != current and objects:
+                yield current, objects
+                objects = []
+            current = parts[0]
+            objects.append((parts[1], obj))
+        if objects:
+            yield current, objects
+
+    def _expired_uris() -> Iterator[str]:
+        for request_id, objects in _requests():
+            expired, retained = [], []
+            for prefix, obj in objects:
+                rule = policy.get(prefix)
+                status = _request_status(request_id) if rule and rule.get("expire_on_status") else None
+                if rule and _is_expired(obj, rule, status, now):
+                    expired.append((prefix, obj))
+                else:
+                    retained.append(obj)
+            if not expired:
+                continue
+
+            referenced = _referenced_uris(bucket, retained)
+            for prefix, obj in expired:
+                uri = f"s3://{bucket}/{obj['Key']}"
+                if uri in referenced:
+                    report["kept_referenced"] += 1
+                    continue
+                _count_expired(report, prefix, obj)
+                yield uri
+
+    return _sweep(report, _expired_uris(), batch_size)
+
+
+def collect_cache_garbage(
+    bucket: str = ARTIFACT_BUCKET,
+    policy: Optional[Dict[str, Dict[str, Any]]] = None,
+    dry_run: bool = True,
+    now: Optional[datetime] = None,
+    batch_size: int = 1000,
+) -> Dict[str, Any]:
+    """
+    Expire cross-request cache entries older than each prefix's ``max_age_hours``.
+
+    ``policy`` maps a key prefix (``cache/transcripts/``) to a rule; only
+    ``max_age_hours`` applies, since cache entries belong to no request. The
+    report has the same shape as ``collect_garbage``'s, keyed by cache prefix.
+    """
+    policy = DEFAULT_CACHE_RETENTION_POLICY if policy is None else policy
+    now = now or datetime.now(timezone.utc)
+    report = _new_report(bucket, ",".join(policy), dry_run)
+
+    def _expired_uris() -> Iterator[str]:
+        for prefix, rule in policy.items():
+            if rule.get("max_age_hours") is None:
+                continue
+            for obj in list_objects(f"s3://{bucket}/{prefix}", max_keys=None):
+                report["scanned_objects"] += 1
+                if _is_expired(obj, rule, None, now):
+                    _count_expired(report, prefix, obj)
+                    yield f"s3://{bucket}/{obj['Key']}"
+
+    return _sweep(report, _expired_uris(), batch_size)
+
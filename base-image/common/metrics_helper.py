@@ -6,7 +6,7 @@ import os
 import time
 from contextlib import contextmanager
 from pathlib import Path
-from typing import Iterator
+from typing import Iterator, Optional
 
 
 def get_memory_limit_mb(default: int = 512) -> int:
@@ -32,6 +32,36 @@ def get_memory_limit_mb(default: int = 512) -> int:
     return default
 
 
+def get_cpu_limit(default: Optional[float] = None) -> float:
+    """
+    Best-effort detection of the CPU quota available to the container, in cores.
+
+    ``CPU_LIMIT`` overrides; otherwise cgroup v2 ``cpu.max`` ("<quota> <period>")
+    is used, then the CPUs this process may run on, then ``default``.
+    """
+    env_limit = os.getenv("CPU_LIMIT")
+    if env_limit:
+        try:
+            return max(0.01, float(env_limit))
+        except ValueError:
+            pass
+
+    cgroup_path = "/sys/fs/cgroup/cpu.max"
+    if os.path.exists(cgroup_path):
+        parts = Path(cgroup_path).read_text().split()
+        if len(parts) == 2 and parts[0] != "max":
+            try:
+                return max(0.01, int(parts[0]) / int(parts[1]))
+            except (ValueError, ZeroDivisionError):
+                pass
+
+    try:
+        return float(len(os.sched_getaffinity(0)))
+    except AttributeError:
+        pass
+    return float(default if default is not None else (os.cpu_count() or 1))
+
+
 def compute_cost_unit(duration_ms: int, memory_limit_mb: int) -> float:
     """Return the cost proxy defined as duration (s) * memory (GB)."""
     return (duration_ms / 1000.0) * (memory_limit_mb / 1024.0)
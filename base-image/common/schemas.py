@@ -25,6 +25,8 @@ class StagePayload(BaseModel):
     request_id: str
     stage: str
     input_uri: str
+    # Batch-capable stages process every URI here (input_uri is then the first one).
+    input_uris: List[str] = Field(default_factory=list)
     output_hint: Optional[str] = None
     config: Dict[str, Any] = Field(default_factory=dict)
     fanout: Dict[str, Any] = Field(default_factory=dict)
@@ -9,11 +9,11 @@ from __future__ import annotations
 
 import json
 import os
-import tempfile
 import io
+from concurrent.futures import ThreadPoolExecutor
 from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Iterable, Optional, Tuple
+from typing import Dict, Iterable, List, Optional, Tuple
 from urllib.parse import urlparse
 
 import boto3
@@ -21,6 +21,11 @@ from botocore.client import Config
 from botocore.exceptions import ClientError
 
 DEFAULT_BUCKET = os.getenv("ARTIFACT_BUCKET")
+# Part size for multipart copies; S3 requires at least 5 MiB for all but the last part.
+MULTIPART_PART_BYTES = max(5, int(os.getenv("ARTIFACT_MULTIPART_MB", "64"))) * 1024 * 1024
+MULTIPART_CONCURRENCY = int(os.getenv("ARTIFACT_MULTIPART_CONCURRENCY", "4"))
+# Reconnect options so long HTTP reads survive transient MinIO hiccups.
+HTTP_INPUT_ARGS = ["-reconnect", "1", "-reconnect_delay_max", "5"]
 
 
 def _parse_s3_uri(uri: str) -> Tuple[str, str]:
@@ -56,9 +61,7 @@ def _parse_s3_uri(uri: str) -> Tuple[str, str]:
 
 @lru_cache(maxsize=1)
 def _s3_client():
-    """
-    Lazily instantiate a boto3 S3 client configured for MinIO/S3 usage.
-    """
+    """Lazily instantiate a boto3 S3 client configured for MinIO/S3 usage."""
     session = boto3.session.Session()
     endpoint = os.getenv("ARTIFACT_ENDPOINT")
     region = os.getenv("ARTIFACT_REGION", "us-east-1")
@@ -75,6 +78,51 @@ def _s3_client():
     )
 
 
+def _normalize_endpoint(endpoint: str) -> str:
+    parsed = urlparse(endpoint.strip())
+    if parsed.scheme.lower() not in {"http", "https"} or not parsed.netloc:
+        raise ValueError(f"Invalid source endpoint '{endpoint}'")
+    return f"{parsed.scheme.lower()}://{parsed.netloc.lower()}"
+
+
+def source_endpoints() -> Dict[str, str]:
+    """
+    Allow-list of foreign S3 endpoints inputs may be read from.
+
+    Read from SOURCE_ENDPOINTS as comma-separated ``name=url`` pairs and
+    returned as {normalized url: name}. Each name has its own credentials in
+    SOURCE_<NAME>_ACCESS_KEY / SOURCE_<NAME>_SECRET_KEY (and optionally
+    SOURCE_<NAME>_REGION); the artifact store's keys are never sent there.
+    """
+    allowed: Dict[str, str] = {}
+    for entry in os.getenv("SOURCE_ENDPOINTS", "").split(","):
+        name, sep, url = entry.partition("=")
+        if sep and name.strip() and url.strip():
+            allowed[_normalize_endpoint(url)] = name.strip()
+    return allowed
+
+
+@lru_cache(maxsize=4)
+def _source_client(endpoint: str):
+    """Client for an allow-listed source endpoint, signed with that endpoint's own credentials."""
+    name = source_endpoints().get(_normalize_endpoint(endpoint))
+    if name is None:
+        raise ValueError(f"Source endpoint '{endpoint}' is not in SOURCE_ENDPOINTS")
+    env_prefix = f"SOURCE_{name.upper().replace('-', '_')}_"
+    access_key = os.getenv(f"{env_prefix}ACCESS_KEY")
+    secret_key = os.getenv(f"{env_prefix}SECRET_KEY")
+    if not access_key or not secret_key:
+        raise ValueError(f"No credentials configured for source endpoint '{name}' ({env_prefix}ACCESS_KEY/SECRET_KEY)")
+    return boto3.session.Session().client(
+        "s3",
+        endpoint_url=_normalize_endpoint(endpoint),
+        region_name=os.getenv(f"{env_prefix}REGION", "us-east-1"),
+        aws_access_key_id=access_key,
+        aws_secret_access_key=secret_key,
+        config=Config(signature_version="s3v4"),
+    )
+
+
 def download_file(uri: str, destination: str | Path) -> Path:
     """Download an object to the specified path."""
     bucket, key = _parse_s3_uri(uri)
@@ -91,15 +139,93 @@ def upload_file(source: str | Path, uri: str, extra_args: Optional[Dict] = None)
     return f"s3://{bucket}/{key}"
 
 
-def list_objects(prefix: str, max_keys: int = 1000) -> Iterable[Dict]:
-    """Iterate over objects under the specified prefix."""
+def presigned_url(uri: str, expires_in: int = 3600) -> str:
+    """
+    Return a presigned HTTP GET URL for the object.
+
+    Tools such as ffmpeg can read the URL directly (with range requests for
+    seeking) instead of waiting for a full download to /tmp.
+    """
+    bucket, key = _parse_s3_uri(uri)
+    return _s3_client().generate_presigned_url(
+        "get_object",
+        Params={"Bucket": bucket, "Key": key},
+        ExpiresIn=expires_in,
+    )
+
+
+def stream_inputs_enabled() -> bool:
+    """Whether media stages read inputs over presigned URLs (``STREAM_INPUTS``) instead of downloading them."""
+    return os.getenv("STREAM_INPUTS", "false").lower() in {"1", "true", "yes"}
+
+
+def media_source(uri: str, dest: str | Path, stream: bool) -> str:
+    """
+    Source ffmpeg should read ``uri`` from.
+
+    With ``stream`` this is a presigned URL, so seeks become range requests and
+    only the bytes needed are fetched; otherwise the object is downloaded to
+    ``dest`` and the local path is returned.
+    """
+    if stream:
+        return presigned_url(uri)
+    return str(download_file(uri, dest))
+
+
+def ffmpeg_input_args(source: str) -> List[str]:
+    """``-i`` arguments for ``source``, with reconnect options for HTTP URLs."""
+    if source.startswith(("http://", "https://")):
+        return HTTP_INPUT_ARGS + ["-i", source]
+    return ["-i", source]
+
+
+def list_objects(prefix: str, max_keys: Optional[int] = 1000, page_size: int = 1000) -> Iterable[Dict]:
+    """
+    Iterate over objects under the specified prefix.
+
+    Pages are fetched lazily; pass max_keys=None to walk the whole prefix.
+    """
     bucket, key_prefix = _parse_s3_uri(prefix)
     paginator = _s3_client().get_paginator("list_objects_v2")
-    for page in paginator.paginate(Bucket=bucket, Prefix=key_prefix, PaginationConfig={"MaxItems": max_keys}):
+    pagination = {"PageSize": page_size}
+    if max_keys is not None:
+        pagination["MaxItems"] = max_keys
+    for page in paginator.paginate(Bucket=bucket, Prefix=key_prefix, PaginationConfig=pagination):
         for obj in page.get("Contents", []):
             yield obj
 
 
+def delete_objects(uris: Iterable[str], batch_size: int = 1000) -> int:
+    """
+    Delete objects using batched DeleteObjects calls (max 1000 keys per call).
+
+    Returns the number of keys the store reported as deleted.
+    """
+    batch_size = max(1, min(batch_size, 1000))
+    pending: Dict[str, list] = {}
+    deleted = 0
+
+    def _flush(bucket: str) -> int:
+        keys = pending.pop(bucket, [])
+        if not keys:
+            return 0
+        resp = _s3_client().delete_objects(
+            Bucket=bucket,
+            Delete={"Objects": [{"Key": key} for key in keys], "Quiet": True},
+        )
+        return len(keys) - len(resp.get("Errors", []))
+
+    for uri in uris:
+        bucket, key = _parse_s3_uri(uri)
+        pending.setdefault(bucket, []).append(key)
+        if len(pending[bucket]) >= batch_size:
+            deleted += _flush(bucket)
+
+    for bucket in list(pending):
+        deleted += _flush(bucket)
+    return deleted
+
+
 def object_exists(uri: str) -> bool:
     """Return True if the object exists."""
     bucket, key = _parse_s3_uri(uri)
@@ -127,22 +253,132 @@ def write_json(data: Dict, uri: str) -> str:
     return f"s3://{bucket}/{key}"
 
 
-def copy_object(source_uri: str, dest_uri: str) -> str:
+def copy_object(
+    source_uri: str,
+    dest_uri: str,
+    source_endpoint: Optional[str] = None,
+    part_size: int = MULTIPART_PART_BYTES,
+) -> str:
     """
-    Copy an object between URIs. Falls back to download/upload if cross-bucket copy fails.
+    Copy an object between URIs.
+
+    Same-endpoint copies stay server-side (multipart UploadPartCopy for objects
+    larger than ``part_size``). If that fails, or the source lives on another
+    endpoint, the GET body is streamed into a multipart upload with at most a
+    couple of parts buffered in memory; nothing touches the local disk.
+
+    ``source_endpoint`` must be on the SOURCE_ENDPOINTS allow-list and is read
+    with its own credentials (see ``source_endpoints``); anything else raises
+    ValueError before a request is sent.
     """
     src_bucket, src_key = _parse_s3_uri(source_uri)
     dst_bucket, dst_key = _parse_s3_uri(dest_uri)
+    # Resolve the source first so a rejected endpoint fails before any copy starts.
+    src_client = _source_client(source_endpoint) if source_endpoint else None
     client = _s3_client()
-    try:
-        client.copy({"Bucket": src_bucket, "Key": src_key}, dst_bucket, dst_key)
-    except ClientError:
-        with tempfile.NamedTemporaryFile(delete=False) as tmp:
-            tmp_path = Path(tmp.name)
+    if source_endpoint is None:
         try:
-            client.download_file(src_bucket, src_key, str(tmp_path))
-            client.upload_file(str(tmp_path), dst_bucket, dst_key)
-        finally:
-            if tmp_path.exists():
-                tmp_path.unlink()
+            _server_side_copy(client, src_bucket, src_key, dst_bucket, dst_key, part_size)
+            return f"s3://{dst_bucket}/{dst_key}"
+        except ClientError:
+            pass
+    _streamed_copy(src_client or client, src_bucket, src_key, client, dst_bucket, dst_key, part_size)
     return f"s3://{dst_bucket}/{dst_key}"
+
+
+def _server_side_copy(client, src_bucket: str, src_key: str, dst_bucket: str, dst_key: str, part_size: int) -> None:
+    source = {"Bucket": src_bucket, "Key": src_key}
+    head = client.head_object(Bucket=src_bucket, Key=src_key)
+    size = head["ContentLength"]
+    if size <= part_size:
+        client.copy_object(CopySource=source, Bucket=dst_bucket, Key=dst_key)
+        return
+
+    upload_id = client.create_multipart_upload(
+        Bucket=dst_bucket,
+        Key=dst_key,
+        ContentType=head.get("ContentType", "binary/octet-stream"),
+    )["UploadId"]
+
+    def _copy_part(part_number: int) -> Dict:
+        start = (part_number - 1) * part_size
+        end = min(start + part_size, size) - 1
+        resp = client.upload_part_copy(
+            Bucket=dst_bucket,
+            Key=dst_key,
+            UploadId=upload_id,
+            PartNumber=part_number,
+            CopySource=source,
+            CopySourceRange=f"bytes={start}-{end}",
+        )
+        return {"PartNumber": part_number, "ETag": resp["CopyPartResult"]["ETag"]}
+
+    part_count = (size + part_size - 1) // part_size
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, MULTIPART_CONCURRENCY)) as pool:
+            parts = list(pool.map(_copy_part, range(1, part_count + 1)))
+        client.complete_multipart_upload(
+            Bucket=dst_bucket, Key=dst_key, UploadId=upload_id, MultipartUpload={"Parts": parts}
+        )
+    except Exception:
+        client.abort_multipart_upload(Bucket=dst_bucket, Key=dst_key, UploadId=upload_id)
+        raise
+
+
+def _read_part(body, part_size: int) -> bytes:
+    """Read up to part_size bytes, looping because stream reads may return short."""
+    chunks: List[bytes] = []
+    remaining = part_size
+    while remaining > 0:
+        chunk = body.read(remaining)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+
+def _streamed_copy(
+    src_client, src_bucket: str, src_key: str, dst_client, dst_bucket: str, dst_key: str, part_size: int
+) -> None:
+    obj = src_client.get_object(Bucket=src_bucket, Key=src_key)
+    body = obj["Body"]
+    content_type = obj.get("ContentType", "binary/octet-stream")
+
+    first = _read_part(body, part_size)
+    if len(first) < part_size:
+        dst_client.put_object(Bucket=dst_bucket, Key=dst_key, Body=first, ContentType=content_type)
+        return
+
+    upload_id = dst_client.create_multipart_upload(
+        Bucket=dst_bucket, Key=dst_key, ContentType=content_type
+    )["UploadId"]
+
+    def _upload_part(part_number: int, data: bytes) -> Dict:
+        resp = dst_client.upload_part(
+            Bucket=dst_bucket, Key=dst_key, UploadId=upload_id, PartNumber=part_number, Body=data
+        )
+        return {"PartNumber": part_number, "ETag": resp["ETag"]}
+
+    try:
+        parts: List[Dict] = []
+        # One part uploads while the next is read from the source stream, so at
+        # most two parts are held in memory.
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            data, part_number, in_flight = first, 1, None
+            while data:
+                future = pool.submit(_upload_part, part_number, data)
+                if in_flight is not None:
+                    parts.append(in_flight.result())
+                in_flight = future
+                part_number += 1
+                data = _read_part(body, part_size)
+            parts.append(in_flight.result())
+        dst_client.complete_multipart_upload(
+            Bucket=dst_bucket, Key=dst_key, UploadId=upload_id, MultipartUpload={"Parts": parts}
+        )
+    except Exception:
+        dst_client.abort_multipart_upload(Bucket=dst_bucket, Key=dst_key, UploadId=upload_id)
+        raise
+    finally:
+        body.close()
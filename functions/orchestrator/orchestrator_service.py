@@ -38,6 +38,8 @@ class OrchestratorService:
             "stage-deepspeech",
             "stage-ffmpeg-3",
         ]
+        # > 1 transcribes clips in batches of this size with one stage-deepspeech call each.
+        self.deepspeech_batch_size = int(os.getenv("DEEPSPEECH_BATCH_SIZE", "0"))
         self.memory_limit_mb = get_memory_limit_mb()
 
     def handle(self, raw_body: str) -> Dict[str, Any]:
@@ -63,7 +65,9 @@ class OrchestratorService:
         save_state(request_id, state)
 
         try:
-            input_uri = self._ensure_input_artifact(req.video_uri, request_id)
+            input_uri = self._ensure_input_artifact(
+                req.video_uri, request_id, source_endpoint=req.metadata.get("source_endpoint")
+            )
             update_state(request_id, input_uri=input_uri)
             
             with stage_timer() as elapsed:
@@ -85,10 +89,12 @@ class OrchestratorService:
             update_state(request_id, status="FAILED", error=str(exc))
             return {"status": "error", "request_id": request_id, "message": str(exc)}
 
-    def _ensure_input_artifact(self, source_uri: str, request_id: str) -> str:
+    def _ensure_input_artifact(self, source_uri: str, request_id: str, source_endpoint: Optional[str] = None) -> str:
         """
         Copy or upload the input video under the request namespace.
         Supports S3 URIs, HTTP URLs, or local filesystem paths.
+        S3 sources on another service can be read via ``metadata.source_endpoint``
+        if it is on the SOURCE_ENDPOINTS allow-list (see ``storage_helper.source_endpoints``).
         """
         parsed = urlparse(source_uri)
         suffix = Path(parsed.path).suffix or ".mp4"
@@ -97,7 +103,7 @@ class OrchestratorService:
         log_event("orchestrator", "import_input", request_id=request_id, source=source_uri, target=target_uri)
 
         if parsed.scheme in {"s3", "s3a", "s3n"}:
-            copy_object(source_uri, target_uri)
+            copy_object(source_uri, target_uri, source_endpoint=source_endpoint)
             return target_uri
 
         if parsed.scheme in {"http", "https"}:
@@ -137,6 +143,10 @@ class OrchestratorService:
         initial_results.append(self._summarize_result(ffmpeg1_result))
         clip_refs = ffmpeg1_result.outputs
 
+        if self.deepspeech_batch_size > 1:
+            clip_results = self._run_clips_batched(clip_refs, request_id, req.profile, is_dry_run)
+            return {"linear": initial_results, "clips": clip_results}
+
         clip_results: List[Dict[str, Any]] = []
         for idx, clip_ref in enumerate(clip_refs):
             clip_uri = clip_ref.uri
@@ -151,35 +161,9 @@ class OrchestratorService:
             res_ds = self._execute_stage("stage-deepspeech", uri_ds_in, request_id, req.profile, {"clip_index": idx}, is_dry_run)
             clip_stage_entries.append(self._summarize_result(res_ds, extra={"clip_index": idx}))
             
-            # 3. Frame Sampling (ffmpeg-3)
+            # 3-4. Frame Sampling (ffmpeg-3) and Object Detection
             uri_ff3_in = self._next_input_uri(res_ds, uri_ds_in)
-            res_ff3 = self._execute_stage("stage-ffmpeg-3", uri_ff3_in, request_id, req.profile, {"clip_index": idx}, is_dry_run)
-            clip_stage_entries.append(self._summarize_result(res_ff3, extra={"clip_index": idx}))
-            
-            # 4. Object Detection (per frame)
-            frame_refs = res_ff3.outputs
-            if self.enable_object_detector and frame_refs:
-                for f_idx, frame_ref in enumerate(frame_refs):
-                    # frame_ref.metadata might contain "frame_index"
-                    frame_meta = frame_ref.metadata or {}
-                    fanout_info = {
-                        "clip_index": idx,
-                        "frame_index": frame_meta.get("frame_index", f_idx),
-                        "frame_uri": frame_ref.uri,
-                    }
-                    
-                    od_result = self._execute_stage(
-                        "stage-object-detector",
-                        frame_ref.uri,
-                        request_id,
-                        req.profile,
-                        fanout_info,
-                        is_dry_run,
-                    )
-                    clip_stage_entries.append(self._summarize_result(od_result, extra=fanout_info))
-            elif not self.enable_object_detector:
-                od_result = self._object_detector_stub(request_id, idx)
-                clip_stage_entries.append(self._summarize_result(od_result, extra={"clip_index": idx}))
+            self._run_frame_stages(idx, uri_ff3_in, request_id, req.profile, is_dry_run, clip_stage_entries)
 
             clip_results.append(
                 {
@@ -191,6 +175,134 @@ class OrchestratorService:
 
         return {"linear": initial_results, "clips": clip_results}
 
+    def _run_clips_batched(
+        self, clip_refs: List[ArtifactRef], request_id: str, profile: str, is_dry_run: bool
+    ) -> List[Dict[str, Any]]:
+        """
+        Clip pipeline with batched transcription.
+
+        ffmpeg-2 runs for every clip first, then stage-deepspeech gets
+        ``deepspeech_batch_size`` clip bundles per call, then frame sampling and
+        detection continue per clip with that clip's transcript bundle.
+        """
+        entries: List[List[Dict[str, Any]]] = [[] for _ in clip_refs]
+        ds_inputs: List[str] = []
+        for idx, clip_ref in enumerate(clip_refs):
+            res_ffmpeg2 = self._execute_stage("stage-ffmpeg-2", clip_ref.uri, request_id, profile, {"clip_index": idx}, is_dry_run)
+            entries[idx].append(self._summarize_result(res_ffmpeg2, extra={"clip_index": idx}))
+            ds_inputs.append(self._next_input_uri(res_ffmpeg2, clip_ref.uri))
+
+        ff3_inputs = list(ds_inputs)
+        for start in range(0, len(ds_inputs), self.deepspeech_batch_size):
+            indices = list(range(start, min(start + self.deepspeech_batch_size, len(ds_inputs))))
+            batch_uris = [ds_inputs[idx] for idx in indices]
+            res_ds = self._execute_stage(
+                "stage-deepspeech",
+                batch_uris[0],
+                request_id,
+                profile,
+                {"clip_indices": indices},
+                is_dry_run,
+                input_uris=batch_uris,
+            )
+            # Outputs come back one per input, in order.
+            per_clip = len(res_ds.outputs) == len(indices)
+            shares = self._split_batch_metrics(res_ds.metrics.model_dump(), len(indices))
+            for position, idx in enumerate(indices):
+                clip_outputs = [res_ds.outputs[position]] if per_clip else []
+                if clip_outputs:
+                    ff3_inputs[idx] = clip_outputs[0].uri
+                summary = self._summarize_result(res_ds, extra={"clip_index": idx, "batch_clip_indices": indices})
+                summary["outputs"] = [output.model_dump() for output in clip_outputs]
+                summary["metrics"] = shares[position]
+                entries[idx].append(summary)
+
+        for idx in range(len(clip_refs)):
+            self._run_frame_stages(idx, ff3_inputs[idx], request_id, profile, is_dry_run, entries[idx])
+
+        return [
+            {"clip_index": idx, "input_uri": clip_ref.uri, "stages": entries[idx]}
+            for idx, clip_ref in enumerate(clip_refs)
+        ]
+
+    @staticmethod
+    def _split_batch_metrics(metrics: Dict[str, Any], parts: int) -> List[Dict[str, Any]]:
+        """
+        Divide one batch call's duration_ms and cost_unit evenly over its clips.
+
+        Each clip entry carries its share, so summing cost_unit over clip
+        entries counts the batch once; the shares add up exactly to the batch
+        totals, which are kept in ``extra`` alongside the batch size.
+        """
+        duration_ms = metrics["duration_ms"]
+        cost_unit = metrics.get("cost_unit")
+        shares = []
+        for position in range(parts):
+            share = dict(metrics)
+            share["extra"] = {
+                **metrics.get("extra", {}),
+                "batch_size": parts,
+                "batch_duration_ms": duration_ms,
+                "batch_cost_unit": cost_unit,
+            }
+            # Integer milliseconds: the first clips absorb the remainder.
+            share["duration_ms"] = duration_ms // parts + (1 if position < duration_ms % parts else 0)
+            if cost_unit is not None:
+                # The last share takes the rounding residue so the sum is exact.
+                share["cost_unit"] = (
+                    cost_unit / parts if position < parts - 1 else cost_unit - (cost_unit / parts) * (parts - 1)
+                )
+            shares.append(share)
+        return shares
+
+    def _run_frame_stages(
+        self,
+        idx: int,
+        uri_ff3_in: str,
+        request_id: str,
+        profile: str,
+        is_dry_run: bool,
+        clip_stage_entries: List[Dict[str, Any]],
+    ) -> None:
+        # 3. Frame Sampling (ffmpeg-3)
+        res_ff3 = self._execute_stage("stage-ffmpeg-3", uri_ff3_in, request_id, profile, {"clip_index": idx}, is_dry_run)
+        clip_stage_entries.append(self._summarize_result(res_ff3, extra={"clip_index": idx}))
+        
+        # 4. Object Detection (per frame, or per clip for tensor packs)
+        frame_refs = res_ff3.outputs
+        if self.enable_object_detector and frame_refs:
+            for f_idx, frame_ref in enumerate(frame_refs):
+                # frame_ref.metadata might contain "frame_index"
+                frame_meta = frame_ref.metadata or {}
+                if frame_ref.type == "tensor_pack":
+                    # One detector call covers every frame in the pack.
+                    fanout_info = {
+                        "clip_index": idx,
+                        "frame_pack": frame_ref.uri,
+                        "frames": frame_meta.get("frames"),
+                    }
+                else:
+                    fanout_info = {
+                        "clip_index": idx,
+                        "frame_index": frame_meta.get("frame_index", f_idx),
+                        "frame_uri": frame_ref.uri,
+                    }
+                    if frame_meta.get("pts_time") is not None:
+                        fanout_info["pts_time"] = frame_meta["pts_time"]
+                
+                od_result = self._execute_stage(
+                    "stage-object-detector",
+                    frame_ref.uri,
+                    request_id,
+                    profile,
+                    fanout_info,
+                    is_dry_run,
+                )
+                clip_stage_entries.append(self._summarize_result(od_result, extra=fanout_info))
+        elif not self.enable_object_detector:
+            od_result = self._object_detector_stub(request_id, idx)
+            clip_stage_entries.append(self._summarize_result(od_result, extra={"clip_index": idx}))
+
     def _execute_stage(
         self,
         stage_name: str,
@@ -199,11 +311,13 @@ class OrchestratorService:
         profile: str,
         fanout: Dict[str, Any],
         is_dry_run: bool,
+        input_uris: Optional[List[str]] = None,
     ) -> StageResult:
         payload = StagePayload(
             request_id=request_id,
             stage=stage_name,
             input_uri=input_uri,
+            input_uris=input_uris or [],
             config={"profile": profile},
             fanout=fanout,
         )
@@ -275,15 +389,18 @@ class OrchestratorService:
             "cold_start": False,
             "cost_unit": compute_cost_unit(duration_ms, self.memory_limit_mb),
         }
-        fake_output = ArtifactRef(
-            type="reference",
-            uri=f"s3://{self.bucket}/requests/{payload.request_id}/{payload.stage}/placeholder.txt",
-            metadata={},
-        )
+        fake_outputs = [
+            ArtifactRef(
+                type="reference",
+                uri=f"s3://{self.bucket}/requests/{payload.request_id}/{payload.stage}/placeholder.txt",
+                metadata={},
+            )
+            for _ in (payload.input_uris or [payload.input_uri])
+        ]
         return StageResult(
             request_id=payload.request_id,
             stage=payload.stage,
-            outputs=[fake_output],
+            outputs=fake_outputs,
             metrics=metrics,
             status="simulated",
             message="Stage simulation placeholder",
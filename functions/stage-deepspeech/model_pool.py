@@ -0,0 +1,83 @@
+"""
+In-process pool of DeepSpeech models shared by threads.
+
+Building a ``deepspeech.Model`` and attaching the external scorer loads close
+to 1 GB from disk, so models are created lazily on first use and reused by
+every later invocation. A model instance must not be used by two threads at
+once; the pool hands each caller its own instance and creates at most ``size``
+of them, so concurrent requests in one pod wait for a free model instead of
+loading another copy. All models live in the function's single Python
+process: there is no worker process per model and no isolation between them.
+"""
+
+from __future__ import annotations
+
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional
+
+
+def load_deepspeech_model(model_path: str, scorer_path: Optional[str]) -> Any:
+    import deepspeech
+
+    model = deepspeech.Model(model_path)
+    if scorer_path:
+        model.enableExternalScorer(scorer_path)
+    return model
+
+
+class ModelPool:
+    """Bounded, lazily filled pool of models shared across threads."""
+
+    def __init__(
+        self,
+        model_path: str,
+        scorer_path: Optional[str],
+        size: int = 1,
+        loader: Callable[[str, Optional[str]], Any] = load_deepspeech_model,
+    ) -> None:
+        self.model_path = model_path
+        self.scorer_path = scorer_path
+        self.size = max(1, size)
+        self._loader = loader
+        self._idle: "queue.Queue[Any]" = queue.Queue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    @property
+    def created(self) -> int:
+        return self._created
+
+    @contextmanager
+    def acquire(self) -> Iterator[Any]:
+        """Borrow a model, loading a new one only while the pool is below ``size``."""
+        model = self._take()
+        try:
+            yield model
+        finally:
+            self._idle.put(model)
+
+    def _take(self) -> Any:
+        while True:
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                pass
+            with self._lock:
+                grow = self._created < self.size
+                if grow:
+                    self._created += 1
+            if grow:
+                try:
+                    return self._loader(self.model_path, self.scorer_path)
+                except BaseException:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            # Pool is full: wait for a model to come back, re-checking capacity
+            # periodically in case a concurrent load failed and freed a slot.
+            try:
+                return self._idle.get(timeout=1.0)
+            except queue.Empty:
+                continue
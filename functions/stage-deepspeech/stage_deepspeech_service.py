@@ -4,24 +4,52 @@ import json
 import os
 import subprocess
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import List
 
+from bundle_helper import fetch_members, member_uri, read_bundle, write_bundle
 from logging_helper import log_event, log_exception
 from metrics_helper import compute_cost_unit, get_memory_limit_mb, stage_timer
+from model_pool import ModelPool
 from schemas import ArtifactRef, StagePayload, StageResult
-from storage_helper import download_file, upload_file
+from transcript_cache import TranscriptCache
+from transcription import ChunkWorkers, chunk_bounds, open_pcm16, transcribe
 
 STAGE_NAME = "stage-deepspeech"
 COLD_START = True
 
 
 class StageDeepSpeechService:
-    """Runs Mozilla DeepSpeech on the provided clip archive."""
+    """Runs Mozilla DeepSpeech on the provided clip bundle."""
 
     def __init__(self) -> None:
         self.bucket = os.getenv("ARTIFACT_BUCKET", "fave-artifacts")
         self.model_path = os.getenv("DEEPSPEECH_MODEL", "/opt/models/deepspeech-0.9.3-models.pbmm")
         self.scorer_path = os.getenv("DEEPSPEECH_SCORER", "/opt/models/deepspeech-0.9.3-models.scorer")
+        # Models are loaded on first use and reused; one instance per concurrent transcription.
+        self.model_pool = ModelPool(
+            self.model_path, self.scorer_path, size=int(os.getenv("DEEPSPEECH_POOL_SIZE", "1"))
+        )
+        # > 0 splits clips into ~N second chunks; with TRANSCRIBE_WORKERS > 1 they are
+        # transcribed by that many worker processes, each loading its own model.
+        self.chunk_seconds = float(os.getenv("TRANSCRIBE_CHUNK_SECONDS", "0"))
+        self.transcribe_workers = int(os.getenv("TRANSCRIBE_WORKERS", "1"))
+        self.chunk_workers = None
+        if self.chunk_seconds > 0 and self.transcribe_workers > 1:
+            self.chunk_workers = ChunkWorkers(self.model_path, self.scorer_path, self.transcribe_workers)
+        # Clips of a batch payload handled at once; downloads and uploads overlap
+        # while inference is bounded by the model pool.
+        self.batch_concurrency = max(1, int(os.getenv("BATCH_CONCURRENCY", "4")))
+        self.transcript_cache = None
+        if os.getenv("TRANSCRIPT_CACHE", "true").lower() in {"1", "true", "yes"}:
+            self.transcript_cache = TranscriptCache(
+                self.bucket,
+                self.model_path,
+                self.scorer_path,
+                max_entries=int(os.getenv("TRANSCRIPT_CACHE_ENTRIES", "256")),
+                variant=f"chunk={self.chunk_seconds}",
+            )
         self.memory_limit_mb = get_memory_limit_mb()
 
     def handle(self, raw_body: str) -> dict:
@@ -32,7 +60,10 @@ class StageDeepSpeechService:
             return {"status": "error", "message": str(exc)}
 
         with stage_timer() as elapsed:
-            output_uri = self._process(payload)
+            if payload.input_uris:
+                outputs = self._process_batch(payload)
+            else:
+                outputs = [ArtifactRef(type="bundle", uri=self._process(payload), metadata={})]
 
         duration_ms = elapsed()
         metrics = {
@@ -45,7 +76,7 @@ class StageDeepSpeechService:
         result = StageResult(
             request_id=payload.request_id,
             stage=payload.stage,
-            outputs=[ArtifactRef(type="archive", uri=output_uri, metadata={})],
+            outputs=outputs,
             metrics=metrics,
             status="success",
         )
@@ -55,43 +86,52 @@ class StageDeepSpeechService:
         log_event(STAGE_NAME, "start", request_id=payload.request_id, input_uri=payload.input_uri)
         with tempfile.TemporaryDirectory() as tmp_dir:
             tmp_path = Path(tmp_dir)
-            archive_path = tmp_path / "clip_bundle.tar.gz"
-            download_file(payload.input_uri, archive_path)
-
-            self._run_tar(["-xzf", str(archive_path)], cwd=tmp_path)
-
-            audio_path = tmp_path / "clip.wav"
-            video_path = tmp_path / "clip_compressed.mp4"
+            bundle = read_bundle(payload.input_uri)
+            audio_path = fetch_members(bundle, ["clip.wav"], tmp_path, required=False).get(
+                "clip.wav", tmp_path / "clip.wav"
+            )
             transcript_path = tmp_path / "transcript.txt"
 
             self._run_deepspeech(audio_path, transcript_path)
 
-            # Ensure video exists for packaging; if not (e.g. extraction quirk or fallback), try to use the one from input
-            if not video_path.exists():
-                candidates = list(tmp_path.glob("*.mp4"))
-                if candidates:
-                    video_path = candidates[0]
-                else:
-                    # Create a dummy 1-second black video to prevent downstream crash
-                    log_event(STAGE_NAME, "warning", message="No video found, generating dummy black clip")
-                    dummy_video = tmp_path / "dummy_black.mp4"
-                    self._run_ffmpeg_dummy(dummy_video)
-                    video_path = dummy_video
-
-            output_archive = tmp_path / "transcript_bundle.tar.gz"
-            self._run_tar(
-                ["-czf", str(output_archive), transcript_path.name, video_path.name],
-                cwd=tmp_path,
-            )
+            # The video is passed through by reference; prefer the compressed clip and
+            # fall back to whatever mp4 the bundle carries.
+            video_name = "clip_compressed.mp4"
+            if member_uri(bundle, video_name) is None:
+                candidates = sorted(name for name in bundle["members"] if name.endswith(".mp4"))
+                video_name = candidates[0] if candidates else None
+
+            files = {transcript_path.name: transcript_path}
+            references = {}
+            if video_name is not None:
+                references[video_name] = member_uri(bundle, video_name)
+            else:
+                # Create a dummy 1-second black video to prevent downstream crash
+                log_event(STAGE_NAME, "warning", message="No video found, generating dummy black clip")
+                dummy_video = tmp_path / "dummy_black.mp4"
+                self._run_ffmpeg_dummy(dummy_video)
+                files[dummy_video.name] = dummy_video
 
             clip_name = Path(payload.input_uri).stem
-            output_uri = (
-                f"s3://{self.bucket}/requests/{payload.request_id}/{payload.stage}/{clip_name}.tar.gz"
+            output_uri = write_bundle(
+                f"s3://{self.bucket}/requests/{payload.request_id}/{payload.stage}/{clip_name}.json",
+                files=files,
+                references=references,
             )
-            upload_file(output_archive, output_uri, extra_args={"ContentType": "application/gzip"})
             log_event(STAGE_NAME, "completed", request_id=payload.request_id, output_uri=output_uri)
             return output_uri
 
+    def _process_batch(self, payload: StagePayload) -> List[ArtifactRef]:
+        """Transcribe every bundle in ``payload.input_uris``; one output per clip, in order."""
+        log_event(STAGE_NAME, "batch_start", request_id=payload.request_id, clips=len(payload.input_uris))
+        clip_payloads = [payload.model_copy(update={"input_uri": uri, "input_uris": []}) for uri in payload.input_uris]
+        with ThreadPoolExecutor(max_workers=min(self.batch_concurrency, len(clip_payloads))) as pool:
+            output_uris = list(pool.map(self._process, clip_payloads))
+        return [
+            ArtifactRef(type="bundle", uri=output_uri, metadata={"input_uri": clip.input_uri, "batch_index": idx})
+            for idx, (clip, output_uri) in enumerate(zip(clip_payloads, output_uris))
+        ]
+
     def _run_deepspeech(self, audio_path: Path, transcript_path: Path) -> None:
         try:
             # First check if audio file exists
@@ -101,21 +141,20 @@ class StageDeepSpeechService:
                 transcript_path.write_text(f"Dummy transcript: {msg}\n")
                 return
 
-            import deepspeech
-            import numpy as np
-            import wave
-
-            ds = deepspeech.Model(self.model_path)
-            ds.enableExternalScorer(self.scorer_path)
-
-            with wave.open(str(audio_path), "rb") as wf:
-                if wf.getframerate() != 16000 or wf.getnchannels() != 1:
-                    raise ValueError("Audio must be 16kHz mono before deepspeech stage")
-                frames = wf.getnframes()
-                buffer = wf.readframes(frames)
-                audio = np.frombuffer(buffer, dtype=np.int16)
-
-            text = ds.stt(audio)
+            audio, sample_rate, channels = open_pcm16(audio_path)
+            if sample_rate != 16000 or channels != 1:
+                raise ValueError("Audio must be 16kHz mono before deepspeech stage")
+
+            cache_key = self.transcript_cache.key(audio) if self.transcript_cache else None
+            text = self.transcript_cache.get(cache_key) if cache_key else None
+            if text is not None:
+                log_event(STAGE_NAME, "transcript_cache_hit", key=cache_key)
+            else:
+                bounds = chunk_bounds(audio, sample_rate, self.chunk_seconds)
+                text = transcribe(audio_path, audio, bounds, self.model_pool, self.chunk_workers)
+                if cache_key:
+                    self.transcript_cache.put(cache_key, text)
+            del audio
             transcript_path.write_text(text.strip() + "\n")
             
         except (ImportError, Exception) as exc:
@@ -132,10 +171,6 @@ class StageDeepSpeechService:
         ]
         subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
 
-    @staticmethod
-    def _run_tar(args, cwd: Path):
-        subprocess.run(["tar"] + args, check=True, cwd=str(cwd), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-
     def _is_cold_start(self) -> bool:
         global COLD_START  # pylint: disable=global-statement
         if COLD_START:
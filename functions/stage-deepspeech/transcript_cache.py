@@ -0,0 +1,94 @@
+"""
+Transcript cache keyed by audio fingerprint.
+
+The key is the SHA-256 of the model and scorer identity (file name, size and
+mtime, plus transcription settings) followed by the raw 16 kHz PCM samples,
+so identical audio transcribed by the same model maps to the same entry across
+requests and videos. Entries live in the artifact store under
+``cache/transcripts/<key>.json`` with a small in-process LRU in front. The
+cache is best-effort: failed reads count as misses and failed writes are
+logged and ignored.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+
+from logging_helper import log_event
+from storage_helper import read_json, write_json
+
+STAGE_NAME = "stage-deepspeech"
+
+
+def _file_identity(path: Optional[str]) -> str:
+    if not path:
+        return "none"
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return f"{os.path.basename(path)}:missing"
+    return f"{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+class TranscriptCache:
+    """Artifact-store transcript cache with an in-memory LRU in front."""
+
+    def __init__(
+        self,
+        bucket: str,
+        model_path: str,
+        scorer_path: Optional[str],
+        max_entries: int = 256,
+        prefix: str = "cache/transcripts/",
+        variant: str = "",
+    ) -> None:
+        self.bucket = bucket
+        self.prefix = prefix
+        self.max_entries = max(0, max_entries)
+        # ``variant`` covers settings that change the output for the same model.
+        self.model_identity = f"{_file_identity(model_path)}|{_file_identity(scorer_path)}|{variant}"
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def key(self, samples: np.ndarray) -> str:
+        digest = hashlib.sha256(self.model_identity.encode("utf-8"))
+        digest.update(np.ascontiguousarray(samples, dtype="<i2"))
+        return digest.hexdigest()
+
+    def uri(self, key: str) -> str:
+        return f"s3://{self.bucket}/{self.prefix}{key}.json"
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        try:
+            transcript = read_json(self.uri(key))["transcript"]
+        except Exception:  # pylint: disable=broad-except
+            # Missing object (the usual miss) or an unreachable store.
+            return None
+        self._remember(key, transcript)
+        return transcript
+
+    def put(self, key: str, transcript: str) -> None:
+        self._remember(key, transcript)
+        try:
+            write_json({"transcript": transcript, "model": self.model_identity}, self.uri(key))
+        except Exception as exc:  # pylint: disable=broad-except
+            log_event(STAGE_NAME, "warning", message=f"Transcript cache write failed: {exc}")
+
+    def _remember(self, key: str, transcript: str) -> None:
+        if self.max_entries == 0:
+            return
+        with self._lock:
+            self._entries[key] = transcript
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
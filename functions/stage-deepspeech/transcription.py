@@ -0,0 +1,195 @@
+"""
+Chunked DeepSpeech transcription.
+
+The clip's PCM samples are memory-mapped straight from the WAV ``data`` chunk
+instead of being copied out with ``wave.readframes``. Long clips are cut at
+the quietest 20 ms frame near every ``chunk_seconds`` mark, the chunks are
+transcribed in parallel and the texts are joined in their original order.
+
+The fan-out uses worker processes (``ChunkWorkers``), not threads. DeepSpeech's
+Python bindings are generated by SWIG without ``-threads``, so ``Model.stt``
+keeps the GIL for the whole call and threads would transcribe one chunk at a
+time while pinning a pool model each. Every worker process loads its own model
+once and memory-maps the WAV itself, so only the chunk bounds and the texts
+cross the process boundary. Each worker costs a full model in memory.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import struct
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Any, Callable, List, Optional, Tuple
+
+import numpy as np
+
+from model_pool import ModelPool, load_deepspeech_model
+
+ANALYSIS_FRAME_SECONDS = 0.02
+
+
+def open_pcm16(path: str | Path) -> Tuple[np.ndarray, int, int]:
+    """
+    Memory-map the samples of a 16-bit PCM WAV file.
+
+    Walks the RIFF chunk list to find ``fmt `` and ``data`` and returns
+    (samples, sample_rate, channels); ``samples`` is a read-only int16 memmap.
+    """
+    path = Path(path)
+    file_size = path.stat().st_size
+    fmt = None
+    with path.open("rb") as fp:
+        riff, _, wave_id = struct.unpack("<4sI4s", fp.read(12))
+        if riff != b"RIFF" or wave_id != b"WAVE":
+            raise ValueError(f"{path} is not a RIFF/WAVE file")
+        while True:
+            header = fp.read(8)
+            if len(header) < 8:
+                raise ValueError(f"{path} has no data chunk")
+            chunk_id, chunk_size = struct.unpack("<4sI", header)
+            if chunk_id == b"fmt ":
+                fmt = struct.unpack("<HHIIHH", fp.read(16))
+                fp.seek(chunk_size - 16 + (chunk_size & 1), 1)
+            elif chunk_id == b"data":
+                data_offset = fp.tell()
+                # Streamed WAVs may carry a placeholder size; trust the file length.
+                data_size = min(chunk_size, file_size - data_offset)
+                break
+            else:
+                fp.seek(chunk_size + (chunk_size & 1), 1)
+
+    if fmt is None:
+        raise ValueError(f"{path} has no fmt chunk")
+    audio_format, channels, sample_rate, _, _, bits_per_sample = fmt
+    if audio_format not in (1, 0xFFFE) or bits_per_sample != 16:
+        raise ValueError(f"{path} is not 16-bit PCM")
+    n_samples = data_size // 2
+    if n_samples == 0:
+        return np.zeros(0, dtype=np.int16), sample_rate, channels
+    samples = np.memmap(path, dtype="<i2", mode="r", offset=data_offset, shape=(n_samples,))
+    return samples, sample_rate, channels
+
+
+def chunk_bounds(
+    samples: np.ndarray,
+    sample_rate: int,
+    chunk_seconds: float,
+    search_seconds: float = 2.0,
+) -> List[Tuple[int, int]]:
+    """
+    Split ``samples`` into chunks of about ``chunk_seconds``.
+
+    Each cut is placed at the lowest-energy 20 ms frame within
+    ``search_seconds`` before or after its nominal position, so words are
+    rarely split between chunks.
+    """
+    n = samples.shape[0]
+    chunk = int(chunk_seconds * sample_rate)
+    if chunk <= 0 or n <= chunk * 1.5:
+        return [(0, n)]
+
+    frame = max(1, int(ANALYSIS_FRAME_SECONDS * sample_rate))
+    search = int(search_seconds * sample_rate)
+    cuts = [0]
+    while n - cuts[-1] > chunk * 1.5:
+        nominal = cuts[-1] + chunk
+        lo = max(cuts[-1] + frame, nominal - search)
+        hi = min(n - frame, nominal + search)
+        n_frames = (hi - lo) // frame
+        if n_frames <= 0:
+            cuts.append(nominal)
+            continue
+        window = np.asarray(samples[lo:lo + n_frames * frame], dtype=np.float32).reshape(n_frames, frame)
+        energy = np.einsum("ij,ij->i", window, window)
+        cuts.append(lo + int(np.argmin(energy)) * frame + frame // 2)
+    cuts.append(n)
+    return list(zip(cuts[:-1], cuts[1:]))
+
+
+# Set in each worker process by ``_load_worker_model``.
+_worker_model: Any = None
+
+
+def _load_worker_model(model_path: str, scorer_path: Optional[str], loader: Callable) -> None:
+    global _worker_model  # pylint: disable=global-statement
+    _worker_model = loader(model_path, scorer_path)
+
+
+def _worker_stt(wav_path: str, start: int, end: int) -> str:
+    samples, _, _ = open_pcm16(wav_path)
+    return _worker_model.stt(np.ascontiguousarray(samples[start:end])).strip()
+
+
+class ChunkWorkers:
+    """Long-lived worker processes, one model each, for transcribing chunks in parallel."""
+
+    def __init__(
+        self,
+        model_path: str,
+        scorer_path: Optional[str],
+        workers: int,
+        loader: Callable[[str, Optional[str]], Any] = load_deepspeech_model,
+    ) -> None:
+        self.model_path = model_path
+        self.scorer_path = scorer_path
+        self.workers = max(1, workers)
+        self._loader = loader
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn, not fork: the service forks from a threaded process.
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_load_worker_model,
+                    initargs=(self.model_path, self.scorer_path, self._loader),
+                )
+            return self._executor
+
+    def map(self, wav_path: str | Path, bounds: List[Tuple[int, int]]) -> List[str]:
+        executor = self._get_executor()
+        starts, ends = zip(*bounds)
+        try:
+            return list(executor.map(_worker_stt, [str(wav_path)] * len(bounds), starts, ends))
+        except BrokenProcessPool:
+            # A worker died (or its model failed to load); start fresh next time.
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+            executor.shutdown(wait=False)
+            raise
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+
+
+def transcribe(
+    wav_path: str | Path,
+    samples: np.ndarray,
+    bounds: List[Tuple[int, int]],
+    pool: ModelPool,
+    workers: Optional[ChunkWorkers] = None,
+) -> str:
+    """
+    Transcribe each chunk and join the texts in order.
+
+    Several chunks go to ``workers`` when given; a single chunk, or no
+    workers, runs in this process with a model from ``pool``.
+    """
+    if len(bounds) > 1 and workers is not None:
+        texts = workers.map(wav_path, bounds)
+    else:
+        texts = []
+        for start, end in bounds:
+            with pool.acquire() as model:
+                texts.append(model.stt(np.ascontiguousarray(samples[start:end])).strip())
+    return " ".join(text for text in texts if text)
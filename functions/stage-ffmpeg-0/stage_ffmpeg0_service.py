@@ -2,27 +2,31 @@ from __future__ import annotations
 
 import json
 import os
-import shutil
 import subprocess
 import sys
 import tempfile
 from pathlib import Path
 from typing import Any, Dict
 
+from bundle_helper import write_bundle
 from logging_helper import log_event, log_exception
 from metrics_helper import compute_cost_unit, get_memory_limit_mb, stage_timer
 from schemas import ArtifactRef, StagePayload, StageResult
-from storage_helper import download_file, upload_file
+from storage_helper import ffmpeg_input_args, media_source, stream_inputs_enabled
 
 STAGE_NAME = "stage-ffmpeg-0"
 COLD_START = True
 
 
 class StageFFmpeg0Service:
-    """Implements the ffmpeg-0 stage (audio extraction + media archive packaging)."""
+    """Implements the ffmpeg-0 stage (audio extraction + media bundle)."""
 
     def __init__(self) -> None:
         self.bucket = os.getenv("ARTIFACT_BUCKET", "fave-artifacts")
+        self.stream_inputs = stream_inputs_enabled()
+        # Emit audio in the format stage-librosa analyses (mono PCM at this rate) so it
+        # can skip resampling; 0 keeps the source rate and channel layout.
+        self.audio_sample_rate = int(os.getenv("AUDIO_SAMPLE_RATE", "22050"))
         self.memory_limit_mb = get_memory_limit_mb()
 
     def handle(self, raw_body: str) -> Dict[str, Any]:
@@ -43,7 +47,7 @@ class StageFFmpeg0Service:
             "cost_unit": compute_cost_unit(duration_ms, self.memory_limit_mb),
         }
         log_event(STAGE_NAME, "metrics", request_id=payload.request_id, **metrics)
-        outputs = [ArtifactRef(type="archive", uri=result_uri, metadata={})]
+        outputs = [ArtifactRef(type="bundle", uri=result_uri, metadata={})]
         stage_result = StageResult(
             request_id=payload.request_id,
             stage=payload.stage,
@@ -54,48 +58,48 @@ class StageFFmpeg0Service:
         return json.loads(stage_result.model_dump_json())
 
     def _process(self, payload: StagePayload) -> str:
-        """Download the video, split audio, package artifacts, and upload the archive."""
+        """Extract the audio and publish it in a bundle that references the input video."""
         log_event(STAGE_NAME, "start", request_id=payload.request_id, input_uri=payload.input_uri)
         with tempfile.TemporaryDirectory() as tmp_dir:
             tmp_path = Path(tmp_dir)
-            video_path = tmp_path / "input_video"
-            download_file(payload.input_uri, video_path)
-
             audio_path = tmp_path / "audio.wav"
-            video_copy = tmp_path / "video.mp4"
-            shutil.copy(video_path, video_copy)
+
+            # The orchestrator already stored the video under requests/{id}/input/, so
+            # only the audio is produced here and the video is passed on by reference.
+            source = media_source(payload.input_uri, tmp_path / "input_video", self.stream_inputs)
+            source_args = ffmpeg_input_args(source)
 
             # Try to extract audio if it exists. map 0:a? makes it optional but ffmpeg 
             # still fails if it is the ONLY output stream and it is empty.
             # We use check=False to handle the missing audio stream case.
-            self._run_ffmpeg(["-i", str(video_path), "-map", "0:a?", str(audio_path)], check=False)
+            self._run_ffmpeg(source_args + ["-map", "0:a?"] + self._audio_format_args() + [str(audio_path)], check=False)
 
             # Ensure audio.wav exists even if silent (placeholder)
             if not audio_path.exists() or audio_path.stat().st_size == 0:
                 if audio_path.exists(): audio_path.unlink()
                 sys.stderr.write("WARNING: No audio found, creating dummy silent wav\n")
-                self._run_ffmpeg(["-f", "lavfi", "-i", "anullsrc=r=16000:cl=mono", "-t", "1", str(audio_path)])
-
+                silent_rate = self.audio_sample_rate or 16000
+                self._run_ffmpeg(["-f", "lavfi", "-i", f"anullsrc=r={silent_rate}:cl=mono", "-t", "1", str(audio_path)])
 
 
-            archive_path = tmp_path / "media.tar.gz"
-            self._run_tar(archive_path, ["video.mp4", "audio.wav"], cwd=tmp_path)
 
-            output_uri = (
-                f"s3://{self.bucket}/requests/{payload.request_id}/{payload.stage}/media.tar.gz"
+            output_uri = write_bundle(
+                f"s3://{self.bucket}/requests/{payload.request_id}/{payload.stage}/media.json",
+                files={"audio.wav": audio_path},
+                references={"video.mp4": payload.input_uri},
             )
-            upload_file(archive_path, output_uri, extra_args={"ContentType": "application/gzip"})
             log_event(STAGE_NAME, "completed", request_id=payload.request_id, output_uri=output_uri)
             return output_uri
 
+    def _audio_format_args(self):
+        if not self.audio_sample_rate:
+            return []
+        return ["-ac", "1", "-ar", str(self.audio_sample_rate), "-c:a", "pcm_s16le"]
+
     def _run_ffmpeg(self, args, check=True):
         cmd = ["ffmpeg", "-y"] + args
         subprocess.run(cmd, check=check, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
 
-    def _run_tar(self, archive_path: Path, members, cwd: Path):
-        cmd = ["tar", "-czf", str(archive_path)] + members
-        subprocess.run(cmd, check=True, cwd=str(cwd), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-
     def _is_cold_start(self) -> bool:
         global COLD_START  # pylint: disable=global-statement
         if COLD_START:
@@ -4,16 +4,27 @@ import json
 import os
 import subprocess
 import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, List
+from typing import Iterator, List, Tuple
 
+from bundle_helper import fetch_members, member_uri, read_bundle
 from logging_helper import log_event, log_exception
 from metrics_helper import compute_cost_unit, get_memory_limit_mb, stage_timer
 from schemas import ArtifactRef, StagePayload, StageResult
-from storage_helper import download_file, upload_file
+from storage_helper import ffmpeg_input_args, media_source, stream_inputs_enabled, upload_file
 
 STAGE_NAME = "stage-ffmpeg-1"
 COLD_START = True
+# Clip boundaries closer than this are treated as the same instant.
+CONTIGUITY_TOLERANCE_S = 0.001
+# Last bytes of ffmpeg's log kept for a failed segment run.
+STDERR_TAIL_BYTES = 4096
+
+
+class SegmentCountMismatch(RuntimeError):
+    """The segment muxer produced a different number of clips than timestamps.txt has lines."""
 
 
 class StageFFmpeg1Service:
@@ -21,6 +32,12 @@ class StageFFmpeg1Service:
 
     def __init__(self) -> None:
         self.bucket = os.getenv("ARTIFACT_BUCKET", "fave-artifacts")
+        self.stream_inputs = stream_inputs_enabled()
+        # "per_clip": one run per line; "segment": one run with the segment muxer,
+        # falling back to per_clip when its keyframe-aligned cuts lose clips.
+        self.cut_mode = os.getenv("CUT_MODE", "per_clip").lower()
+        # Clips are uploaded by this many threads while ffmpeg keeps cutting.
+        self.upload_concurrency = max(1, int(os.getenv("UPLOAD_CONCURRENCY", "4")))
         self.memory_limit_mb = get_memory_limit_mb()
 
     def handle(self, raw_body: str) -> dict:
@@ -54,34 +71,128 @@ class StageFFmpeg1Service:
         log_event(STAGE_NAME, "start", request_id=payload.request_id, input_uri=payload.input_uri)
         with tempfile.TemporaryDirectory() as tmp_dir:
             tmp_path = Path(tmp_dir)
-            archive_path = tmp_path / "segments.tar.gz"
-            download_file(payload.input_uri, archive_path)
-            self._run_tar(["-xzf", str(archive_path)], cwd=tmp_path)
+            bundle = read_bundle(payload.input_uri)
+            timestamps_path = fetch_members(bundle, ["timestamps.txt"], tmp_path)["timestamps.txt"]
 
-            timestamps_path = tmp_path / "timestamps.txt"
-            video_path = tmp_path / "video.mp4"
+            video_uri = member_uri(bundle, "video.mp4")
+            if video_uri is None:
+                raise FileNotFoundError("Bundle has no member 'video.mp4'")
+            # When streaming, each -ss seek turns into HTTP range requests, so only
+            # the bytes a clip needs are fetched.
+            video_source = media_source(video_uri, tmp_path / "video.mp4", self.stream_inputs)
 
             with timestamps_path.open() as fp:
-                lines = [line.strip() for line in fp if line.strip()]
-
-            outputs: List[ArtifactRef] = []
-            for idx, line in enumerate(lines):
-                start_ts, end_ts = line.split()
-                clip_name = f"clip_{idx:03d}.mp4"
-                clip_path = tmp_path / clip_name
-                cmd = ["ffmpeg", "-y", "-ss", start_ts, "-to", end_ts, "-i", str(video_path), "-c", "copy", str(clip_path)]
-                subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-
-                uri = f"s3://{self.bucket}/requests/{payload.request_id}/{payload.stage}/{clip_name}"
-                upload_file(clip_path, uri, extra_args={"ContentType": "video/mp4"})
-                outputs.append(ArtifactRef(type="video", uri=uri, metadata={"clip_index": idx}))
+                spans = [tuple(line.split()) for line in fp if line.strip()]
+
+            if self.cut_mode == "segment" and self._is_contiguous(spans):
+                try:
+                    outputs = self._upload_clips(self._cut_segments(video_source, spans, tmp_path), payload)
+                except SegmentCountMismatch as exc:
+                    # clip_index must match the timestamps.txt line, so re-cut every clip
+                    # (overwriting any already uploaded) rather than shift attribution.
+                    log_event(STAGE_NAME, "warning", request_id=payload.request_id, message=f"{exc}; cutting per clip")
+                    outputs = self._upload_clips(self._cut_per_clip(video_source, spans, tmp_path), payload)
+            else:
+                outputs = self._upload_clips(self._cut_per_clip(video_source, spans, tmp_path), payload)
 
             log_event(STAGE_NAME, "completed", request_id=payload.request_id, clips=len(outputs))
             return outputs
 
-    def _run_tar(self, args, cwd: Path):
-        cmd = ["tar"] + args
-        subprocess.run(cmd, check=True, cwd=str(cwd), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    def _upload_clips(self, clip_paths: Iterator[Path], payload: StagePayload) -> List[ArtifactRef]:
+        """
+        Upload clips as the cutter produces them.
+
+        At most ``2 * upload_concurrency`` clips are queued or in flight; the
+        cutter blocks beyond that, so local disk use stays bounded while cutting
+        and uploading overlap. Each clip is deleted once it has been uploaded.
+        """
+        slots = threading.BoundedSemaphore(2 * self.upload_concurrency)
+
+        def _upload(clip_path: Path) -> str:
+            try:
+                uri = f"s3://{self.bucket}/requests/{payload.request_id}/{payload.stage}/{clip_path.name}"
+                upload_file(clip_path, uri, extra_args={"ContentType": "video/mp4"})
+                clip_path.unlink(missing_ok=True)
+                return uri
+            finally:
+                slots.release()
+
+        futures: List[Future] = []
+        with ThreadPoolExecutor(max_workers=self.upload_concurrency) as pool:
+            for clip_path in clip_paths:
+                slots.acquire()
+                futures.append(pool.submit(_upload, clip_path))
+            uris = [future.result() for future in futures]
+        return [ArtifactRef(type="video", uri=uri, metadata={"clip_index": idx}) for idx, uri in enumerate(uris)]
+
+    def _cut_per_clip(self, video_source: str, spans: List[Tuple[str, str]], tmp_path: Path) -> Iterator[Path]:
+        for idx, (start_ts, end_ts) in enumerate(spans):
+            clip_path = tmp_path / f"clip_{idx:03d}.mp4"
+            cmd = ["ffmpeg", "-y", "-ss", start_ts, "-to", end_ts] + ffmpeg_input_args(video_source) + ["-c", "copy", str(clip_path)]
+            subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            yield clip_path
+
+    def _cut_segments(self, video_source: str, spans: List[Tuple[str, str]], tmp_path: Path) -> Iterator[Path]:
+        """
+        Cut every clip in one demux pass with the segment muxer.
+
+        The muxer writes a CSV line to stdout as soon as each segment file is
+        closed, so finished clips are yielded while later ones are still being
+        cut. With stream copy the muxer can only split on keyframes, so each
+        clip starts at the first keyframe at or after its timestamp (per-clip
+        -ss seeks back to the previous one instead). Cut points that share a
+        GOP collapse into one clip; that raises SegmentCountMismatch so the
+        caller can fall back to per-clip cutting.
+        """
+        cut_times = ",".join(f"{self._to_seconds(end):.3f}" for _, end in spans[:-1])
+        cmd = ["ffmpeg", "-y"] + ffmpeg_input_args(video_source) + ["-to", spans[-1][1], "-c", "copy", "-f", "segment"]
+        if cut_times:
+            cmd += ["-segment_times", cut_times]
+        cmd += [
+            "-reset_timestamps", "1",
+            "-segment_list", "pipe:1", "-segment_list_type", "csv",
+            str(tmp_path / "clip_%03d.mp4"),
+        ]
+        produced = 0
+        # stderr goes to a file: nobody drains a pipe while stdout is being read.
+        log_path = tmp_path / "segment.log"
+        with log_path.open("wb") as log_fp, \
+             subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=log_fp, text=True) as proc:
+            for line in proc.stdout:
+                if not line.strip():
+                    continue
+                produced += 1
+                if produced > len(spans):
+                    proc.kill()
+                    raise SegmentCountMismatch(f"segment muxer produced more than {len(spans)} clips")
+                yield tmp_path / Path(line.split(",", 1)[0]).name
+        if proc.returncode != 0:
+            with log_path.open("rb") as log_fp:
+                log_fp.seek(max(0, log_path.stat().st_size - STDERR_TAIL_BYTES))
+                stderr_tail = log_fp.read().decode("utf-8", "replace")
+            log_event(STAGE_NAME, "error", message="segment muxer failed", returncode=proc.returncode, stderr=stderr_tail)
+            raise subprocess.CalledProcessError(proc.returncode, cmd, stderr=stderr_tail)
+        if produced != len(spans):
+            raise SegmentCountMismatch(f"segment muxer produced {produced} clips for {len(spans)} timestamps")
+
+    @classmethod
+    def _is_contiguous(cls, spans: List[Tuple[str, str]]) -> bool:
+        """True when clips start at 0 and each one starts where the previous ended."""
+        if not spans:
+            return False
+        previous_end = 0.0
+        for start_ts, end_ts in spans:
+            if abs(cls._to_seconds(start_ts) - previous_end) > CONTIGUITY_TOLERANCE_S:
+                return False
+            previous_end = cls._to_seconds(end_ts)
+        return True
+
+    @staticmethod
+    def _to_seconds(timestamp: str) -> float:
+        seconds = 0.0
+        for part in timestamp.split(":"):
+            seconds = seconds * 60 + float(part)
+        return seconds
 
     def _is_cold_start(self) -> bool:
         global COLD_START  # pylint: disable=global-statement
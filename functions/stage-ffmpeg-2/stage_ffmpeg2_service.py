@@ -1,18 +1,33 @@
 from __future__ import annotations
 
 import json
+import math
 import os
 import subprocess
 import tempfile
 from pathlib import Path
+from typing import Any, Dict, List, Optional
 
+from bundle_helper import write_bundle
 from logging_helper import log_event, log_exception
-from metrics_helper import compute_cost_unit, get_memory_limit_mb, stage_timer
+from metrics_helper import compute_cost_unit, get_cpu_limit, get_memory_limit_mb, stage_timer
 from schemas import ArtifactRef, StagePayload, StageResult
-from storage_helper import download_file, upload_file
+from storage_helper import ffmpeg_input_args, media_source, stream_inputs_enabled
 
 STAGE_NAME = "stage-ffmpeg-2"
 COLD_START = True
+SPEECH_AUDIO_ARGS = ["-vn", "-ar", "16000", "-ac", "1"]
+# Per request profile (payload.config["profile"]). The compressed video only
+# feeds frame sampling, so unless a profile sets encode_video the stage emits
+# audio only and frame sampling reads the clip cut by stage-ffmpeg-1. Profiles
+# that encode carry the libx264 settings; threads=None means one per available
+# CPU and max_height (optional) caps the output height. Every other request
+# profile ("fast", the orchestrator's "default", ...) resolves to "balanced".
+ENCODING_PROFILES: Dict[str, Dict[str, Any]] = {
+    "balanced": {"encode_video": False},
+    "archival": {"encode_video": True, "preset": "slow", "crf": 23, "max_height": None, "threads": None},
+}
+DEFAULT_ENCODING_PROFILE = "balanced"
 
 
 class StageFFmpeg2Service:
@@ -20,7 +35,14 @@ class StageFFmpeg2Service:
 
     def __init__(self) -> None:
         self.bucket = os.getenv("ARTIFACT_BUCKET", "fave-artifacts")
+        self.stream_inputs = stream_inputs_enabled()
+        # "fused": one ffmpeg run writes both outputs; "multi_pass": the original three runs.
+        self.transcode_mode = os.getenv("TRANSCODE_MODE", "fused").lower()
+        # Add the source clip to the bundle by reference (also per request via config).
+        self.bundle_source_clip = os.getenv("BUNDLE_SOURCE_CLIP", "false").lower() in {"1", "true", "yes"}
         self.memory_limit_mb = get_memory_limit_mb()
+        # x264 sizes its thread pool from the host's cores, not the container quota.
+        self.encoder_threads = max(1, math.ceil(get_cpu_limit()))
 
     def handle(self, raw_body: str) -> dict:
         try:
@@ -43,7 +65,7 @@ class StageFFmpeg2Service:
         result = StageResult(
             request_id=payload.request_id,
             stage=payload.stage,
-            outputs=[ArtifactRef(type="archive", uri=output_uri, metadata={})],
+            outputs=[ArtifactRef(type="bundle", uri=output_uri, metadata={})],
             metrics=metrics,
             status="success",
         )
@@ -53,49 +75,121 @@ class StageFFmpeg2Service:
         log_event(STAGE_NAME, "start", request_id=payload.request_id, input_uri=payload.input_uri)
         with tempfile.TemporaryDirectory() as tmp_dir:
             tmp_path = Path(tmp_dir)
-            clip_path = tmp_path / "clip.mp4"
-            download_file(payload.input_uri, clip_path)
-
-            raw_audio = tmp_path / "tmp_raw.wav"
             audio_path = tmp_path / "clip.wav"
             compressed_video = tmp_path / "clip_compressed.mp4"
-            archive_path = tmp_path / "clip_bundle.tar.gz"
 
-            self._run_ffmpeg(["-i", str(clip_path), "-map", "0:a?", str(raw_audio)], check=False)
-            
-            # Fallback for audio
-            if not raw_audio.exists() or raw_audio.stat().st_size == 0:
-                if raw_audio.exists(): raw_audio.unlink()
-                # Create silent wav
-                self._run_ffmpeg(["-f", "lavfi", "-i", "anullsrc=r=16000:cl=mono", "-t", "1", str(raw_audio)])
+            source = media_source(payload.input_uri, tmp_path / "clip.mp4", self.stream_inputs)
+            source_args = ffmpeg_input_args(source)
 
-            self._run_ffmpeg(["-i", str(raw_audio), "-vn", "-ar", "16000", "-ac", "1", str(audio_path)])
+            profile_name, profile = self.resolve_profile(payload.config.get("profile"))
+            video_args = self._video_encode_args(profile) if profile["encode_video"] else None
+            log_event(STAGE_NAME, "encoding_profile", request_id=payload.request_id, profile=profile_name, args=video_args)
 
-            self._run_ffmpeg(["-i", str(clip_path), "-vcodec", "libx264", "-crf", "30", str(compressed_video)])
+            probe = self._probe(source) if self.transcode_mode == "fused" else None
+            if probe is not None:
+                self._transcode_fused(source_args, probe, video_args, audio_path, compressed_video)
+            else:
+                self._transcode_multi_pass(source_args, video_args, tmp_path, audio_path, compressed_video)
 
-            self._run_tar(
-                ["-czf", str(archive_path), audio_path.name, compressed_video.name, clip_path.name],
-                cwd=tmp_path,
-            )
+            files = {audio_path.name: audio_path}
+            if video_args is not None:
+                files[compressed_video.name] = compressed_video
+            # The source clip already lives in the store, so it is only ever
+            # referenced: always when it is the only video, otherwise on request.
+            references = {}
+            if video_args is None or self.bundle_source_clip or payload.config.get("include_source_clip"):
+                references["clip.mp4"] = payload.input_uri
 
             clip_name = Path(payload.input_uri).stem
-            output_uri = (
-                f"s3://{self.bucket}/requests/{payload.request_id}/{payload.stage}/{clip_name}.tar.gz"
+            output_uri = write_bundle(
+                f"s3://{self.bucket}/requests/{payload.request_id}/{payload.stage}/{clip_name}.json",
+                files=files,
+                references=references,
             )
-            upload_file(archive_path, output_uri, extra_args={"ContentType": "application/gzip"})
             log_event(STAGE_NAME, "completed", request_id=payload.request_id, output_uri=output_uri)
             return output_uri
 
+    @staticmethod
+    def resolve_profile(name: Optional[str]) -> tuple[str, Dict[str, Any]]:
+        """Encoding profile for a request profile name; unknown names get the default."""
+        if name not in ENCODING_PROFILES:
+            name = DEFAULT_ENCODING_PROFILE
+        return name, ENCODING_PROFILES[name]
+
+    def _video_encode_args(self, profile: Dict[str, Any]) -> List[str]:
+        args = ["-vcodec", "libx264", "-preset", profile["preset"], "-crf", str(profile["crf"])]
+        args += ["-threads", str(profile.get("threads") or self.encoder_threads)]
+        if profile.get("max_height"):
+            # Never upscale; -2 keeps the width even as libx264 requires.
+            args += ["-vf", f"scale=-2:'min({profile['max_height']},ih)'"]
+        return args
+
+    def _transcode_fused(
+        self, source_args, probe: dict, video_args: Optional[List[str]], audio_path: Path, compressed_video: Path
+    ) -> None:
+        """
+        Decode the clip once and write the speech WAV and, if ``video_args`` is
+        given, the libx264 video from it.
+
+        Clips without an audio stream get silence of the same length from an
+        inline anullsrc input, so no separate fallback run is needed.
+        """
+        args = list(source_args)
+        if probe["has_audio"]:
+            audio_map = "0:a:0"
+        else:
+            args += ["-f", "lavfi", "-t", f"{max(probe['duration'], 1.0):.3f}", "-i", "anullsrc=r=16000:cl=mono"]
+            audio_map = "1:a:0"
+        if video_args is not None:
+            args += ["-map", "0:v:0?", "-map", "0:a:0?"] + video_args + [str(compressed_video)]
+        args += ["-map", audio_map] + SPEECH_AUDIO_ARGS + [str(audio_path)]
+        self._run_ffmpeg(args)
+
+    def _transcode_multi_pass(
+        self, source_args, video_args: Optional[List[str]], tmp_path: Path, audio_path: Path, compressed_video: Path
+    ) -> None:
+        raw_audio = tmp_path / "tmp_raw.wav"
+        self._run_ffmpeg(source_args + ["-map", "0:a?", str(raw_audio)], check=False)
+        
+        # Fallback for audio
+        if not raw_audio.exists() or raw_audio.stat().st_size == 0:
+            if raw_audio.exists(): raw_audio.unlink()
+            # Create silent wav
+            self._run_ffmpeg(["-f", "lavfi", "-i", "anullsrc=r=16000:cl=mono", "-t", "1", str(raw_audio)])
+
+        self._run_ffmpeg(["-i", str(raw_audio)] + SPEECH_AUDIO_ARGS + [str(audio_path)])
+
+        if video_args is not None:
+            self._run_ffmpeg(source_args + video_args + [str(compressed_video)])
+
+    @staticmethod
+    def _probe(source: str) -> Optional[dict]:
+        """Audio presence and duration of ``source``, or None if ffprobe fails."""
+        cmd = [
+            "ffprobe", "-v", "error",
+            "-show_entries", "stream=codec_type:format=duration",
+            "-of", "json", source,
+        ]
+        try:
+            completed = subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            info = json.loads(completed.stdout or b"{}")
+        except (OSError, subprocess.CalledProcessError, ValueError):
+            return None
+        streams = info.get("streams", [])
+        try:
+            duration = float(info.get("format", {}).get("duration", 0.0))
+        except (TypeError, ValueError):
+            duration = 0.0
+        return {
+            "has_audio": any(stream.get("codec_type") == "audio" for stream in streams),
+            "duration": duration,
+        }
+
     @staticmethod
     def _run_ffmpeg(args, check=True):
         cmd = ["ffmpeg", "-y"] + args
         subprocess.run(cmd, check=check, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
 
-    @staticmethod
-    def _run_tar(args, cwd: Path):
-        cmd = ["tar"] + args
-        subprocess.run(cmd, check=True, cwd=str(cwd), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-
     def _is_cold_start(self) -> bool:
         global COLD_START  # pylint: disable=global-statement
         if COLD_START:
@@ -2,26 +2,46 @@ from __future__ import annotations
 
 import json
 import os
+import re
+import shutil
 import subprocess
 import tempfile
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 
+import numpy as np
+
+from bundle_helper import member_uri, read_bundle, write_bundle
 from logging_helper import log_event, log_exception
 from metrics_helper import compute_cost_unit, get_memory_limit_mb, stage_timer
 from schemas import ArtifactRef, StagePayload, StageResult
-from storage_helper import download_file, upload_file
+from storage_helper import ffmpeg_input_args, media_source, stream_inputs_enabled, upload_file
 
 STAGE_NAME = "stage-ffmpeg-3"
 COLD_START = True
+TENSOR_PACK_FORMAT = "fave-frame-pack/1"
+# One showinfo line per frame leaving the filter graph: "n:   3 pts:  45045 pts_time:1.5015 ...".
+SHOWINFO_RE = re.compile(rb"\bn:\s*\d+\s+pts:\s*-?\d+\s+pts_time:(-?[0-9.]+)")
 
 
 class StageFFmpeg3Service:
-    """Samples frames from the clip video and uploads them individually."""
+    """Samples frames from the clip video and uploads them individually or as one tensor pack."""
 
     def __init__(self) -> None:
         self.bucket = os.getenv("ARTIFACT_BUCKET", "fave-artifacts")
-        self.frame_filter = os.getenv("FRAME_VF", "fps=12/60")
+        # "fixed": FRAME_VF as-is; "scene": keep frames whose scene-change score clears the threshold.
+        self.frame_sampling = os.getenv("FRAME_SAMPLING", "fixed").lower()
+        self.scene_threshold = float(os.getenv("SCENE_THRESHOLD", "0.3"))
+        # 0 (or less) means no bound: no rate cap for MAX, no forced keep for MIN.
+        self.scene_min_fps = max(0.0, float(os.getenv("SCENE_MIN_FPS", "0.1")))
+        self.scene_max_fps = max(0.0, float(os.getenv("SCENE_MAX_FPS", "2")))
+        # Frames per clip, spread over the whole clip; 0 keeps every sampled frame.
+        self.frame_budget = max(0, int(os.getenv("FRAME_BUDGET", "0")))
+        self.fixed_filter = os.getenv("FRAME_VF", "fps=12/60")
+        # "jpeg": one image object per frame; "tensor": one .npy pack of detector-ready RGB frames per clip.
+        self.frame_output = os.getenv("FRAME_OUTPUT", "jpeg").lower()
+        self.tensor_size = int(os.getenv("TENSOR_SIZE", "416"))
+        self.stream_inputs = stream_inputs_enabled()
         self.memory_limit_mb = get_memory_limit_mb()
 
     def handle(self, raw_body: str) -> dict:
@@ -55,54 +75,181 @@ class StageFFmpeg3Service:
         log_event(STAGE_NAME, "start", request_id=payload.request_id, input_uri=payload.input_uri)
         with tempfile.TemporaryDirectory() as tmp_dir:
             tmp_path = Path(tmp_dir)
-            archive_path = tmp_path / "bundle.tar.gz"
-            download_file(payload.input_uri, archive_path)
-
-            self._run_tar(["-xzf", str(archive_path)], cwd=tmp_path)
-
-            video_path = tmp_path / "clip_compressed.mp4"
-            if not video_path.exists():
-                # fallback if archive uses different name
-                candidates = list(tmp_path.glob("*.mp4"))
+            bundle = read_bundle(payload.input_uri)
+            video_name = "clip_compressed.mp4"
+            if member_uri(bundle, video_name) is None:
+                # fallback if bundle uses different name
+                candidates = sorted(name for name in bundle["members"] if name.endswith(".mp4"))
                 if not candidates:
-                    raise FileNotFoundError("No mp4 video found in archive for frame sampling")
-                video_path = candidates[0]
-
-            frame_prefix = tmp_path / "frame"
-            output_pattern = f"{frame_prefix}-%04d.jpg"
-            cmd = [
-                "ffmpeg",
-                "-y",
-                "-i",
-                str(video_path),
-                "-vf",
-                self.frame_filter,
-                output_pattern,
-            ]
-            subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+                    raise FileNotFoundError("No mp4 video found in bundle for frame sampling")
+                video_name = candidates[0]
+
+            video_uri = member_uri(bundle, video_name)
+            source = media_source(video_uri, tmp_path / video_name, self.stream_inputs)
+            video_args = ffmpeg_input_args(source)
+            # The budget is spread over the clip, which needs its length up front.
+            frame_filter = self._frame_filter(self._probe_duration(source) if self.frame_budget else None)
 
             clip_name = Path(payload.input_uri).stem
-            outputs: List[ArtifactRef] = []
-            for frame_file in sorted(tmp_path.glob("frame-*.jpg")):
-                frame_index = frame_file.stem.split("-")[-1]
-                target_uri = (
-                    f"s3://{self.bucket}/requests/{payload.request_id}/{payload.stage}/{clip_name}/frame_{frame_index}.jpg"
-                )
-                upload_file(frame_file, target_uri, extra_args={"ContentType": "image/jpeg"})
-                outputs.append(
-                    ArtifactRef(
-                        type="image",
-                        uri=target_uri,
-                        metadata={"clip": clip_name, "frame_index": int(frame_index)},
-                    )
-                )
+            if self.frame_output == "tensor":
+                outputs = [self._write_tensor_pack(video_args, frame_filter, tmp_path, payload, clip_name)]
+            else:
+                outputs = self._write_jpeg_frames(video_args, frame_filter, tmp_path, payload, clip_name)
 
-            log_event(STAGE_NAME, "completed", request_id=payload.request_id, frames=len(outputs))
+            log_event(STAGE_NAME, "completed", request_id=payload.request_id, outputs=len(outputs))
             return outputs
 
+    def _frame_filter(self, duration: Optional[float] = None) -> str:
+        """
+        Build the sampling filter for a clip of ``duration`` seconds.
+
+        Scene mode keeps the first frame, then any frame at least
+        ``1/SCENE_MAX_FPS`` after the last kept one whose scene score exceeds
+        ``SCENE_THRESHOLD``, or that is ``1/SCENE_MIN_FPS`` after it regardless,
+        so static shots are still covered at the minimum rate.
+
+        With ``FRAME_BUDGET`` and a known duration, kept frames are also at
+        least ``duration / budget`` apart, so the budget covers the clip
+        end to end instead of being used up at its start. Scene mode raises its
+        minimum gap to that; fixed mode thins ``FRAME_VF``'s output with a
+        second select.
+        """
+        budget_gap = self._budget_gap(duration)
+        if self.frame_sampling != "scene":
+            if budget_gap is None:
+                return self.fixed_filter
+            return f"{self.fixed_filter},select='isnan(prev_selected_t)+gte(t-prev_selected_t,{budget_gap:g})'"
+        min_gap = max(1.0 / self.scene_max_fps if self.scene_max_fps else 0.0, budget_gap or 0.0)
+        keep = f"gt(scene,{self.scene_threshold:g})"
+        if self.scene_min_fps:
+            keep += f"+gte(t-prev_selected_t,{max(min_gap, 1.0 / self.scene_min_fps):g})"
+        return f"select='isnan(prev_selected_t)+gte(t-prev_selected_t,{min_gap:g})*({keep})'"
+
+    def _budget_gap(self, duration: Optional[float]) -> Optional[float]:
+        if not self.frame_budget or not duration or duration <= 0:
+            return None
+        # Frame 0 is always kept, so the last of ``budget`` frames lands in the final gap.
+        return duration / self.frame_budget
+
+    def _sampling_output_args(self) -> List[str]:
+        # select drops frames; vfr stops the muxer from duplicating them back to a constant rate.
+        args = ["-vsync", "vfr"] if self.frame_sampling == "scene" or self.frame_budget else []
+        if self.frame_budget:
+            # Safety net for an unknown or misreported duration.
+            args += ["-frames:v", str(self.frame_budget)]
+        return args
+
+    @staticmethod
+    def _probe_duration(source: str) -> Optional[float]:
+        """Container duration of ``source`` in seconds, or None if ffprobe fails."""
+        cmd = ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "json", source]
+        try:
+            completed = subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            return float(json.loads(completed.stdout or b"{}").get("format", {}).get("duration"))
+        except (OSError, subprocess.CalledProcessError, TypeError, ValueError):
+            return None
+
     @staticmethod
-    def _run_tar(args, cwd: Path):
-        subprocess.run(["tar"] + args, check=True, cwd=str(cwd), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    def _frame_times(stderr: bytes, n_frames: int) -> List[Optional[float]]:
+        """
+        Presentation time (seconds) of each written frame, from showinfo's log.
+
+        showinfo sits last in the filter chain, so its lines follow output
+        order; any frame it saw past a ``-frames:v`` cap is cut off.
+        """
+        times: List[Optional[float]] = [float(match) for match in SHOWINFO_RE.findall(stderr or b"")][:n_frames]
+        return times + [None] * (n_frames - len(times))
+
+    def _write_jpeg_frames(
+        self, video_args, frame_filter: str, tmp_path: Path, payload: StagePayload, clip_name: str
+    ) -> List[ArtifactRef]:
+        frame_prefix = tmp_path / "frame"
+        output_pattern = f"{frame_prefix}-%04d.jpg"
+        cmd = (
+            ["ffmpeg", "-y"]
+            + video_args
+            + ["-vf", f"{frame_filter},showinfo"]
+            + self._sampling_output_args()
+            + [output_pattern]
+        )
+        completed = subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+        outputs: List[ArtifactRef] = []
+        frame_files = sorted(tmp_path.glob("frame-*.jpg"))
+        for frame_file, pts_time in zip(frame_files, self._frame_times(completed.stderr, len(frame_files))):
+            frame_index = frame_file.stem.split("-")[-1]
+            target_uri = (
+                f"s3://{self.bucket}/requests/{payload.request_id}/{payload.stage}/{clip_name}/frame_{frame_index}.jpg"
+            )
+            upload_file(frame_file, target_uri, extra_args={"ContentType": "image/jpeg"})
+            outputs.append(
+                ArtifactRef(
+                    type="image",
+                    uri=target_uri,
+                    metadata={
+                        "clip": clip_name,
+                        "frame_index": int(frame_index),
+                        "pts_time": pts_time,
+                        "sampling": self.frame_sampling,
+                    },
+                )
+            )
+        return outputs
+
+    def _write_tensor_pack(
+        self, video_args, frame_filter: str, tmp_path: Path, payload: StagePayload, clip_name: str
+    ) -> ArtifactRef:
+        """
+        Decode sampled frames straight to detector-sized RGB and store them as one .npy.
+
+        ffmpeg scales to ``tensor_size`` x ``tensor_size`` (bilinear, like the
+        detector's cv2.resize) and emits raw rgb24, so the pack is an
+        (N, H, W, 3) uint8 array the detector memory-maps with no JPEG decode.
+        The bundle manifest doubles as the pack index, including each frame's
+        presentation time (``frame_times``) since the indices are only sequence
+        numbers.
+        """
+        size = self.tensor_size
+        raw_path = tmp_path / "frames.rgb"
+        vf = f"{frame_filter},scale={size}:{size}:flags=bilinear,showinfo"
+        cmd = (
+            ["ffmpeg", "-y"]
+            + video_args
+            + ["-vf", vf]
+            + self._sampling_output_args()
+            + ["-f", "rawvideo", "-pix_fmt", "rgb24", str(raw_path)]
+        )
+        completed = subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+        frame_bytes = size * size * 3
+        n_frames = raw_path.stat().st_size // frame_bytes
+        pack_path = tmp_path / "frames.npy"
+        # Write the .npy header for the now-known shape, then append the raw frames as-is.
+        with pack_path.open("wb") as out, raw_path.open("rb") as raw:
+            header = {"descr": "|u1", "fortran_order": False, "shape": (n_frames, size, size, 3)}
+            np.lib.format.write_array_header_1_0(out, header)
+            shutil.copyfileobj(raw, out, length=16 * frame_bytes)
+            out.truncate(out.tell() - (raw_path.stat().st_size - n_frames * frame_bytes))
+        raw_path.unlink()
+
+        index = {
+            "format": TENSOR_PACK_FORMAT,
+            "clip": clip_name,
+            "shape": [n_frames, size, size, 3],
+            "dtype": "uint8",
+            "layout": "NHWC",
+            "pixel_format": "rgb24",
+            "frame_filter": frame_filter,
+            "sampling": self.frame_sampling,
+            "frame_indices": list(range(1, n_frames + 1)),
+            "frame_times": self._frame_times(completed.stderr, n_frames),
+        }
+        manifest_uri = write_bundle(
+            f"s3://{self.bucket}/requests/{payload.request_id}/{payload.stage}/{clip_name}/frames.json",
+            files={"frames.npy": pack_path},
+            metadata=index,
+        )
+        return ArtifactRef(type="tensor_pack", uri=manifest_uri, metadata={"clip": clip_name, "frames": n_frames})
 
     def _is_cold_start(self) -> bool:
         global COLD_START  # pylint: disable=global-statement
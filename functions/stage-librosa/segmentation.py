@@ -0,0 +1,227 @@
+"""
+Silence-based segmentation with a single pass over the audio.
+
+``librosa.effects.split`` recomputes the framewise RMS every time it is called,
+so scanning 26 ``top_db`` thresholds costs 26 full passes. Here the RMS/dB
+envelope is computed once, every candidate threshold is evaluated on that
+envelope with vectorised NumPy, and only the chosen threshold is turned into
+intervals. Boundaries match ``librosa.effects.split`` (centered frames,
+``ref=np.max``) for the same frame and hop length.
+
+``stream_frame_power`` builds the same envelope straight from a WAV file in
+fixed-size blocks, for audio too long to load into memory. The envelope itself
+is kept (one float per hop) because ``top_db`` is relative to the loudest frame
+of the whole track.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Iterable, Tuple
+
+import numpy as np
+import soundfile as sf
+
+FRAME_LENGTH = 2048
+HOP_LENGTH = 512
+DEFAULT_THRESHOLDS = tuple(range(24, 50))
+# amplitude_to_db clamps amplitudes at 1e-5, i.e. powers at 1e-10.
+_AMIN_POWER = 1e-10
+_CHUNK_SAMPLES = 1 << 20
+_CHUNK_FRAMES = 1 << 16
+
+
+def _hop_block_sums(chunks: Iterable[np.ndarray], hop_length: int) -> Tuple[np.ndarray, int]:
+    """
+    Sum of squares per hop-sized block over a stream of mono chunks.
+
+    Only a partial block is carried between chunks, so the caller decides how
+    much audio is resident at once. The last (partial) block is included.
+    """
+    sums = []
+    carry = np.empty(0, dtype=np.float64)
+    n_samples = 0
+    for chunk in chunks:
+        n_samples += chunk.shape[0]
+        data = np.concatenate((carry, np.asarray(chunk, dtype=np.float64)))
+        usable = (data.shape[0] // hop_length) * hop_length
+        blocks = data[:usable].reshape(-1, hop_length)
+        sums.append(np.einsum("ij,ij->i", blocks, blocks))
+        carry = data[usable:]
+    if carry.size:
+        sums.append(np.array([np.dot(carry, carry)]))
+    block_sums = np.concatenate(sums) if sums else np.empty(0, dtype=np.float64)
+    return block_sums, n_samples
+
+
+def _frames_from_blocks(block_sums: np.ndarray, n_samples: int, frame_length: int, hop_length: int) -> np.ndarray:
+    if frame_length % hop_length or (frame_length // 2) % hop_length:
+        raise ValueError("frame_length and frame_length // 2 must be multiples of hop_length")
+    n_frames = 1 + n_samples // hop_length
+    blocks_per_frame = frame_length // hop_length
+    pad_blocks = blocks_per_frame // 2
+
+    # Centered frames: frame_length // 2 zeros on each side of the signal.
+    padded = np.zeros(n_frames + blocks_per_frame - 1, dtype=np.float64)
+    padded[pad_blocks:pad_blocks + block_sums.shape[0]] = block_sums
+    csum = np.concatenate(([0.0], np.cumsum(padded)))
+    frame_sums = csum[blocks_per_frame:blocks_per_frame + n_frames] - csum[:n_frames]
+    return (np.maximum(frame_sums, 0.0) / frame_length).astype(np.float32)
+
+
+def frame_power(y: np.ndarray, frame_length: int = FRAME_LENGTH, hop_length: int = HOP_LENGTH) -> np.ndarray:
+    """
+    Mean squared amplitude per centered frame, as in ``librosa.feature.rms`` squared.
+
+    The signal is summed in hop-sized blocks (in chunks, so no framed copy of
+    the audio is materialised) and frames are assembled from block sums.
+    """
+    chunks = (y[start:start + _CHUNK_SAMPLES] for start in range(0, y.shape[-1], _CHUNK_SAMPLES))
+    block_sums, n_samples = _hop_block_sums(chunks, hop_length)
+    return _frames_from_blocks(block_sums, n_samples, frame_length, hop_length)
+
+
+def stream_frame_power(
+    path: str | Path,
+    frame_length: int = FRAME_LENGTH,
+    hop_length: int = HOP_LENGTH,
+    block_size: int = 1 << 16,
+) -> Tuple[np.ndarray, int, int]:
+    """
+    Frame power of an audio file read block by block with ``soundfile.blocks``.
+
+    Channels are averaged to mono per block, so peak memory is one block plus
+    the envelope (one float per hop) regardless of the file length. Returns
+    (power, sample_rate, n_samples) at the file's native rate.
+    """
+    sample_rate = sf.info(str(path)).samplerate
+    blocks = sf.blocks(str(path), blocksize=block_size, dtype="float32", always_2d=True)
+    mono = (block.mean(axis=1) if block.shape[1] > 1 else block[:, 0] for block in blocks)
+    block_sums, n_samples = _hop_block_sums(mono, hop_length)
+    return _frames_from_blocks(block_sums, n_samples, frame_length, hop_length), sample_rate, n_samples
+
+
+def power_to_db(power: np.ndarray) -> np.ndarray:
+    """dB relative to the loudest frame (``amplitude_to_db(rms, ref=np.max)``)."""
+    ref = max(_AMIN_POWER, float(power.max())) if power.size else 1.0
+    return (10.0 * np.log10(np.maximum(_AMIN_POWER, power)) - 10.0 * np.log10(ref)).astype(np.float32)
+
+
+def count_intervals(db: np.ndarray, thresholds: Iterable[float]) -> np.ndarray:
+    """Number of non-silent intervals each ``top_db`` threshold would produce."""
+    limits = -np.asarray(list(thresholds), dtype=np.float32)[:, None]
+    counts = np.zeros(limits.shape[0], dtype=np.int64)
+    prev = np.zeros((limits.shape[0], 1), dtype=bool)
+    # Walk the envelope in chunks so the (thresholds x frames) mask stays small.
+    for start in range(0, db.shape[0], _CHUNK_FRAMES):
+        mask = db[None, start:start + _CHUNK_FRAMES] > limits
+        rising = mask & ~np.concatenate((prev, mask[:, :-1]), axis=1)
+        counts += rising.sum(axis=1)
+        prev = mask[:, -1:]
+    return counts
+
+
+def nonsilent_intervals(db: np.ndarray, top_db: float, n_samples: int, hop_length: int = HOP_LENGTH) -> np.ndarray:
+    """Sample intervals above ``-top_db``, identical to ``librosa.effects.split``."""
+    non_silent = db > -top_db
+    edges = [np.flatnonzero(np.diff(non_silent.astype(np.int8))) + 1]
+    if non_silent[0]:
+        edges.insert(0, np.array([0]))
+    if non_silent[-1]:
+        edges.append(np.array([len(non_silent)]))
+    samples = np.minimum(np.concatenate(edges) * hop_length, n_samples)
+    return samples.reshape((-1, 2))
+
+
+def select_intervals(
+    db: np.ndarray,
+    n_samples: int,
+    min_clips: float,
+    max_clips: float,
+    thresholds: Iterable[float] = DEFAULT_THRESHOLDS,
+    hop_length: int = HOP_LENGTH,
+) -> Tuple[np.ndarray, float]:
+    """
+    Pick the first threshold whose interval count lies in [min_clips, max_clips].
+
+    Mirrors the original loop over ``librosa.effects.split``: if no threshold
+    qualifies the last one is used. Returns (intervals, chosen top_db).
+    """
+    thresholds = list(thresholds)
+    counts = count_intervals(db, thresholds)
+    ok = np.flatnonzero((counts >= min_clips) & (counts <= max_clips))
+    top_db = thresholds[ok[0]] if ok.size else thresholds[-1]
+    return nonsilent_intervals(db, top_db, n_samples, hop_length), top_db
+
+
+def _nearest(candidates: np.ndarray, ideal: float) -> int:
+    return int(candidates[np.argmin(np.abs(candidates - ideal))])
+
+
+def _quietest_cut(db: np.ndarray, lo: float, hi: float, ideal: float, hop_length: int) -> int:
+    """Lowest-energy frame centre in [lo, hi] samples, preferring the one nearest ``ideal``."""
+    first, last = int(np.ceil(lo / hop_length)), int(np.floor(hi / hop_length))
+    window = db[first:last + 1]
+    if window.size == 0:
+        return int(round(ideal))
+    # Anything within 1 dB of the minimum counts as equally quiet.
+    quiet = np.flatnonzero(window <= window.min() + 1.0) + first
+    return _nearest(quiet * hop_length, ideal)
+
+
+def balanced_cuts(
+    intervals: np.ndarray,
+    db: np.ndarray,
+    n_samples: int,
+    sample_rate: int,
+    target_len: float,
+    min_len: float,
+    max_len: float,
+    hop_length: int = HOP_LENGTH,
+) -> np.ndarray:
+    """
+    Cut points (in samples, from 0 to ``n_samples``) for contiguous clips of about ``target_len``.
+
+    The remaining audio is divided into as many ``target_len`` pieces as fit
+    and the next cut aims at the first of them, so the tail does not end up
+    as a short leftover. Cuts go at the midpoint of the silence gap between
+    ``intervals`` nearest that aim, first within half a piece of it and then
+    anywhere up to ``max_len``. With no gap in reach the cut is forced at the
+    quietest frame of ``db`` instead, so no clip exceeds ``max_len``.
+    """
+    target = max(1.0, target_len * sample_rate)
+    min_samples = max(1, int(min_len * sample_rate))
+    max_samples = max(min_samples + 1, int(max_len * sample_rate))
+
+    intervals = np.asarray(intervals).reshape(-1, 2)
+    gap_starts, gap_ends = intervals[:-1, 1], intervals[1:, 0]
+    candidates = ((gap_starts + gap_ends) // 2)[gap_ends > gap_starts].astype(np.float64)
+
+    cuts = [0]
+    pos = 0
+    while True:
+        remaining = n_samples - pos
+        pieces = max(1, int(round(remaining / target)))
+        if pieces == 1 and remaining <= max_samples:
+            break
+        pieces = max(2, pieces)
+        step = remaining / pieces
+        ideal = pos + step
+        hi = min(pos + max_samples, n_samples - min_samples)
+        lo = min(pos + max(min_samples, 0.5 * step), hi)
+
+        reachable = candidates[(candidates >= pos + min_samples) & (candidates <= hi)]
+        near = reachable[(reachable >= ideal - 0.5 * step) & (reachable <= ideal + 0.5 * step)]
+        if near.size:
+            cut = _nearest(near, ideal)
+        elif reachable.size:
+            cut = _nearest(reachable, ideal)
+        else:
+            cut = _quietest_cut(db, lo, hi, ideal, hop_length)
+        cut = int(min(max(cut, pos + min_samples), hi))
+        if cut <= pos:
+            break
+        cuts.append(cut)
+        pos = cut
+    cuts.append(n_samples)
+    return np.asarray(cuts, dtype=np.int64)
@@ -2,19 +2,21 @@ from __future__ import annotations
 
 import json
 import os
-import subprocess
 import sys
 import tempfile
 from pathlib import Path
-from typing import Any
+from typing import Optional
 
 import librosa
 import numpy as np
+import soundfile as sf
 
+from bundle_helper import fetch_members, member_uri, read_bundle, write_bundle
 from logging_helper import log_event, log_exception
 from metrics_helper import compute_cost_unit, get_memory_limit_mb, stage_timer
 from schemas import ArtifactRef, StagePayload, StageResult
-from storage_helper import download_file, upload_file
+from segmentation import balanced_cuts, frame_power, power_to_db, select_intervals, stream_frame_power
+from vad import VAD_SAMPLE_RATE, load_pcm16, speech_intervals
 
 STAGE_NAME = "stage-librosa"
 COLD_START = True
@@ -25,6 +27,15 @@ class StageLibrosaService:
 
     def __init__(self) -> None:
         self.bucket = os.getenv("ARTIFACT_BUCKET", "fave-artifacts")
+        self.sample_rate = int(os.getenv("AUDIO_SAMPLE_RATE", "22050"))
+        # "streaming" reads audio.wav block by block instead of loading it whole.
+        self.segmentation_mode = os.getenv("SEGMENTATION_MODE", "memory").lower()
+        # "energy" (librosa-style silence split) or "vad" (WebRTC voice activity).
+        self.segmenter_backend = os.getenv("SEGMENTER_BACKEND", "energy").lower()
+        self.vad_aggressiveness = int(os.getenv("VAD_AGGRESSIVENESS", "2"))
+        # > 0 cuts contiguous, millisecond-precise clips of roughly this length at
+        # silence points; 0 keeps the whole-second silence-split timestamps.
+        self.clip_target_seconds = float(os.getenv("CLIP_TARGET_SECONDS", "0"))
         self.memory_limit_mb = get_memory_limit_mb()
 
     def handle(self, raw_body: str) -> dict:
@@ -48,7 +59,7 @@ class StageLibrosaService:
         result = StageResult(
             request_id=payload.request_id,
             stage=payload.stage,
-            outputs=[ArtifactRef(type="archive", uri=output_uri, metadata={})],
+            outputs=[ArtifactRef(type="bundle", uri=output_uri, metadata={})],
             metrics=metrics,
             status="success",
         )
@@ -58,71 +69,110 @@ class StageLibrosaService:
         log_event(STAGE_NAME, "start", request_id=payload.request_id, input_uri=payload.input_uri)
         with tempfile.TemporaryDirectory() as tmp_dir:
             tmp_path = Path(tmp_dir)
-            archive_path = tmp_path / "input.tar.gz"
-            download_file(payload.input_uri, archive_path)
-
-            self._run_tar(["-xzf", str(archive_path)], cwd=tmp_path)
-            audio_path = tmp_path / "audio.wav"
-            video_path = tmp_path / "video.mp4"
-
-            audio, sr = librosa.load(audio_path, sr=22050, mono=True)
-            duration = librosa.get_duration(y=audio, sr=sr)
-            sys.stderr.write(f"DEBUG: Audio duration: {duration}s, samples: {len(audio)}\n")
+            bundle = read_bundle(payload.input_uri)
+            # Only the audio is needed here; the video is passed on by reference.
+            audio_path = fetch_members(bundle, ["audio.wav"], tmp_path)["audio.wav"]
 
             min_len = 0.1
             max_len = 30
-            min_clips = max(1, duration / max_len)
-            max_clips = max(1, duration / min_len)
-
-            clips = []
-            for threshold_db in range(24, 50):
-                clips = librosa.effects.split(audio, top_db=threshold_db)
-                if min_clips <= len(clips) <= max_clips:
-                    break
+            if self.segmenter_backend == "vad":
+                clips, db, sr, n_samples = self._vad_clips(audio_path, min_len, max_len)
+            else:
+                clips, db, sr, n_samples = self._energy_clips(audio_path, min_len, max_len)
             
             # Fallback: if no clips found, use the whole duration as one clip
             if len(clips) == 0:
                 sys.stderr.write("WARNING: No silence-based segments found, using whole video as one clip\n")
-                clips = np.array([[0, len(audio)]])
+                clips = np.array([[0, n_samples]])
             
             sys.stderr.write(f"DEBUG: Selected clips: {clips}\n")
 
             timestamps_path = tmp_path / "timestamps.txt"
             with timestamps_path.open("w") as fp:
-                last_end = 0
-                last_ts = "00:00:00"
-                for start, end in clips:
-                    start_sec = last_end
-                    start_ts = last_ts
-                    end_ts, end_sec = self._samples_to_timestamp(end, False)
-                    clip_len = end_sec - start_sec
-                    if clip_len > min_len:
-                        fp.write(f"{start_ts} {end_ts}\n")
-                        last_end = end_sec
-                        last_ts = end_ts
-
-            package_path = tmp_path / "segments.tar.gz"
-            self._run_tar(["-czf", str(package_path), "timestamps.txt", "video.mp4"], cwd=tmp_path)
-
-            output_uri = (
-                f"s3://{self.bucket}/requests/{payload.request_id}/{payload.stage}/segments.tar.gz"
+                if self.clip_target_seconds > 0:
+                    cuts = balanced_cuts(clips, db, n_samples, sr, self.clip_target_seconds, min_len, max_len)
+                    sys.stderr.write(f"DEBUG: Balanced clip lengths: {np.diff(cuts) / sr}\n")
+                    for start, end in zip(cuts[:-1], cuts[1:]):
+                        fp.write(f"{self._format_timestamp(start, sr)} {self._format_timestamp(end, sr)}\n")
+                else:
+                    last_end = 0
+                    last_ts = "00:00:00"
+                    for start, end in clips:
+                        start_sec = last_end
+                        start_ts = last_ts
+                        end_ts, end_sec = self._samples_to_timestamp(end, False, sr)
+                        clip_len = end_sec - start_sec
+                        if clip_len > min_len:
+                            fp.write(f"{start_ts} {end_ts}\n")
+                            last_end = end_sec
+                            last_ts = end_ts
+
+            output_uri = write_bundle(
+                f"s3://{self.bucket}/requests/{payload.request_id}/{payload.stage}/segments.json",
+                files={"timestamps.txt": timestamps_path},
+                references={"video.mp4": member_uri(bundle, "video.mp4")},
             )
-            upload_file(package_path, output_uri, extra_args={"ContentType": "application/gzip"})
             log_event(STAGE_NAME, "completed", request_id=payload.request_id, output_uri=output_uri)
             return output_uri
 
+    def _energy_clips(self, audio_path: Path, min_len: float, max_len: float) -> tuple[np.ndarray, np.ndarray, int, int]:
+        if self.segmentation_mode == "streaming":
+            # Bounded memory: only one block of samples plus the envelope is resident.
+            power, sr, n_samples = stream_frame_power(audio_path)
+        else:
+            audio, sr = self._load_audio(audio_path)
+            power, n_samples = frame_power(audio), len(audio)
+            del audio
+        duration = n_samples / sr
+        sys.stderr.write(f"DEBUG: Audio duration: {duration}s, samples: {n_samples}\n")
+
+        min_clips = max(1, duration / max_len)
+        max_clips = max(1, duration / min_len)
+
+        # One RMS/dB pass; all candidate thresholds are scored on that envelope.
+        db = power_to_db(power)
+        clips, threshold_db = select_intervals(db, n_samples, min_clips, max_clips)
+        sys.stderr.write(f"DEBUG: Selected top_db={threshold_db}\n")
+        return clips, db, sr, n_samples
+
+    def _vad_clips(self, audio_path: Path, min_len: float, max_len: float) -> tuple[np.ndarray, Optional[np.ndarray], int, int]:
+        pcm = load_pcm16(audio_path, VAD_SAMPLE_RATE)
+        sys.stderr.write(f"DEBUG: Audio duration: {len(pcm) / VAD_SAMPLE_RATE}s, samples: {len(pcm)}\n")
+        clips, speech_frames = speech_intervals(pcm, min_len, max_len, aggressiveness=self.vad_aggressiveness)
+        sys.stderr.write(f"DEBUG: VAD speech frames={speech_frames}, regions={len(clips)}\n")
+        # Energy envelope only for forced cuts in the boundary optimizer; skipped when balancing is off.
+        db = power_to_db(frame_power(pcm.astype(np.float32) / 32768.0)) if self.clip_target_seconds > 0 else None
+        return clips, db, VAD_SAMPLE_RATE, len(pcm)
+
+    def _load_audio(self, audio_path: Path) -> tuple[np.ndarray, int]:
+        """
+        Load mono audio at the analysis rate.
+
+        stage-ffmpeg-0 normally emits mono PCM at exactly this rate, in which case
+        the file is read as-is; anything else goes through librosa's resampler.
+        """
+        info = sf.info(str(audio_path))
+        if info.samplerate == self.sample_rate and info.channels == 1:
+            return librosa.load(audio_path, sr=None, mono=False)
+        sys.stderr.write(
+            f"DEBUG: Resampling {info.samplerate} Hz x{info.channels} audio to {self.sample_rate} Hz mono\n"
+        )
+        return librosa.load(audio_path, sr=self.sample_rate, mono=True)
+
     @staticmethod
-    def _samples_to_timestamp(sample: int, is_start: bool) -> tuple[str, int]:
-        seconds = sample / 22050
+    def _samples_to_timestamp(sample: int, is_start: bool, sr: int) -> tuple[str, int]:
+        seconds = sample / sr
         seconds = int(np.floor(seconds) if is_start else np.ceil(seconds))
         hh = seconds // 3600
         mm = (seconds % 3600) // 60
         ss = seconds % 60
         return f"{hh:02d}:{mm:02d}:{ss:02d}", seconds
 
-    def _run_tar(self, args, cwd: Path):
-        cmd = ["tar"] + args
-        subprocess.run(cmd, check=True, cwd=str(cwd), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    @staticmethod
+    def _format_timestamp(sample: int, sr: int) -> str:
+        millis = int(round(sample * 1000 / sr))
+        seconds, ms = divmod(millis, 1000)
+        return f"{seconds // 3600:02d}:{(seconds % 3600) // 60:02d}:{seconds % 60:02d}.{ms:03d}"
 
     def _is_cold_start(self) -> bool:
         global COLD_START  # pylint: disable=global-statement
@@ -0,0 +1,121 @@
+"""
+WebRTC VAD segmentation backend.
+
+Audio is converted to 16 kHz mono int16 PCM and classified in 30 ms frames by
+``webrtcvad``; consecutive speech frames become regions, nearby regions are
+merged, and the result is clamped to the stage's ``min_len``/``max_len``
+limits. The per-frame classifier is a small fixed-point GMM: about 0.16 ms
+per second of audio, against ~6.3 ms for the original librosa RMS loop but
+~0.06 ms for the vectorized envelope in ``segmentation``. Choose it for
+segment quality (speech vs. loud non-speech), not speed.
+"""
+
+from __future__ import annotations
+
+from math import gcd
+from pathlib import Path
+from typing import Tuple
+
+import numpy as np
+import soundfile as sf
+import webrtcvad
+from scipy.signal import resample_poly
+
+VAD_SAMPLE_RATE = 16000
+FRAME_MS = 30
+DEFAULT_AGGRESSIVENESS = 2
+# Speech regions separated by less than this are treated as one utterance.
+DEFAULT_MERGE_GAP = 0.3
+
+
+def load_pcm16(path: str | Path, sample_rate: int = VAD_SAMPLE_RATE) -> np.ndarray:
+    """Read ``path`` as mono int16 PCM at ``sample_rate``, resampling only if needed."""
+    info = sf.info(str(path))
+    if info.samplerate == sample_rate and info.channels == 1:
+        return sf.read(str(path), dtype="int16")[0]
+    audio, source_rate = sf.read(str(path), dtype="float32", always_2d=True)
+    audio = audio.mean(axis=1)
+    if source_rate != sample_rate:
+        factor = gcd(source_rate, sample_rate)
+        audio = resample_poly(audio, sample_rate // factor, source_rate // factor)
+    return (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16)
+
+
+def speech_flags(
+    pcm: np.ndarray,
+    sample_rate: int = VAD_SAMPLE_RATE,
+    aggressiveness: int = DEFAULT_AGGRESSIVENESS,
+    frame_ms: int = FRAME_MS,
+) -> np.ndarray:
+    """Speech/non-speech decision for each full ``frame_ms`` frame of ``pcm``."""
+    vad = webrtcvad.Vad(aggressiveness)
+    frame_len = sample_rate * frame_ms // 1000
+    n_frames = pcm.shape[0] // frame_len
+    buf = np.ascontiguousarray(pcm[: n_frames * frame_len], dtype="<i2").tobytes()
+    step = frame_len * 2
+    return np.fromiter(
+        (vad.is_speech(buf[i * step:(i + 1) * step], sample_rate) for i in range(n_frames)),
+        dtype=bool,
+        count=n_frames,
+    )
+
+
+def _runs(flags: np.ndarray) -> np.ndarray:
+    """(start, end) frame indices of each run of True values."""
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], flags.astype(np.int8), [0]))))
+    return edges.reshape(-1, 2)
+
+
+def merge_regions(
+    regions: np.ndarray,
+    n_samples: int,
+    sample_rate: int,
+    min_len: float,
+    max_len: float,
+    merge_gap: float = DEFAULT_MERGE_GAP,
+) -> np.ndarray:
+    """
+    Merge close speech regions (in samples) and enforce the clip length limits.
+
+    Regions closer than ``merge_gap`` are joined unless that would exceed
+    ``max_len``; regions shorter than ``min_len`` are dropped; anything still
+    longer than ``max_len`` is split into equal parts.
+    """
+    max_samples = int(max_len * sample_rate)
+    min_samples = int(min_len * sample_rate)
+    gap_samples = int(merge_gap * sample_rate)
+
+    merged = []
+    for start, end in regions:
+        if merged and start - merged[-1][1] <= gap_samples and end - merged[-1][0] <= max_samples:
+            merged[-1][1] = end
+        else:
+            merged.append([int(start), int(end)])
+
+    clips = []
+    for start, end in merged:
+        end = min(end, n_samples)
+        length = end - start
+        if length < min_samples:
+            continue
+        parts = max(1, -(-length // max_samples))
+        bounds = np.linspace(start, end, parts + 1).astype(np.int64)
+        clips.extend(zip(bounds[:-1], bounds[1:]))
+    return np.array(clips, dtype=np.int64).reshape(-1, 2)
+
+
+def speech_intervals(
+    pcm: np.ndarray,
+    min_len: float,
+    max_len: float,
+    sample_rate: int = VAD_SAMPLE_RATE,
+    aggressiveness: int = DEFAULT_AGGRESSIVENESS,
+    frame_ms: int = FRAME_MS,
+    merge_gap: float = DEFAULT_MERGE_GAP,
+) -> Tuple[np.ndarray, int]:
+    """Speech clips of ``pcm`` in samples, plus the number of speech frames."""
+    flags = speech_flags(pcm, sample_rate, aggressiveness, frame_ms)
+    frame_len = sample_rate * frame_ms // 1000
+    regions = _runs(flags) * frame_len
+    clips = merge_regions(regions, pcm.shape[0], sample_rate, min_len, max_len, merge_gap)
+    return clips, int(flags.sum())
@@ -0,0 +1,47 @@
+"""
+Near-duplicate frame elimination for tensor packs.
+
+Each frame is reduced to a small grayscale thumbnail and compared with the
+thumbnail of the last frame that was kept; if the mean absolute difference is
+within ``threshold`` (0-255 grey levels) the frame is treated as a duplicate
+and reuses that frame's detections instead of running inference.
+"""
+
+from __future__ import annotations
+
+import cv2
+import numpy as np
+
+THUMB_SIZE = 16
+# ITU-R BT.601 luma weights for RGB input.
+_LUMA = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+
+def thumbnails(frames: np.ndarray, size: int = THUMB_SIZE) -> np.ndarray:
+    """Area-downscaled grayscale thumbnails of (N, H, W, 3) RGB frames, shape (N, size, size)."""
+    out = np.empty((frames.shape[0], size, size), dtype=np.float32)
+    for i in range(frames.shape[0]):
+        gray = np.asarray(frames[i], dtype=np.float32) @ _LUMA
+        out[i] = cv2.resize(gray, (size, size), interpolation=cv2.INTER_AREA)
+    return out
+
+
+def representatives(thumbs: np.ndarray, threshold: float) -> np.ndarray:
+    """
+    Map every frame to the kept frame whose detections it should use.
+
+    Returns an int array where ``rep[i] == i`` for kept frames and points at
+    the previously kept frame for near-duplicates. ``threshold <= 0`` keeps
+    every frame.
+    """
+    n = thumbs.shape[0]
+    rep = np.arange(n)
+    if threshold <= 0 or n == 0:
+        return rep
+    last = 0
+    for i in range(1, n):
+        if float(np.mean(np.abs(thumbs[i] - thumbs[last]))) <= threshold:
+            rep[i] = last
+        else:
+            last = i
+    return rep
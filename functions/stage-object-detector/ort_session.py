@@ -0,0 +1,131 @@
+"""
+ONNX Runtime session setup sized to the container.
+
+By default ORT sizes its thread pools from the host's core count, so several
+replicas on one node oversubscribe the CPUs. Here the intra-op pool follows
+the cgroup CPU quota (``metrics_helper.get_cpu_limit``), the graph runs
+sequentially with a single inter-op thread, and idle workers do not spin.
+
+Graph optimization runs once: the first session saves the ORT_ENABLE_ALL
+optimized graph to ``cache_dir`` and later sessions load that file with
+optimization disabled. The image build runs this module to bake the graph into
+``/opt/models/ort-cache``, so cold starts begin with a hit. The cache key covers
+the model file, the ORT version, the CPU architecture and its SIMD feature
+flags, since fully optimized graphs (NCHWc layouts in particular) are
+hardware-specific: on a node whose CPU differs from the build host's, the baked
+graph is simply a miss and the session optimizes from the source model.
+
+    python3 ort_session.py CACHE_DIR MODEL [MODEL ...]
+"""
+
+from __future__ import annotations
+
+import hashlib
+import math
+import os
+import platform
+import sys
+from pathlib import Path
+from typing import Optional
+
+import onnxruntime as ort
+
+from logging_helper import log_event
+from metrics_helper import get_cpu_limit
+
+STAGE_NAME = "stage-object-detector"
+# CPU flags that change which kernels and layouts ORT_ENABLE_ALL picks.
+ISA_FLAGS = {
+    "sse4_1", "sse4_2", "avx", "avx2", "fma", "f16c",
+    "avx512f", "avx512bw", "avx512vl", "avx512_vnni", "avx512_bf16", "avx_vnni",
+    "amx_tile", "amx_int8", "amx_bf16",
+    "asimd", "asimddp", "i8mm", "sve", "bf16",
+}
+
+
+def cpu_features() -> str:
+    """SIMD feature flags of this CPU that matter for optimized graphs ("" if unknown)."""
+    try:
+        with open("/proc/cpuinfo", encoding="utf-8") as fp:
+            for line in fp:
+                key, _, value = line.partition(":")
+                if key.strip() in {"flags", "Features"}:
+                    return ",".join(sorted(ISA_FLAGS.intersection(value.split())))
+    except OSError:
+        pass
+    return ""
+
+
+def session_options(cpu_limit: Optional[float] = None, optimize: bool = True) -> ort.SessionOptions:
+    cores = cpu_limit if cpu_limit is not None else get_cpu_limit()
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = max(1, math.ceil(cores))
+    options.inter_op_num_threads = 1
+    options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    # Spinning workers burn CFS quota while waiting and get the pod throttled.
+    options.add_session_config_entry("session.intra_op.allow_spinning", "0")
+    options.graph_optimization_level = (
+        ort.GraphOptimizationLevel.ORT_ENABLE_ALL if optimize else ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+    )
+    return options
+
+
+def optimized_model_path(model_path: str, cache_dir: str | Path) -> Path:
+    stat = os.stat(model_path)
+    identity = (
+        f"{os.path.abspath(model_path)}:{stat.st_size}:{stat.st_mtime_ns}:"
+        f"{ort.__version__}:{platform.machine()}:{cpu_features()}"
+    )
+    digest = hashlib.sha256(identity.encode("utf-8")).hexdigest()[:16]
+    return Path(cache_dir) / f"{Path(model_path).stem}.{digest}.ort.onnx"
+
+
+def create_session(
+    model_path: str,
+    cache_dir: Optional[str | Path] = None,
+    cpu_limit: Optional[float] = None,
+) -> ort.InferenceSession:
+    """Build an inference session, reusing or writing the optimized graph in ``cache_dir``."""
+    providers = ["CPUExecutionProvider"]
+    if not cache_dir:
+        return ort.InferenceSession(model_path, sess_options=session_options(cpu_limit), providers=providers)
+
+    cached = optimized_model_path(model_path, cache_dir)
+    if cached.exists() and cached.stat().st_size > 0:
+        try:
+            options = session_options(cpu_limit, optimize=False)
+            session = ort.InferenceSession(str(cached), sess_options=options, providers=providers)
+            log_event(STAGE_NAME, "ort_session", optimized_model=str(cached), cache="hit")
+            return session
+        except Exception as exc:  # pylint: disable=broad-except
+            log_event(STAGE_NAME, "warning", message=f"Discarding unusable optimized model {cached}: {exc}")
+            try:
+                cached.unlink(missing_ok=True)
+            except OSError:
+                pass
+
+    options = session_options(cpu_limit)
+    partial = cached.with_name(f"{cached.name}.{os.getpid()}.tmp")
+    try:
+        cached.parent.mkdir(parents=True, exist_ok=True)
+        if not os.access(cached.parent, os.W_OK):
+            raise PermissionError(f"{cached.parent} is not writable")
+        options.optimized_model_filepath = str(partial)
+    except OSError as exc:
+        # A read-only image cache still serves hits; misses just optimize in memory.
+        log_event(STAGE_NAME, "warning", message=f"Optimized model cache unavailable: {exc}")
+    session = ort.InferenceSession(model_path, sess_options=options, providers=providers)
+    # ORT writes the file while building the session; publish it atomically for other replicas.
+    if partial.exists():
+        os.replace(partial, cached)
+        log_event(STAGE_NAME, "ort_session", optimized_model=str(cached), cache="miss")
+    return session
+
+
+if __name__ == "__main__":
+    # Image build step: bake the optimized graph of each model into the cache.
+    if len(sys.argv) < 3:
+        sys.exit("usage: ort_session.py CACHE_DIR MODEL [MODEL ...]")
+    for path in sys.argv[2:]:
+        create_session(path, cache_dir=sys.argv[1], cpu_limit=1)
+        print(f"{path} -> {optimized_model_path(path, sys.argv[1])}")
@@ -9,12 +9,15 @@ from typing import Any, Dict, List, Tuple
 
 import cv2
 import numpy as np
-import onnxruntime as ort
 
+from bundle_helper import fetch_members, read_bundle
+from frame_dedup import representatives, thumbnails
 from logging_helper import log_event, log_exception
 from metrics_helper import compute_cost_unit, get_memory_limit_mb, stage_timer
+from ort_session import create_session
 from schemas import ArtifactRef, StagePayload, StageResult
 from storage_helper import download_file, upload_file, write_json
+from yolo_postprocess import DEFAULT_CONF_THRESHOLD, DEFAULT_IOU_THRESHOLD, postprocess
 
 STAGE_NAME = "stage-object-detector"
 COLD_START = True
@@ -28,7 +31,20 @@ class StageObjectDetectorService:
     def __init__(self) -> None:
         self.bucket = os.getenv("ARTIFACT_BUCKET", "fave-artifacts")
         self.model_path = os.getenv("MODEL_PATH", "/opt/models/model.onnx")
+        # INT8 model from scripts/quantize_detector.py, used for requests whose profile is in INT8_PROFILES.
+        self.int8_model_path = os.getenv("MODEL_PATH_INT8", "/opt/models/model.int8.onnx")
+        self.int8_profiles = {name.strip() for name in os.getenv("INT8_PROFILES", "fast").split(",") if name.strip()}
+        self._int8_sess = None
+        self._int8_unavailable = False
         self.label_path = os.getenv("LABEL_PATH", "/opt/models/coco.names")
+        self.batch_size = max(1, int(os.getenv("DETECTOR_BATCH_SIZE", "8")))
+        # Mean absolute thumbnail difference (grey levels) under which a pack frame reuses the previous detections.
+        self.dedup_threshold = float(os.getenv("DEDUP_THRESHOLD", "2.0"))
+        self.conf_threshold = float(os.getenv("CONF_THRESHOLD", str(DEFAULT_CONF_THRESHOLD)))
+        self.iou_threshold = float(os.getenv("IOU_THRESHOLD", str(DEFAULT_IOU_THRESHOLD)))
+        # Optimized graphs baked at image build (ort_session.py); misses are saved
+        # here too when writable. Empty disables the cache.
+        self.ort_cache_dir = os.getenv("ORT_CACHE_DIR", "/opt/models/ort-cache")
         self.memory_limit_mb = get_memory_limit_mb()
         
         # Load labels
@@ -40,8 +56,12 @@ class StageObjectDetectorService:
         # Initialize session
         try:
             if os.path.exists(self.model_path) and os.path.getsize(self.model_path) > 0:
-                self.sess = ort.InferenceSession(self.model_path)
-                self.input_name = self.sess.get_inputs()[0].name
+                self.sess = create_session(self.model_path, self.ort_cache_dir)
+                model_input = self.sess.get_inputs()[0]
+                self.input_name = model_input.name
+                # A model exported with a fixed batch dimension can only take one frame per run.
+                if isinstance(model_input.shape[0], int):
+                    self.batch_size = 1
             else:
                 self.sess = None
         except Exception as e:
@@ -64,6 +84,7 @@ class StageObjectDetectorService:
             "memory_limit_mb": self.memory_limit_mb,
             "cold_start": self._is_cold_start(),
             "cost_unit": compute_cost_unit(duration_ms, self.memory_limit_mb),
+            "extra": {key: artifact_metadata[key] for key in ("frames", "frames_dropped") if key in artifact_metadata},
         }
         log_event(STAGE_NAME, "metrics", request_id=payload.request_id, **metrics)
         
@@ -81,7 +102,9 @@ class StageObjectDetectorService:
 
     def _process(self, payload: StagePayload) -> Tuple[str, Dict[str, Any]]:
         log_event(STAGE_NAME, "start", request_id=payload.request_id, input_uri=payload.input_uri)
-        
+        if payload.input_uri.endswith(".json"):
+            return self._process_pack(payload)
+
         if not self.sess:
              # Fallback if model is not present
              log_event(STAGE_NAME, "warning", message="Model not initialized, returning placeholder")
@@ -113,18 +136,19 @@ class StageObjectDetectorService:
                     img = np.expand_dims(img, axis=0)
 
                     # Inference
-                    detections = self.sess.run(None, {self.input_name: img})
+                    model_name, sess, input_name = self._model_for(payload)
+                    detections = sess.run(None, {input_name: img})
 
-                    # Postprocess (Simplified summary)
                     summary = {
-                        "model": "tiny-yolov4",
-                        "raw_output_shapes": [str(d.shape) for d in detections],
-                        "note": "Full post-processing skipped for prototype"
+                        "model": model_name,
+                        "detections": self._postprocess(detections, 416)[0],
                     }
 
         fanout = payload.fanout or {}
         clip_idx = fanout.get("clip_index", "0")
         frame_idx = fanout.get("frame_index", Path(payload.input_uri).stem)
+        if "pts_time" in fanout:
+            summary["pts_time"] = fanout["pts_time"]
         
         output_uri = f"s3://{self.bucket}/requests/{payload.request_id}/{payload.stage}/clip_{clip_idx}/{frame_idx}.json"
         write_json(summary, output_uri)
@@ -136,11 +160,101 @@ class StageObjectDetectorService:
             "clip_index": clip_idx,
             "frame_index": frame_idx
         }
+        if "pts_time" in fanout:
+            artifact_metadata["pts_time"] = fanout["pts_time"]
         if "frame_uri" in fanout:
             artifact_metadata["frame_uri"] = fanout["frame_uri"]
 
         return output_uri, artifact_metadata
 
+    def _model_for(self, payload: StagePayload) -> Tuple[str, Any, str]:
+        """Pick (model name, session, input name) for the request profile; INT8 falls back to FP32."""
+        if payload.config.get("profile") in self.int8_profiles and self.sess:
+            if self._int8_sess is None and not self._int8_unavailable:
+                # Loaded on first use so FP32-only pods never pay for it.
+                try:
+                    if os.path.exists(self.int8_model_path) and os.path.getsize(self.int8_model_path) > 0:
+                        self._int8_sess = create_session(self.int8_model_path, self.ort_cache_dir)
+                    else:
+                        log_event(STAGE_NAME, "warning", message=f"INT8 model not found at {self.int8_model_path}; using FP32")
+                except Exception as e:
+                    log_exception(STAGE_NAME, "init_int8_model", e)
+                self._int8_unavailable = self._int8_sess is None
+            if self._int8_sess is not None:
+                return "tiny-yolov4-int8", self._int8_sess, self._int8_sess.get_inputs()[0].name
+        return "tiny-yolov4", self.sess, self.input_name
+
+    def _postprocess(self, outputs, input_size: int):
+        return postprocess(
+            outputs,
+            input_size,
+            labels=self.labels,
+            conf_threshold=self.conf_threshold,
+            iou_threshold=self.iou_threshold,
+        )
+
+    def _process_pack(self, payload: StagePayload) -> Tuple[str, Dict[str, Any]]:
+        """
+        Run detection over a stage-ffmpeg-3 tensor pack.
+
+        The pack is already RGB at the model's input size, so it is memory-mapped
+        and fed in batches of ``batch_size`` frames; only the current batch is
+        converted to float. Near-duplicate frames (see ``frame_dedup``) skip
+        inference and reuse the detections of the last kept frame.
+        """
+        bundle = read_bundle(payload.input_uri)
+        index = bundle.get("metadata", {})
+        frame_indices = index.get("frame_indices", [])
+        frame_times = index.get("frame_times") or []
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            tmp_path = Path(tmp_dir)
+            pack_path = fetch_members(bundle, ["frames.npy"], tmp_path)["frames.npy"]
+            frames = np.load(pack_path, mmap_mode="r")
+            if not frame_indices:
+                frame_indices = list(range(1, frames.shape[0] + 1))
+
+            rep = representatives(thumbnails(frames), self.dedup_threshold)
+            kept = np.flatnonzero(rep == np.arange(rep.shape[0]))
+
+            kept_results: Dict[int, Dict[str, Any]] = {}
+            if not self.sess:
+                log_event(STAGE_NAME, "warning", message="Model not initialized, returning placeholder")
+                kept_results = {int(i): {"model": "placeholder", "detections": []} for i in kept}
+            else:
+                model_name, sess, input_name = self._model_for(payload)
+                for start in range(0, kept.shape[0], self.batch_size):
+                    batch_idx = kept[start:start + self.batch_size]
+                    tensor = frames[batch_idx].transpose(0, 3, 1, 2).astype(np.float32) / 255.0
+                    outputs = sess.run(None, {input_name: tensor})
+                    for frame_pos, detections in zip(batch_idx, self._postprocess(outputs, frames.shape[1])):
+                        kept_results[int(frame_pos)] = {"model": model_name, "detections": detections}
+
+            results = []
+            for pos, rep_pos in enumerate(rep):
+                entry = {"frame_index": frame_indices[pos], **kept_results[int(rep_pos)]}
+                if pos < len(frame_times):
+                    entry["pts_time"] = frame_times[pos]
+                if rep_pos != pos:
+                    # Near-duplicate: detections are copied from the last kept frame.
+                    entry["duplicate_of"] = frame_indices[int(rep_pos)]
+                results.append(entry)
+            del frames
+
+        fanout = payload.fanout or {}
+        clip_idx = fanout.get("clip_index", "0")
+        output_uri = f"s3://{self.bucket}/requests/{payload.request_id}/{payload.stage}/clip_{clip_idx}/frames.json"
+        write_json({"clip": index.get("clip"), "frames": results}, output_uri)
+        dropped = len(results) - int(kept.shape[0])
+        log_event(
+            STAGE_NAME, "completed", request_id=payload.request_id, output_uri=output_uri, frames=len(results), frames_dropped=dropped
+        )
+        return output_uri, {
+            "clip_index": clip_idx,
+            "frame_pack": payload.input_uri,
+            "frames": len(results),
+            "frames_dropped": dropped,
+        }
+
     def _is_cold_start(self) -> bool:
         global COLD_START
         if COLD_START:
@@ -0,0 +1,177 @@
+"""
+Vectorized tiny-YOLOv4 post-processing.
+
+Two output layouts are understood:
+
+* Detection heads, one array per scale, either darknet-style raw logits
+  ``(B, A*(5+C), G, G)`` / ``(B, G, G, A*(5+C))`` or the ONNX model zoo layout
+  ``(B, G, G, A, 5+C)`` whose objectness and class scores are already
+  activated. Boxes are decoded with the tiny-YOLOv4 anchors and ``scale_x_y``.
+* The two-output ``boxes`` ``(B, N, 1, 4)`` / ``confs`` ``(B, N, C)`` export,
+  whose boxes are already normalized ``x1, y1, x2, y2``.
+
+Candidates are filtered by confidence and reduced with class-aware Fast NMS:
+a box is dropped when any higher-scoring box of the same class overlaps it by
+more than the IoU threshold, with all same-class pairs evaluated in one
+vectorized pass. There are no per-box Python loops.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# tiny-YOLOv4 (darknet yolov4-tiny.cfg) anchors in input pixels, by head stride.
+TINY_YOLOV4_ANCHORS: Dict[int, np.ndarray] = {
+    16: np.array([[23, 27], [37, 58], [81, 82]], dtype=np.float32),
+    32: np.array([[81, 82], [135, 169], [344, 319]], dtype=np.float32),
+}
+TINY_YOLOV4_XY_SCALE = 1.05
+DEFAULT_CONF_THRESHOLD = 0.25
+DEFAULT_IOU_THRESHOLD = 0.45
+DEFAULT_MAX_CANDIDATES = 1000
+DEFAULT_MAX_DETECTIONS = 100
+
+
+def _sigmoid(x: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+def decode_head(
+    head: np.ndarray,
+    input_size: int,
+    anchors: Optional[Dict[int, np.ndarray]] = None,
+    xy_scale: float = TINY_YOLOV4_XY_SCALE,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Decode one detection head into normalized xyxy boxes ``(B, N, 4)`` and class scores ``(B, N, C)``.
+
+    Class scores are objectness times class probability.
+    """
+    anchors = anchors or TINY_YOLOV4_ANCHORS
+    head = np.asarray(head, dtype=np.float32)
+    activated = head.ndim == 5
+    if head.ndim == 4:
+        if head.shape[1] != head.shape[2]:
+            head = head.transpose(0, 2, 3, 1)  # NCHW -> NHWC
+        batch, grid_h, grid_w, channels = head.shape
+        head = head.reshape(batch, grid_h, grid_w, 3, channels // 3)
+    batch, grid_h, grid_w, n_anchors, _ = head.shape
+    stride = input_size // grid_h
+    if stride not in anchors:
+        raise ValueError(f"No anchors for a {grid_h}x{grid_w} head at input size {input_size}")
+    head_anchors = anchors[stride][:n_anchors]
+
+    grid_y, grid_x = np.meshgrid(np.arange(grid_h, dtype=np.float32), np.arange(grid_w, dtype=np.float32), indexing="ij")
+    grid = np.stack([grid_x, grid_y], axis=-1)[None, :, :, None, :]
+
+    xy = (_sigmoid(head[..., 0:2]) * xy_scale - 0.5 * (xy_scale - 1) + grid) * stride
+    wh = np.exp(np.clip(head[..., 2:4], None, 10.0)) * head_anchors
+    if activated:
+        objectness, class_prob = head[..., 4:5], head[..., 5:]
+    else:
+        objectness, class_prob = _sigmoid(head[..., 4:5]), _sigmoid(head[..., 5:])
+
+    boxes = np.concatenate([xy - wh / 2, xy + wh / 2], axis=-1) / float(input_size)
+    scores = objectness * class_prob
+    return boxes.reshape(batch, -1, 4), scores.reshape(batch, -1, scores.shape[-1])
+
+
+def decode_outputs(outputs: Sequence[np.ndarray], input_size: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Normalized xyxy boxes ``(B, N, 4)`` and class scores ``(B, N, C)`` for any supported layout."""
+    if len(outputs) == 2 and outputs[0].shape[-1] == 4 and outputs[0].ndim in (3, 4):
+        boxes, confs = outputs
+        return np.asarray(boxes, dtype=np.float32).reshape(boxes.shape[0], -1, 4), np.asarray(confs, dtype=np.float32)
+    decoded = [decode_head(head, input_size) for head in outputs]
+    return np.concatenate([b for b, _ in decoded], axis=1), np.concatenate([s for _, s in decoded], axis=1)
+
+
+def box_iou(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Element-wise IoU of two equally shaped arrays of xyxy boxes ``(N, 4)``."""
+    inter_w = np.clip(np.minimum(a[:, 2], b[:, 2]) - np.maximum(a[:, 0], b[:, 0]), 0, None)
+    inter_h = np.clip(np.minimum(a[:, 3], b[:, 3]) - np.maximum(a[:, 1], b[:, 1]), 0, None)
+    inter = inter_w * inter_h
+    area_a = np.clip(a[:, 2] - a[:, 0], 0, None) * np.clip(a[:, 3] - a[:, 1], 0, None)
+    area_b = np.clip(b[:, 2] - b[:, 0], 0, None) * np.clip(b[:, 3] - b[:, 1], 0, None)
+    return inter / np.maximum(area_a + area_b - inter, 1e-9)
+
+
+def fast_nms(boxes: np.ndarray, scores: np.ndarray, class_ids: np.ndarray, iou_threshold: float) -> np.ndarray:
+    """
+    Class-aware Fast NMS; returns indices of kept boxes in descending score order.
+
+    Boxes are sorted by class, then by descending score, so every same-class
+    pair (i, j) with i < j has i scoring at least as high as j. All such pairs
+    are enumerated at once and j is dropped if any i overlaps it by more than
+    ``iou_threshold``. Cost grows with the per-class counts squared rather
+    than the total count squared.
+    """
+    n = scores.shape[0]
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    order = np.lexsort((-scores, class_ids))
+    sorted_classes = class_ids[order]
+    block_starts = np.flatnonzero(np.r_[True, sorted_classes[1:] != sorted_classes[:-1]])
+    block_ends = np.r_[block_starts[1:], n]
+    ends = np.repeat(block_ends, np.diff(np.r_[block_starts, n]))
+
+    # Pair every box with the lower-scoring boxes after it in its class block.
+    positions = np.arange(n)
+    counts = ends - positions - 1
+    first = np.repeat(positions, counts)
+    pair_offsets = np.arange(first.shape[0]) - np.repeat(np.cumsum(counts) - counts, counts)
+    second = first + 1 + pair_offsets
+
+    sorted_boxes = boxes[order]
+    overlapping = box_iou(sorted_boxes[first], sorted_boxes[second]) > iou_threshold
+    suppressed = np.zeros(n, dtype=bool)
+    suppressed[second[overlapping]] = True
+
+    kept = order[~suppressed]
+    return kept[np.argsort(-scores[kept], kind="stable")]
+
+
+def postprocess(
+    outputs: Sequence[np.ndarray],
+    input_size: int,
+    labels: Sequence[str] = (),
+    conf_threshold: float = DEFAULT_CONF_THRESHOLD,
+    iou_threshold: float = DEFAULT_IOU_THRESHOLD,
+    max_candidates: int = DEFAULT_MAX_CANDIDATES,
+    max_detections: int = DEFAULT_MAX_DETECTIONS,
+) -> List[List[Dict[str, object]]]:
+    """
+    Turn raw model outputs into labelled detections, one list per batch element.
+
+    Each detection is ``{"label", "class_id", "score", "box"}`` with ``box``
+    as ``[x1, y1, x2, y2]`` normalized to the frame and clipped to ``[0, 1]``.
+    Only the ``max_candidates`` best boxes above ``conf_threshold`` enter NMS.
+    """
+    boxes, scores = decode_outputs(outputs, input_size)
+    class_ids = scores.argmax(axis=-1)
+    best = np.take_along_axis(scores, class_ids[..., None], axis=-1)[..., 0]
+
+    results: List[List[Dict[str, object]]] = []
+    for b in range(boxes.shape[0]):
+        candidates = np.flatnonzero(best[b] >= conf_threshold)
+        if candidates.size > max_candidates:
+            top = np.argpartition(-best[b, candidates], max_candidates - 1)[:max_candidates]
+            candidates = candidates[top]
+        keep = candidates[fast_nms(boxes[b, candidates], best[b, candidates], class_ids[b, candidates], iou_threshold)]
+        keep = keep[:max_detections]
+        kept_boxes = np.clip(boxes[b, keep], 0.0, 1.0).astype(np.float64).round(4).tolist()
+        kept_scores = best[b, keep].astype(np.float64).round(4).tolist()
+        kept_classes = class_ids[b, keep].tolist()
+        results.append(
+            [
+                {
+                    "label": labels[cls] if cls < len(labels) else str(cls),
+                    "class_id": cls,
+                    "score": score,
+                    "box": box,
+                }
+                for cls, score, box in zip(kept_classes, kept_scores, kept_boxes)
+            ]
+        )
+    return results
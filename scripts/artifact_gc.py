@@ -0,0 +1,68 @@
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "base-image" / "common"))
+
+from lifecycle_helper import (  # noqa: E402
+    DEFAULT_CACHE_RETENTION_POLICY,
+    DEFAULT_RETENTION_POLICY,
+    collect_cache_garbage,
+    collect_garbage,
+)
+
+
+def format_bytes(num: int) -> str:
+    for unit in ["B", "KB", "MB", "GB"]:
+        if num < 1024:
+            return f"{num:.1f} {unit}"
+        num /= 1024.0
+    return f"{num:.1f} TB"
+
+
+def print_report(report: dict) -> None:
+    mode = "DRY-RUN" if report["dry_run"] else "EXECUTE"
+    print(f"--- artifact GC ({mode}) s3://{report['bucket']}/{report['root']} ---")
+    print(f"Scanned objects: {report['scanned_objects']}")
+    print(f"Expired objects: {report['expired_objects']}")
+    if report.get("kept_referenced"):
+        print(f"Kept (referenced by retained bundles): {report['kept_referenced']}")
+    print(f"Reclaimed:       {format_bytes(report['reclaimed_bytes'])}")
+    if not report["dry_run"]:
+        print(f"Deleted objects: {report['deleted_objects']}")
+    for prefix, entry in sorted(report["by_prefix"].items(), key=lambda kv: kv[1]["bytes"], reverse=True):
+        print(f"  {prefix:<24} {entry['objects']:>8} objs  {format_bytes(entry['bytes'])}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="FAVE artifact garbage collector")
+    parser.add_argument("--bucket", default=os.getenv("ARTIFACT_BUCKET", "fave-artifacts"), help="Artifact bucket")
+    parser.add_argument("--root", default="requests/", help="Key prefix holding per-request artifacts")
+    parser.add_argument("--policy", help="JSON file mapping stage prefix -> retention rule")
+    parser.add_argument(
+        "--cache-ttl-hours",
+        type=float,
+        default=DEFAULT_CACHE_RETENTION_POLICY["cache/transcripts/"]["max_age_hours"],
+        help="Age after which cache/transcripts/ entries expire (0 keeps the cache)",
+    )
+    parser.add_argument("--execute", action="store_true", help="Actually delete (default is a dry-run report)")
+    parser.add_argument("--json", action="store_true", help="Print the raw JSON reports")
+    args = parser.parse_args()
+
+    policy = DEFAULT_RETENTION_POLICY
+    if args.policy:
+        policy = json.loads(Path(args.policy).read_text())
+
+    reports = [collect_garbage(bucket=args.bucket, root=args.root, policy=policy, dry_run=not args.execute)]
+    if args.cache_ttl_hours > 0:
+        cache_policy = {"cache/transcripts/": {"max_age_hours": args.cache_ttl_hours}}
+        reports.append(collect_cache_garbage(bucket=args.bucket, policy=cache_policy, dry_run=not args.execute))
+
+    if args.json:
+        print(json.dumps(reports, indent=2))
+        sys.exit(0)
+
+    for report in reports:
+        print_report(report)
@@ -0,0 +1,106 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT / "base-image" / "common"))
+sys.path.append(str(ROOT / "functions" / "stage-object-detector"))
+sys.path.append(str(ROOT / "scripts"))
+
+from ort_session import create_session  # noqa: E402
+from quantize_detector import MODELS_DIR, load_frames, to_tensor  # noqa: E402
+from yolo_postprocess import box_iou, postprocess  # noqa: E402
+
+
+def run_frames(sess, frames: np.ndarray, batch: int):
+    """Per-frame outputs plus per-run latencies (ms) for ``frames`` in batches of ``batch``."""
+    name = sess.get_inputs()[0].name
+    outputs, latencies = [], []
+    for start in range(0, len(frames), batch):
+        tensor = to_tensor(frames[start:start + batch])
+        t0 = time.perf_counter()
+        result = sess.run(None, {name: tensor})
+        latencies.append((time.perf_counter() - t0) * 1000)
+        outputs.append(result)
+    return outputs, np.array(latencies)
+
+
+def batch_size_for(sess, requested: int) -> int:
+    """``requested`` if the model's batch dimension is dynamic, else 1 (fixed-batch exports)."""
+    return 1 if isinstance(sess.get_inputs()[0].shape[0], int) else requested
+
+
+def detections_for(outputs, size: int, labels):
+    detections = []
+    for result in outputs:
+        detections.extend(postprocess(result, size, labels=labels))
+    return detections
+
+
+def agreement(reference, candidate, iou_threshold: float = 0.5):
+    """Recall and precision of ``candidate`` against ``reference``: same label and IoU >= threshold."""
+    matched_ref = matched_cand = total_ref = total_cand = 0
+    for ref, cand in zip(reference, candidate):
+        total_ref += len(ref)
+        total_cand += len(cand)
+        if not ref or not cand:
+            continue
+        ref_boxes = np.array([d["box"] for d in ref], dtype=np.float32)
+        cand_boxes = np.array([d["box"] for d in cand], dtype=np.float32)
+        same = np.array([[r["label"] == c["label"] for c in cand] for r in ref])
+        ious = box_iou(np.repeat(ref_boxes, len(cand), axis=0), np.tile(cand_boxes, (len(ref), 1))).reshape(len(ref), len(cand))
+        hits = same & (ious >= iou_threshold)
+        matched_ref += int(hits.any(axis=1).sum())
+        matched_cand += int(hits.any(axis=0).sum())
+    recall = matched_ref / total_ref if total_ref else 1.0
+    precision = matched_cand / total_cand if total_cand else 1.0
+    return recall, precision, total_ref, total_cand
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="FP32 vs INT8 detector latency, throughput and detection agreement")
+    parser.add_argument("--fp32", default=str(MODELS_DIR / "model.onnx"))
+    parser.add_argument("--int8", default=str(MODELS_DIR / "model.int8.onnx"))
+    parser.add_argument("--frames", type=int, default=32, help="Number of benchmark frames")
+    parser.add_argument("--frames-dir", help="Benchmark on real frames instead of synthetic ones")
+    parser.add_argument("--size", type=int, default=416)
+    parser.add_argument(
+        "--batch", type=int, default=8, help="Batch size for the throughput run (1 for fixed-batch models)"
+    )
+    parser.add_argument("--cpu-limit", type=float, help="Threads to size the sessions for (default: CPU quota)")
+    args = parser.parse_args()
+
+    for path in (args.fp32, args.int8):
+        if not Path(path).exists():
+            sys.exit(f"{path} not found (run scripts/quantize_detector.py for the INT8 model)")
+
+    labels = (MODELS_DIR / "coco.names").read_text().splitlines()
+    # Seed differs from the default calibration seed so frames are not the calibration set.
+    frames = load_frames(args.frames_dir, args.frames, args.size, seed=1)
+
+    results = {}
+    print(f"{'model':<6} {'p50_ms':>8} {'p95_ms':>8} {'batch':>6} {'frames_per_s':>13} {'size_mb':>8}")
+    for name, path in (("fp32", args.fp32), ("int8", args.int8)):
+        sess = create_session(path, cache_dir=None, cpu_limit=args.cpu_limit)
+        run_frames(sess, frames[:2], 1)  # warm-up
+        outputs, single = run_frames(sess, frames, 1)
+        batch = batch_size_for(sess, args.batch)
+        _, batched = run_frames(sess, frames, batch)
+        results[name] = (outputs, detections_for(outputs, args.size, labels))
+        print(
+            f"{name:<6} {np.percentile(single, 50):>8.1f} {np.percentile(single, 95):>8.1f} {batch:>6} "
+            f"{len(frames) / (batched.sum() / 1000):>13.1f} {Path(path).stat().st_size / 1e6:>8.1f}"
+        )
+
+    fp32_outputs, fp32_dets = results["fp32"]
+    int8_outputs, int8_dets = results["int8"]
+    raw_error = max(
+        float(np.max(np.abs(a - b))) for ra, rb in zip(fp32_outputs, int8_outputs) for a, b in zip(ra, rb)
+    )
+    recall, precision, n_ref, n_cand = agreement(fp32_dets, int8_dets)
+    print(f"detections: fp32={n_ref} int8={n_cand}")
+    print(f"agreement vs fp32 (same label, IoU>=0.5): recall={recall:.3f} precision={precision:.3f}")
+    print(f"max abs raw output difference: {raw_error:.4f}")
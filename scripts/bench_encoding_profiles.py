@@ -0,0 +1,67 @@
+import argparse
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT / "base-image" / "common"))
+sys.path.append(str(ROOT / "functions" / "stage-ffmpeg-2"))
+
+from stage_ffmpeg2_service import ENCODING_PROFILES, StageFFmpeg2Service  # noqa: E402
+
+
+def make_clip(path: Path, seconds: float, size: str, rate: int) -> None:
+    """Synthetic clip: moving testsrc2 pattern plus a sine tone, as ffmpeg-1 would cut it."""
+    cmd = [
+        "ffmpeg", "-y", "-v", "error",
+        "-f", "lavfi", "-i", f"testsrc2=size={size}:rate={rate}:duration={seconds}",
+        "-f", "lavfi", "-i", f"sine=frequency=440:sample_rate=44100:duration={seconds}",
+        "-c:v", "libx264", "-preset", "ultrafast", "-crf", "18", "-c:a", "aac", "-shortest", str(path),
+    ]
+    subprocess.run(cmd, check=True)
+
+
+def encode(service: StageFFmpeg2Service, profile: dict, source: Path, dest: Path) -> float:
+    cmd = ["ffmpeg", "-y", "-v", "error", "-i", str(source)] + service._video_encode_args(profile) + [str(dest)]
+    start = time.perf_counter()
+    subprocess.run(cmd, check=True)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Encode time and size per stage-ffmpeg-2 encoding profile")
+    parser.add_argument("--seconds", type=float, default=10.0, help="Length of each synthetic clip")
+    parser.add_argument("--sizes", default="640x360,1280x720,1920x1080", help="Comma-separated clip resolutions")
+    parser.add_argument("--rate", type=int, default=30, help="Frame rate of the synthetic clips")
+    parser.add_argument("--repeats", type=int, default=2, help="Best-of repeats per measurement")
+    parser.add_argument(
+        "--presets", default="", help="Comma-separated x264 presets to also try on each encoding profile"
+    )
+    args = parser.parse_args()
+
+    if shutil.which("ffmpeg") is None:
+        sys.exit("ffmpeg not found on PATH")
+
+    # Audio-only profiles never run libx264, so there is nothing to time for them.
+    encoding = [(name, profile) for name, profile in ENCODING_PROFILES.items() if profile["encode_video"]]
+    for preset in filter(None, args.presets.split(",")):
+        encoding += [(f"{name}@{preset}", {**profile, "preset": preset}) for name, profile in list(encoding) if "@" not in name]
+    service = StageFFmpeg2Service()
+    print(f"profiles that encode video: {', '.join(name for name, _ in encoding)}")
+    print(f"encoder threads: {service.encoder_threads}")
+    print(f"{'size':>10} {'profile':<18} {'encode_s':>9} {'x_realtime':>11} {'output_kb':>10}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_path = Path(tmp_dir)
+        for size in args.sizes.split(","):
+            source = tmp_path / f"clip_{size}.mp4"
+            make_clip(source, args.seconds, size, args.rate)
+            for name, profile in encoding:
+                dest = tmp_path / f"out_{size}_{name}.mp4"
+                seconds = min(encode(service, profile, source, dest) for _ in range(args.repeats))
+                print(
+                    f"{size:>10} {name:<18} {seconds:>9.2f} {args.seconds / seconds:>11.1f} "
+                    f"{dest.stat().st_size / 1024:>10.0f}"
+                )
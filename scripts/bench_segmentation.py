@@ -0,0 +1,84 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "functions" / "stage-librosa"))
+
+import librosa  # noqa: E402
+
+from segmentation import frame_power, power_to_db, select_intervals  # noqa: E402
+from vad import VAD_SAMPLE_RATE, speech_intervals  # noqa: E402
+
+MIN_LEN = 0.1
+MAX_LEN = 30
+
+
+def synthetic_speech(duration: float, sr: int, seed: int = 0) -> np.ndarray:
+    """Voiced-like bursts (harmonics of a wandering pitch, syllable-rate AM) between noisy pauses."""
+    rng = np.random.default_rng(seed)
+    parts = []
+    total = 0
+    while total < duration * sr:
+        pause = rng.normal(0, 10 ** rng.uniform(-3.5, -2.5), int(sr * rng.uniform(0.2, 1.5)))
+        n = int(sr * rng.uniform(0.5, 6))
+        t = np.arange(n) / sr
+        f0 = rng.uniform(100, 220) * (1 + 0.05 * np.sin(2 * np.pi * 0.7 * t))
+        phase = 2 * np.pi * np.cumsum(f0) / sr
+        voiced = sum(np.sin(k * phase) / k for k in range(1, 12))
+        envelope = 0.5 * (1 + np.sin(2 * np.pi * rng.uniform(3, 6) * t)) ** 2
+        parts.extend([pause, 0.1 * voiced * envelope + rng.normal(0, 0.002, n)])
+        total += len(pause) + n
+    return np.concatenate(parts)[: int(duration * sr)].astype(np.float32)
+
+
+def librosa_loop(y: np.ndarray, duration: float) -> int:
+    """The original per-threshold librosa.effects.split search."""
+    min_clips, max_clips = max(1, duration / MAX_LEN), max(1, duration / MIN_LEN)
+    for top_db in range(24, 50):
+        clips = librosa.effects.split(y, top_db=top_db)
+        if min_clips <= len(clips) <= max_clips:
+            break
+    return len(clips)
+
+
+def envelope_search(y: np.ndarray, duration: float) -> int:
+    min_clips, max_clips = max(1, duration / MAX_LEN), max(1, duration / MIN_LEN)
+    clips, _ = select_intervals(power_to_db(frame_power(y)), len(y), min_clips, max_clips)
+    return len(clips)
+
+
+def vad_segments(pcm: np.ndarray) -> int:
+    clips, _ = speech_intervals(pcm, MIN_LEN, MAX_LEN)
+    return len(clips)
+
+
+def timed(fn, *args, repeats: int):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare librosa energy and WebRTC VAD segmenters")
+    parser.add_argument("--durations", default="30,120,600", help="Comma-separated audio lengths in seconds")
+    parser.add_argument("--sample-rate", type=int, default=22050, help="Rate of the energy backends")
+    parser.add_argument("--repeats", type=int, default=3, help="Best-of repeats per measurement")
+    parser.add_argument("--skip-librosa-loop", action="store_true", help="Skip the slow original loop")
+    args = parser.parse_args()
+
+    print(f"{'audio_s':>8} {'backend':<16} {'time_ms':>10} {'ms/audio_s':>11} {'clips':>6}")
+    for duration in (float(d) for d in args.durations.split(",")):
+        y = synthetic_speech(duration, args.sample_rate)
+        pcm = (synthetic_speech(duration, VAD_SAMPLE_RATE) * 32767).astype(np.int16)
+        runs = [("energy-envelope", envelope_search, (y, duration)), ("webrtc-vad", vad_segments, (pcm,))]
+        if not args.skip_librosa_loop:
+            runs.insert(0, ("librosa-loop", librosa_loop, (y, duration)))
+        for name, fn, fn_args in runs:
+            seconds, clips = timed(fn, *fn_args, repeats=args.repeats)
+            print(f"{duration:>8.0f} {name:<16} {seconds * 1000:>10.1f} {seconds * 1000 / duration:>11.3f} {clips:>6}")
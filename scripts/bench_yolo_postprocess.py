@@ -0,0 +1,67 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT / "functions" / "stage-object-detector"))
+
+from yolo_postprocess import postprocess  # noqa: E402
+
+
+def synthetic_heads(batch: int, input_size: int, n_classes: int, hot_fraction: float, rng: np.random.Generator):
+    """Raw tiny-YOLOv4 heads (NCHW logits) where ``hot_fraction`` of the anchors clear the threshold."""
+    heads = []
+    for stride in (32, 16):
+        grid = input_size // stride
+        head = rng.normal(-6.0, 1.0, size=(batch, 3, 5 + n_classes, grid, grid)).astype(np.float32)
+        head[:, :, 0:4] = rng.normal(0.0, 0.5, size=(batch, 3, 4, grid, grid))
+        hot = rng.random((batch, 3, grid, grid)) < hot_fraction
+        head[:, :, 4] = np.where(hot, 4.0, head[:, :, 4])
+        cls = rng.integers(0, n_classes, size=(batch, 3, grid, grid))
+        for c in range(n_classes):
+            head[:, :, 5 + c] = np.where(hot & (cls == c), 4.0, head[:, :, 5 + c])
+        heads.append(head.reshape(batch, 3 * (5 + n_classes), grid, grid))
+    return heads
+
+
+def best_of(fn, repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="tiny-YOLOv4 post-processing time vs candidate box count")
+    parser.add_argument("--input-size", type=int, default=416)
+    parser.add_argument("--batch", type=int, default=1)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--model", help="Optional ONNX model to time inference against")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    labels = (ROOT / "functions" / "stage-object-detector" / "models" / "coco.names").read_text().splitlines()
+    n_boxes = 3 * ((args.input_size // 32) ** 2 + (args.input_size // 16) ** 2)
+
+    if args.model:
+        import onnxruntime as ort
+
+        sess = ort.InferenceSession(args.model)
+        feed = {sess.get_inputs()[0].name: rng.random((args.batch, 3, args.input_size, args.input_size), dtype=np.float32)}
+        print(f"inference: {best_of(lambda: sess.run(None, feed), args.repeats):.2f} ms per batch of {args.batch}")
+
+    print(f"anchors per frame: {n_boxes}")
+    print(f"{'hot_fraction':>12} {'candidates':>10} {'detections':>10} {'postprocess_ms':>15}")
+    for fraction in (0.001, 0.01, 0.05, 0.2, 0.5):
+        heads = synthetic_heads(args.batch, args.input_size, len(labels), fraction, rng)
+        detections = postprocess(heads, args.input_size, labels=labels)
+        candidates = int(sum(
+            (h.reshape(args.batch, 3, 5 + len(labels), -1)[:, :, 4] > 0).sum() for h in heads
+        ))
+        ms = best_of(lambda: postprocess(heads, args.input_size, labels=labels), args.repeats)
+        print(f"{fraction:>12} {candidates:>10} {sum(len(d) for d in detections):>10} {ms:>15.2f}")
@@ -0,0 +1,120 @@
+import argparse
+import sys
+from pathlib import Path
+from typing import Iterator, Optional
+
+import cv2
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+MODELS_DIR = ROOT / "functions" / "stage-object-detector" / "models"
+
+
+def synthetic_frames(count: int, size: int = 416, seed: int = 0) -> np.ndarray:
+    """
+    Deterministic RGB frames (N, size, size, 3) uint8 with natural-ish statistics.
+
+    Smooth gradients, filled shapes of varying contrast and sensor-like noise,
+    so activation ranges resemble real footage more than uniform noise does.
+    """
+    rng = np.random.default_rng(seed)
+    yy, xx = np.mgrid[0:size, 0:size].astype(np.float32) / size
+    frames = np.empty((count, size, size, 3), dtype=np.uint8)
+    for i in range(count):
+        base = rng.uniform(0, 255, 3)
+        slope = rng.uniform(-120, 120, (2, 3))
+        img = base + xx[..., None] * slope[0] + yy[..., None] * slope[1]
+        img = np.clip(img, 0, 255).astype(np.uint8)
+        for _ in range(rng.integers(3, 12)):
+            color = tuple(int(c) for c in rng.integers(0, 256, 3))
+            x1, y1 = (int(v) for v in rng.integers(0, size, 2))
+            w, h = (int(v) for v in rng.integers(size // 16, size // 2, 2))
+            if rng.random() < 0.5:
+                cv2.rectangle(img, (x1, y1), (x1 + w, y1 + h), color, -1)
+            else:
+                cv2.ellipse(img, (x1, y1), (w // 2, h // 2), float(rng.uniform(0, 180)), 0, 360, color, -1)
+        noise = rng.normal(0, 6, img.shape)
+        frames[i] = np.clip(img + noise, 0, 255).astype(np.uint8)
+    return frames
+
+
+def load_frames(frames_dir: Optional[str], count: int, size: int, seed: int = 0) -> np.ndarray:
+    """Frames from ``frames_dir`` (JPEG/PNG, resized like the detector) or synthetic ones."""
+    if not frames_dir:
+        return synthetic_frames(count, size, seed)
+    paths = sorted(p for p in Path(frames_dir).iterdir() if p.suffix.lower() in {".jpg", ".jpeg", ".png"})[:count]
+    if not paths:
+        sys.exit(f"No images found in {frames_dir}")
+    frames = []
+    for path in paths:
+        img = cv2.cvtColor(cv2.imread(str(path)), cv2.COLOR_BGR2RGB)
+        frames.append(cv2.resize(img, (size, size)))
+    return np.stack(frames)
+
+
+def to_tensor(frames: np.ndarray) -> np.ndarray:
+    """NHWC uint8 -> NCHW float32 in [0, 1], the detector's preprocessing."""
+    return frames.transpose(0, 3, 1, 2).astype(np.float32) / 255.0
+
+
+class FrameCalibrationReader:
+    """Feeds calibration frames one at a time to onnxruntime's static quantizer (CalibrationDataReader protocol)."""
+
+    def __init__(self, input_name: str, frames: np.ndarray) -> None:
+        self.input_name = input_name
+        self.frames = frames
+        self._iter: Optional[Iterator[dict]] = None
+
+    def get_next(self) -> Optional[dict]:
+        if self._iter is None:
+            self._iter = ({self.input_name: to_tensor(self.frames[i:i + 1])} for i in range(len(self.frames)))
+        return next(self._iter, None)
+
+    def rewind(self) -> None:
+        self._iter = None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Quantize the object detector model to INT8")
+    parser.add_argument("--model", default=str(MODELS_DIR / "model.onnx"), help="FP32 ONNX model")
+    parser.add_argument("--output", default=str(MODELS_DIR / "model.int8.onnx"), help="Where to write the INT8 model")
+    parser.add_argument("--mode", choices=["static", "dynamic"], default="static")
+    parser.add_argument("--size", type=int, default=416, help="Model input size")
+    parser.add_argument("--calibration-frames", type=int, default=64)
+    parser.add_argument("--frames-dir", help="Calibrate on real frames instead of synthetic ones")
+    parser.add_argument("--per-channel", action="store_true", help="Per-channel weight scales (static mode)")
+    parser.add_argument("--skip-preprocess", action="store_true", help="Skip shape inference/graph cleanup before quantizing")
+    args = parser.parse_args()
+
+    import onnxruntime as ort
+    from onnxruntime.quantization import QuantFormat, QuantType, quantize_dynamic, quantize_static
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    source = Path(args.model)
+    output = Path(args.output)
+    if not args.skip_preprocess:
+        # Shape inference and constant folding give the quantizer a cleaner graph to annotate.
+        prepared = output.with_suffix(".prep.onnx")
+        quant_pre_process(str(source), str(prepared))
+        source = prepared
+
+    if args.mode == "dynamic":
+        # Weights only; activations are quantized on the fly at run time.
+        quantize_dynamic(str(source), str(output), weight_type=QuantType.QUInt8)
+    else:
+        input_name = ort.InferenceSession(str(source), providers=["CPUExecutionProvider"]).get_inputs()[0].name
+        frames = load_frames(args.frames_dir, args.calibration_frames, args.size)
+        reader = FrameCalibrationReader(input_name, frames)
+        quantize_static(
+            str(source),
+            str(output),
+            reader,
+            quant_format=QuantFormat.QDQ,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            per_channel=args.per_channel,
+        )
+
+    if source != Path(args.model):
+        source.unlink(missing_ok=True)
+    print(f"wrote {output} ({output.stat().st_size / 1e6:.1f} MB, {args.mode})")
@@ -45,23 +45,23 @@ from stage_object_detector_service import StageObjectDetectorService
 from schemas import StagePayload, ArtifactRef
 
 class TestStages(unittest.TestCase):
-    @patch("stage_ffmpeg3_service.download_file")
+    @patch("stage_ffmpeg3_service.media_source")
     @patch("stage_ffmpeg3_service.upload_file")
-    @patch("stage_ffmpeg3_service.StageFFmpeg3Service._run_tar")
+    @patch("stage_ffmpeg3_service.read_bundle")
     @patch("subprocess.run")
-    def test_ffmpeg3(self, mock_run, mock_tar, mock_upload, mock_download):
+    def test_ffmpeg3(self, mock_run, mock_bundle, mock_upload, mock_download):
         # Setup
         service = StageFFmpeg3Service()
         payload = StagePayload(
             request_id="test-req",
             stage="stage-ffmpeg-3",
-            input_uri="s3://bucket/clip.tar.gz",
+            input_uri="s3://bucket/clip.json",
             config={},
             fanout={}
         )
         
         # Mocks
-        mock_download.return_value = Path("/tmp/dummy.tar.gz")
+        mock_download.return_value = Path("/tmp/clip_compressed.mp4")
         
         # We need to mock Path.glob to return something
         # Since _process does tmp_path.glob("*.mp4") and tmp_path.glob("frame-*.jpg")
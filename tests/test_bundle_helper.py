@@ -0,0 +1,63 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "base-image", "common")))
+
+os.environ.setdefault("ARTIFACT_BUCKET", "test-bucket")
+
+import bundle_helper
+
+
+class TestBundles(unittest.TestCase):
+    def test_write_then_fetch_only_requested_members(self):
+        store = {}
+
+        def fake_upload(path, uri, extra_args=None):
+            store[uri] = Path(path).read_bytes()
+            return uri
+
+        def fake_write_json(data, uri):
+            store[uri] = data
+            return uri
+
+        def fake_download(uri, dest):
+            Path(dest).parent.mkdir(parents=True, exist_ok=True)
+            Path(dest).write_bytes(store[uri])
+            return Path(dest)
+
+        with tempfile.TemporaryDirectory() as tmp_dir, \
+             patch.object(bundle_helper, "upload_file", side_effect=fake_upload), \
+             patch.object(bundle_helper, "write_json", side_effect=fake_write_json), \
+             patch.object(bundle_helper, "read_json", side_effect=lambda uri: store[uri]), \
+             patch.object(bundle_helper, "download_file", side_effect=fake_download) as mock_download:
+            audio = Path(tmp_dir) / "audio.wav"
+            audio.write_bytes(b"RIFF")
+            manifest_uri = bundle_helper.write_bundle(
+                "s3://b/requests/r/stage-ffmpeg-0/media.json",
+                files={"audio.wav": audio},
+                references={"video.mp4": "s3://b/requests/r/input/original.mp4"},
+            )
+
+            bundle = bundle_helper.read_bundle(manifest_uri)
+            self.assertEqual(bundle["members"]["audio.wav"]["uri"], "s3://b/requests/r/stage-ffmpeg-0/media/audio.wav")
+            self.assertEqual(bundle_helper.member_uri(bundle, "video.mp4"), "s3://b/requests/r/input/original.mp4")
+
+            out_dir = Path(tmp_dir) / "out"
+            fetched = bundle_helper.fetch_members(bundle, ["audio.wav"], out_dir)
+            self.assertEqual(fetched["audio.wav"].read_bytes(), b"RIFF")
+            # The referenced video is never downloaded.
+            self.assertEqual(mock_download.call_count, 1)
+
+    def test_missing_member(self):
+        bundle = {"format": bundle_helper.BUNDLE_FORMAT, "members": {}}
+        with self.assertRaises(FileNotFoundError):
+            bundle_helper.fetch_members(bundle, ["clip.wav"], "/tmp")
+        self.assertEqual(bundle_helper.fetch_members(bundle, ["clip.wav"], "/tmp", required=False), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "base-image", "common")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "functions", "stage-deepspeech")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "functions", "orchestrator")))
+
+os.environ.setdefault("ARTIFACT_BUCKET", "test-bucket")
+
+import orchestrator_service
+import stage_deepspeech_service as deepspeech
+from schemas import ArtifactRef, OrchestratorRequest, StagePayload
+
+
+class TestDeepSpeechBatch(unittest.TestCase):
+    def test_one_output_per_clip_in_order(self):
+        uris = [f"s3://b/requests/r1/stage-ffmpeg-2/clip_{idx:03d}.json" for idx in range(5)]
+        payload = StagePayload(request_id="r1", stage="stage-deepspeech", input_uri=uris[0], input_uris=uris)
+        seen = []
+
+        def fake_process(clip_payload):
+            seen.append(clip_payload.input_uri)
+            self.assertEqual(clip_payload.input_uris, [])
+            return clip_payload.input_uri.replace("stage-ffmpeg-2", "stage-deepspeech")
+
+        service = deepspeech.StageDeepSpeechService()
+        with patch.object(service, "_process", side_effect=fake_process):
+            result = service.handle(payload.model_dump_json())
+
+        self.assertEqual(sorted(seen), uris)
+        self.assertEqual([o["metadata"]["input_uri"] for o in result["outputs"]], uris)
+        self.assertEqual(result["outputs"][3]["uri"], "s3://b/requests/r1/stage-deepspeech/clip_003.json")
+
+
+class TestOrchestratorBatching(unittest.TestCase):
+    def test_deepspeech_called_once_per_batch(self):
+        with patch.dict(os.environ, {"DEEPSPEECH_BATCH_SIZE": "3"}):
+            service = orchestrator_service.OrchestratorService()
+        calls = []
+        original = service._execute_stage
+
+        def record(stage_name, input_uri, *args, **kwargs):
+            calls.append((stage_name, kwargs.get("input_uris")))
+            result = original(stage_name, input_uri, *args, **kwargs)
+            if stage_name == "stage-ffmpeg-1":
+                result.outputs = [ArtifactRef(type="video", uri=f"s3://b/clip_{i}.mp4") for i in range(7)]
+            return result
+
+        req = OrchestratorRequest(video_uri="s3://b/in.mp4")
+        with patch.object(orchestrator_service, "append_stage_entry"), \
+             patch.object(service, "_execute_stage", side_effect=record):
+            output = service._run_pipeline("r1", "s3://b/in.mp4", req, is_dry_run=True)
+
+        batches = [uris for stage, uris in calls if stage == "stage-deepspeech"]
+        self.assertEqual([len(b) for b in batches], [3, 3, 1])
+        self.assertEqual(sum(stage == "stage-ffmpeg-3" for stage, _ in calls), 7)
+        self.assertEqual(len(output["clips"]), 7)
+        ds_entry = output["clips"][4]["stages"][1]
+        self.assertEqual((ds_entry["stage"], ds_entry["batch_clip_indices"]), ("stage-deepspeech", [3, 4, 5]))
+        self.assertEqual(len(ds_entry["outputs"]), 1)
+
+    def test_batch_cost_counted_once(self):
+        with patch.dict(os.environ, {"DEEPSPEECH_BATCH_SIZE": "3"}):
+            service = orchestrator_service.OrchestratorService()
+        batch_metrics = []
+        original = service._execute_stage
+
+        def record(stage_name, input_uri, *args, **kwargs):
+            result = original(stage_name, input_uri, *args, **kwargs)
+            if stage_name == "stage-ffmpeg-1":
+                result.outputs = [ArtifactRef(type="video", uri=f"s3://b/clip_{i}.mp4") for i in range(7)]
+            if stage_name == "stage-deepspeech":
+                result.metrics.duration_ms = 1000 + len(batch_metrics)
+                result.metrics.cost_unit = 0.3 + len(batch_metrics)
+                batch_metrics.append(result.metrics.model_dump())
+            return result
+
+        req = OrchestratorRequest(video_uri="s3://b/in.mp4")
+        with patch.object(orchestrator_service, "append_stage_entry"), \
+             patch.object(service, "_execute_stage", side_effect=record):
+            output = service._run_pipeline("r1", "s3://b/in.mp4", req, is_dry_run=True)
+
+        # Sum the way scripts/final_analysis.py does: over every clip stage entry.
+        ds_entries = [
+            stage for clip in output["clips"] for stage in clip["stages"] if stage["stage"] == "stage-deepspeech"
+        ]
+        self.assertEqual(len(ds_entries), 7)
+        self.assertAlmostEqual(
+            sum(e["metrics"]["cost_unit"] for e in ds_entries), sum(m["cost_unit"] for m in batch_metrics)
+        )
+        self.assertEqual(
+            sum(e["metrics"]["duration_ms"] for e in ds_entries), sum(m["duration_ms"] for m in batch_metrics)
+        )
+        first = ds_entries[0]["metrics"]
+        self.assertEqual((first["duration_ms"], first["extra"]["batch_size"]), (334, 3))
+        self.assertEqual(first["extra"]["batch_cost_unit"], 0.3)
+
+
+if __name__ == "__main__":
+    unittest.main()
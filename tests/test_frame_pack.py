@@ -0,0 +1,257 @@
+import os
+import re
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "base-image", "common")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "functions", "stage-ffmpeg-3")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "functions", "stage-object-detector")))
+
+os.environ.setdefault("ARTIFACT_BUCKET", "test-bucket")
+
+import stage_ffmpeg3_service as ffmpeg3
+import stage_object_detector_service as detector
+from frame_dedup import representatives, thumbnails
+
+SIZE = 8
+LABEL_PATH = os.path.join(os.path.dirname(__file__), "..", "functions", "stage-object-detector", "models", "coco.names")
+BUNDLE = {
+    "format": "fave-bundle/1",
+    "members": {"clip.mp4": {"uri": "s3://b/requests/r1/stage-ffmpeg-1/clip_000.mp4"}},
+    "metadata": {},
+}
+
+
+class FakeSession:
+    def __init__(self):
+        self.batches = []
+
+    def run(self, _outputs, feeds):
+        tensor = next(iter(feeds.values()))
+        self.batches.append(tensor)
+        boxes = np.tile(np.array([0.1, 0.1, 0.5, 0.5], dtype=np.float32), (tensor.shape[0], 1, 1, 1))
+        confs = np.zeros((tensor.shape[0], 1, 80), dtype=np.float32)
+        confs[:, 0, 0] = 0.9
+        return [boxes, confs]
+
+
+def _frames(n):
+    return (np.arange(n * SIZE * SIZE * 3) % 251).astype(np.uint8).reshape(n, SIZE, SIZE, 3)
+
+
+class TestTensorPack(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.store = Path(self.tmp.name) / "store"
+        self.store.mkdir()
+
+    def _write_pack(self, frames, trailing=b""):
+        calls, bundles = [], []
+
+        def fake_run(cmd, **_kwargs):
+            calls.append(cmd)
+            Path(cmd[-1]).write_bytes(frames.tobytes() + trailing)
+            # showinfo logs one line per frame; the last one is past a -frames:v cap.
+            showinfo = b"".join(
+                b"[Parsed_showinfo_2 @ 0x1] n:%4d pts:%7d pts_time:%g   duration:1\n" % (n, n * 45000, n * 1.5)
+                for n in range(frames.shape[0] + 1)
+            )
+            return SimpleNamespace(stdout=b"", stderr=b"frame=  3 fps=0.0\n" + showinfo)
+
+        def fake_write_bundle(uri, files=None, references=None, metadata=None):
+            stored = self.store / "frames.npy"
+            stored.write_bytes(Path(files["frames.npy"]).read_bytes())
+            bundles.append(
+                {"format": "fave-bundle/1", "members": {"frames.npy": {"uri": str(stored)}}, "metadata": metadata}
+            )
+            return uri
+
+        payload = ffmpeg3.StagePayload(
+            request_id="r1", stage="stage-ffmpeg-3", input_uri="s3://b/requests/r1/stage-deepspeech/clip_000.json"
+        )
+        with patch.dict(os.environ, {"FRAME_OUTPUT": "tensor", "TENSOR_SIZE": str(SIZE)}), \
+             patch.object(ffmpeg3.subprocess, "run", side_effect=fake_run), \
+             patch.object(ffmpeg3, "read_bundle", return_value=BUNDLE), \
+             patch.object(ffmpeg3, "media_source", side_effect=lambda uri, dest, stream: str(dest)), \
+             patch.object(ffmpeg3, "write_bundle", side_effect=fake_write_bundle):
+            outputs = ffmpeg3.StageFFmpeg3Service()._process(payload)
+        return outputs, calls[0], bundles[0]
+
+    def test_pack_is_loadable_npy(self):
+        frames = _frames(3)
+        outputs, cmd, bundle = self._write_pack(frames, trailing=b"\x01" * 10)
+        self.assertEqual(len(outputs), 1)
+        self.assertEqual(outputs[0].type, "tensor_pack")
+        self.assertEqual(outputs[0].metadata["frames"], 3)
+        self.assertIn("rgb24", cmd)
+        self.assertTrue(cmd[cmd.index("-vf") + 1].endswith(f"scale={SIZE}:{SIZE}:flags=bilinear,showinfo"))
+        self.assertEqual(bundle["metadata"]["frame_indices"], [1, 2, 3])
+        self.assertEqual(bundle["metadata"]["frame_times"], [0.0, 1.5, 3.0])
+        loaded = np.load(bundle["members"]["frames.npy"]["uri"], mmap_mode="r")
+        np.testing.assert_array_equal(loaded, frames)
+
+    def _detect(self, frames, env):
+        _, _, bundle = self._write_pack(frames)
+        written = []
+
+        def fake_fetch(bundle_, names, dest):
+            return {name: Path(bundle_["members"][name]["uri"]) for name in names}
+
+        with patch.dict(os.environ, {"MODEL_PATH": "/nonexistent", "LABEL_PATH": LABEL_PATH, **env}):
+            service = detector.StageObjectDetectorService()
+        service.sess = FakeSession()
+        service.input_name = "input"
+        payload = detector.StagePayload(
+            request_id="r1",
+            stage="stage-object-detector",
+            input_uri="s3://b/requests/r1/stage-ffmpeg-3/clip_000/frames.json",
+            fanout={"clip_index": 0},
+        )
+        with patch.object(detector, "read_bundle", return_value=bundle), \
+             patch.object(detector, "fetch_members", side_effect=fake_fetch), \
+             patch.object(detector, "write_json", side_effect=lambda data, uri: written.append(data)):
+            uri, metadata = service._process(payload)
+        return service, uri, metadata, written[0]
+
+    def test_detector_batches_pack(self):
+        frames = _frames(5)
+        service, uri, metadata, written = self._detect(frames, {"DETECTOR_BATCH_SIZE": "2", "DEDUP_THRESHOLD": "0"})
+
+        self.assertTrue(uri.endswith("/clip_0/frames.json"))
+        self.assertEqual(metadata["frames"], 5)
+        self.assertEqual([b.shape for b in service.sess.batches], [(2, 3, SIZE, SIZE)] * 2 + [(1, 3, SIZE, SIZE)])
+        expected = frames[:2].transpose(0, 3, 1, 2).astype(np.float32) / 255.0
+        np.testing.assert_allclose(service.sess.batches[0], expected)
+        self.assertEqual([f["frame_index"] for f in written["frames"]], [1, 2, 3, 4, 5])
+        self.assertEqual([f["pts_time"] for f in written["frames"]], [0.0, 1.5, 3.0, 4.5, 6.0])
+        self.assertEqual(metadata["frames_dropped"], 0)
+
+    def test_detector_skips_near_duplicates(self):
+        base = _frames(2)
+        frames = np.stack([base[0], base[0], base[0] + 1, base[1], base[1]])
+        service, _, metadata, written = self._detect(frames, {"DETECTOR_BATCH_SIZE": "8"})
+        self.assertEqual(metadata["frames_dropped"], 3)
+        self.assertEqual(service.sess.batches[0].shape[0], 2)
+        self.assertEqual([f.get("duplicate_of") for f in written["frames"]], [None, 1, 1, None, 4])
+        self.assertEqual(written["frames"][1]["detections"], written["frames"][0]["detections"])
+        self.assertEqual(written["frames"][0]["detections"][0]["label"], "person")
+
+
+class TestModelSelection(unittest.TestCase):
+    def _service(self, int8_path):
+        with patch.dict(os.environ, {"MODEL_PATH": "/nonexistent", "MODEL_PATH_INT8": int8_path, "INT8_PROFILES": "fast"}):
+            service = detector.StageObjectDetectorService()
+        service.sess = FakeSession()
+        service.input_name = "input"
+        return service
+
+    def _payload(self, profile):
+        return detector.StagePayload(
+            request_id="r1", stage="stage-object-detector", input_uri="s3://b/f.jpg", config={"profile": profile}
+        )
+
+    def test_fast_profile_uses_int8(self):
+        int8_sess = FakeSession()
+        int8_sess.get_inputs = lambda: [SimpleNamespace(name="images")]
+        with tempfile.NamedTemporaryFile(suffix=".onnx") as model:
+            model.write(b"int8")
+            model.flush()
+            service = self._service(model.name)
+            with patch.object(detector, "create_session", return_value=int8_sess) as create:
+                self.assertEqual(service._model_for(self._payload("fast")), ("tiny-yolov4-int8", int8_sess, "images"))
+                self.assertEqual(service._model_for(self._payload("fast"))[1], int8_sess)
+                self.assertEqual(service._model_for(self._payload("default"))[0], "tiny-yolov4")
+        self.assertEqual(create.call_count, 1)
+
+    def test_missing_int8_model_falls_back_to_fp32(self):
+        service = self._service("/nonexistent/model.int8.onnx")
+        self.assertEqual(service._model_for(self._payload("fast")), ("tiny-yolov4", service.sess, "input"))
+
+
+class TestFrameDedup(unittest.TestCase):
+    def test_compares_against_last_kept_frame(self):
+        # A slow drift: each step is under the threshold, but the drift adds up.
+        frames = np.stack([np.full((SIZE, SIZE, 3), level, dtype=np.uint8) for level in (10, 11, 12, 13, 14)])
+        rep = representatives(thumbnails(frames), threshold=2.5)
+        self.assertEqual(rep.tolist(), [0, 0, 0, 3, 3])
+
+    def test_disabled_keeps_everything(self):
+        frames = np.zeros((3, SIZE, SIZE, 3), dtype=np.uint8)
+        self.assertEqual(representatives(thumbnails(frames), threshold=0).tolist(), [0, 1, 2])
+
+
+class TestSceneSampling(unittest.TestCase):
+    @staticmethod
+    def _service(env):
+        with patch.dict(os.environ, env):
+            return ffmpeg3.StageFFmpeg3Service()
+
+    @staticmethod
+    def _select(frame_filter, times, scores):
+        """Evaluate the scene select expression the way ffmpeg does, one frame at a time."""
+        (expr,) = re.findall(r"select='(.*)'", frame_filter)
+        kept, prev = [], float("nan")
+        for t, scene in zip(times, scores):
+            env = {"isnan": lambda x: x != x, "gte": lambda a, b: a >= b, "gt": lambda a, b: a > b}
+            if eval(expr, env, {"t": t, "prev_selected_t": prev, "scene": scene}):  # pylint: disable=eval-used
+                kept.append(t)
+                prev = t
+        return kept
+
+    def test_fixed_rate_by_default(self):
+        service = self._service({"FRAME_VF": "fps=1"})
+        self.assertEqual(service._frame_filter(), "fps=1")
+        self.assertEqual(service._sampling_output_args(), [])
+
+    def test_scene_filter_and_budget(self):
+        env = {
+            "FRAME_SAMPLING": "scene",
+            "SCENE_THRESHOLD": "0.25",
+            "SCENE_MIN_FPS": "0.2",
+            "SCENE_MAX_FPS": "4",
+            "FRAME_BUDGET": "16",
+        }
+        service = self._service(env)
+        self.assertEqual(
+            service._frame_filter(),
+            "select='isnan(prev_selected_t)+gte(t-prev_selected_t,0.25)*(gt(scene,0.25)+gte(t-prev_selected_t,5))'",
+        )
+        self.assertEqual(service._sampling_output_args(), ["-vsync", "vfr", "-frames:v", "16"])
+
+    def test_budget_spans_whole_clip(self):
+        service = self._service({"FRAME_SAMPLING": "scene", "SCENE_MAX_FPS": "4", "FRAME_BUDGET": "5"})
+        # 60 s at 25 fps with a cut every second: without the spread the budget
+        # would be spent on the first ~1 s at the 4 fps cap.
+        times = [n / 25 for n in range(60 * 25)]
+        scores = [1.0 if n % 25 == 0 else 0.0 for n in range(len(times))]
+        with patch.object(ffmpeg3.subprocess, "run", return_value=SimpleNamespace(stdout=b'{"format": {"duration": "60.0"}}')):
+            frame_filter = service._frame_filter(service._probe_duration("/tmp/clip.mp4"))
+        kept = self._select(frame_filter, times, scores)
+        self.assertEqual(kept, [0.0, 12.0, 24.0, 36.0, 48.0])
+        self.assertEqual(len(kept), service.frame_budget)
+
+    def test_fixed_mode_budget_thins_filter_output(self):
+        service = self._service({"FRAME_VF": "fps=1", "FRAME_BUDGET": "3"})
+        self.assertEqual(service._frame_filter(40.0), "fps=1,select='isnan(prev_selected_t)+gte(t-prev_selected_t,13.3333)'")
+        self.assertEqual(service._frame_filter(None), "fps=1")
+        self.assertEqual(service._sampling_output_args(), ["-vsync", "vfr", "-frames:v", "3"])
+
+    def test_zero_fps_bounds_are_unbounded(self):
+        service = self._service({"FRAME_SAMPLING": "scene", "SCENE_MIN_FPS": "0", "SCENE_MAX_FPS": "0"})
+        self.assertEqual(service._frame_filter(), "select='isnan(prev_selected_t)+gte(t-prev_selected_t,0)*(gt(scene,0.3))'")
+
+    def test_frame_times_from_showinfo(self):
+        stderr = b"[Parsed_showinfo_1 @ 0x5] n:   0 pts:      0 pts_time:0 pos: 48\n" \
+                 b"[Parsed_showinfo_1 @ 0x5] n:   1 pts:  90090 pts_time:7.007 pos: 9\n"
+        self.assertEqual(ffmpeg3.StageFFmpeg3Service._frame_times(stderr, 3), [0.0, 7.007, None])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,171 @@
+import os
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "base-image", "common")))
+
+os.environ.setdefault("ARTIFACT_BUCKET", "test-bucket")
+
+import bundle_helper
+import lifecycle_helper
+import storage_helper
+
+NOW = datetime(2026, 1, 2, tzinfo=timezone.utc)
+
+
+def _obj(key, size, hours_old):
+    return {"Key": key, "Size": size, "LastModified": NOW - timedelta(hours=hours_old)}
+
+
+class TestCollectGarbage(unittest.TestCase):
+    def setUp(self):
+        self.objects = [
+            _obj("requests/a/input/original.mp4", 1000, 1),
+            _obj("requests/a/stage-ffmpeg-0/media.tar.gz", 500, 1),
+            _obj("requests/a/metadata/state.json", 10, 500),
+            _obj("requests/b/stage-ffmpeg-1/clip_000.mp4", 200, 30),
+            _obj("requests/b/stage-ffmpeg-1/clip_001.mp4", 300, 1),
+        ]
+        self.statuses = {"a": "COMPLETED", "b": "RUNNING"}
+
+    def _run(self, **kwargs):
+        def fake_read_json(uri):
+            request_id = uri.split("/")[4]
+            return {"status": self.statuses[request_id]}
+
+        with patch.object(lifecycle_helper, "list_objects", return_value=iter(self.objects)), \
+             patch.object(lifecycle_helper, "object_exists", return_value=True), \
+             patch.object(lifecycle_helper, "read_json", side_effect=fake_read_json), \
+             patch.object(lifecycle_helper, "delete_objects", side_effect=lambda uris, batch_size: len(list(uris))) as mock_delete:
+            report = lifecycle_helper.collect_garbage(bucket="test-bucket", now=NOW, **kwargs)
+        return report, mock_delete
+
+    def test_dry_run_reports_without_deleting(self):
+        report, mock_delete = self._run()
+        mock_delete.assert_not_called()
+        # a: input + ffmpeg-0 expire on COMPLETED; b: only the 30h-old clip is past 24h
+        self.assertEqual(report["scanned_objects"], 5)
+        self.assertEqual(report["expired_objects"], 3)
+        self.assertEqual(report["reclaimed_bytes"], 1700)
+        self.assertEqual(report["by_prefix"]["stage-ffmpeg-1"], {"objects": 1, "bytes": 200})
+        self.assertNotIn("metadata", report["by_prefix"])
+
+    def test_execute_deletes_expired(self):
+        report, mock_delete = self._run(dry_run=False)
+        mock_delete.assert_called_once()
+        self.assertEqual(report["deleted_objects"], 3)
+
+
+class TestReferencedObjects(unittest.TestCase):
+    """A COMPLETED request, 30 hours on: ffmpeg-0/1/2 and the input expire, deepspeech (168 h) stays."""
+
+    def setUp(self):
+        base = "s3://test-bucket/requests/r"
+        self.store = {
+            f"{base}/input/original.mp4": b"input",
+            f"{base}/metadata/state.json": {"status": "COMPLETED"},
+            f"{base}/stage-ffmpeg-0/media.json": self._bundle(
+                {"audio.wav": f"{base}/stage-ffmpeg-0/media/audio.wav", "video.mp4": f"{base}/input/original.mp4"}
+            ),
+            f"{base}/stage-ffmpeg-0/media/audio.wav": b"audio",
+            f"{base}/stage-ffmpeg-1/clip_000.mp4": b"clip0",
+            f"{base}/stage-ffmpeg-1/clip_001.mp4": b"clip1",
+            f"{base}/stage-ffmpeg-2/clip_000.json": self._bundle(
+                {"clip.wav": f"{base}/stage-ffmpeg-2/clip_000/clip.wav", "clip.mp4": f"{base}/stage-ffmpeg-1/clip_000.mp4"}
+            ),
+            f"{base}/stage-ffmpeg-2/clip_000/clip.wav": b"wav0",
+            f"{base}/stage-deepspeech/clip_000.json": self._bundle(
+                {
+                    "transcript.txt": f"{base}/stage-deepspeech/clip_000/transcript.txt",
+                    "clip.mp4": f"{base}/stage-ffmpeg-1/clip_000.mp4",
+                }
+            ),
+            f"{base}/stage-deepspeech/clip_000/transcript.txt": b"hello",
+        }
+
+    @staticmethod
+    def _bundle(members):
+        return {"format": "fave-bundle/1", "members": {name: {"uri": uri} for name, uri in members.items()}, "metadata": {}}
+
+    def _listing(self, prefix, max_keys=None):
+        for uri in sorted(self.store):
+            key = uri[len("s3://test-bucket/"):]
+            size = len(self.store[uri]) if isinstance(self.store[uri], bytes) else 100
+            yield {"Key": key, "Size": size, "LastModified": NOW - timedelta(hours=30)}
+
+    def _delete(self, uris, batch_size):
+        deleted = 0
+        for uri in uris:
+            del self.store[uri]
+            deleted += 1
+        return deleted
+
+    def _read_json(self, uri):
+        return self.store[uri]
+
+    def test_completed_request_keeps_what_retained_bundles_reference(self):
+        with patch.object(lifecycle_helper, "list_objects", side_effect=self._listing), \
+             patch.object(lifecycle_helper, "object_exists", side_effect=lambda uri: uri in self.store), \
+             patch.object(lifecycle_helper, "read_json", side_effect=self._read_json), \
+             patch.object(lifecycle_helper, "delete_objects", side_effect=self._delete):
+            report = lifecycle_helper.collect_garbage(bucket="test-bucket", now=NOW, dry_run=False)
+
+        base = "s3://test-bucket/requests/r"
+        # Only the clip referenced by the retained transcript bundle survives from the expired prefixes.
+        self.assertEqual(report["kept_referenced"], 1)
+        self.assertIn(f"{base}/stage-ffmpeg-1/clip_000.mp4", self.store)
+        self.assertNotIn(f"{base}/stage-ffmpeg-1/clip_001.mp4", self.store)
+        self.assertNotIn(f"{base}/input/original.mp4", self.store)
+        self.assertNotIn(f"{base}/stage-ffmpeg-2/clip_000.json", self.store)
+
+        def fake_download(uri, dest):
+            if uri not in self.store:
+                raise FileNotFoundError(uri)
+            Path(dest).write_bytes(self.store[uri])
+            return Path(dest)
+
+        with tempfile.TemporaryDirectory() as tmp_dir, \
+             patch.object(bundle_helper, "read_json", side_effect=self._read_json), \
+             patch.object(bundle_helper, "download_file", side_effect=fake_download):
+            bundle = bundle_helper.read_bundle(f"{base}/stage-deepspeech/clip_000.json")
+            fetched = bundle_helper.fetch_members(bundle, bundle["members"], tmp_dir)
+            self.assertEqual(fetched["clip.mp4"].read_bytes(), b"clip0")
+            self.assertEqual(fetched["transcript.txt"].read_bytes(), b"hello")
+
+
+class TestCollectCacheGarbage(unittest.TestCase):
+    def test_expires_transcripts_by_age_only(self):
+        objects = [
+            _obj("cache/transcripts/old.json", 40, 800),
+            _obj("cache/transcripts/fresh.json", 50, 2),
+        ]
+        with patch.object(lifecycle_helper, "list_objects", return_value=iter(objects)) as mock_list, \
+             patch.object(lifecycle_helper, "read_json") as mock_read, \
+             patch.object(lifecycle_helper, "delete_objects", side_effect=lambda uris, batch_size: list(uris)) as mock_delete:
+            report = lifecycle_helper.collect_cache_garbage(bucket="test-bucket", dry_run=False, now=NOW)
+
+        mock_list.assert_called_once_with("s3://test-bucket/cache/transcripts/", max_keys=None)
+        mock_read.assert_not_called()
+        self.assertEqual(report["deleted_objects"], ["s3://test-bucket/cache/transcripts/old.json"])
+        self.assertEqual(report["by_prefix"], {"cache/transcripts/": {"objects": 1, "bytes": 40}})
+        self.assertEqual(report["scanned_objects"], 2)
+
+
+class TestDeleteObjects(unittest.TestCase):
+    def test_batches_per_bucket(self):
+        client = MagicMock()
+        client.delete_objects.return_value = {}
+        with patch.object(storage_helper, "_s3_client", return_value=client):
+            uris = [f"s3://bucket-a/k{i}" for i in range(5)] + ["s3://bucket-b/x"]
+            deleted = storage_helper.delete_objects(uris, batch_size=2)
+        self.assertEqual(deleted, 6)
+        # 5 keys in bucket-a at batch size 2 -> 3 calls, plus one for bucket-b
+        self.assertEqual(client.delete_objects.call_count, 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,32 @@
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "base-image", "common")))
+
+import metrics_helper
+
+
+class TestCpuLimit(unittest.TestCase):
+    def _limit(self, cpu_max):
+        with patch.dict(os.environ, {}, clear=False), \
+             patch.object(metrics_helper.os.path, "exists", return_value=True), \
+             patch.object(metrics_helper.Path, "read_text", return_value=cpu_max), \
+             patch.object(metrics_helper.os, "sched_getaffinity", return_value={0, 1, 2, 3}):
+            os.environ.pop("CPU_LIMIT", None)
+            return metrics_helper.get_cpu_limit()
+
+    def test_cgroup_quota(self):
+        self.assertEqual(self._limit("150000 100000\n"), 1.5)
+
+    def test_unlimited_quota_uses_affinity(self):
+        self.assertEqual(self._limit("max 100000\n"), 4.0)
+
+    def test_env_override(self):
+        with patch.dict(os.environ, {"CPU_LIMIT": "2"}):
+            self.assertEqual(metrics_helper.get_cpu_limit(), 2.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "functions", "stage-deepspeech")))
+
+from model_pool import ModelPool
+
+
+class TestModelPool(unittest.TestCase):
+    def test_model_loaded_once_and_reused(self):
+        loads = []
+        pool = ModelPool("model.pbmm", "model.scorer", size=1, loader=lambda m, s: loads.append((m, s)) or object())
+        with pool.acquire() as first:
+            pass
+        with pool.acquire() as second:
+            pass
+        self.assertIs(first, second)
+        self.assertEqual(loads, [("model.pbmm", "model.scorer")])
+
+    def test_concurrent_users_never_share_a_model(self):
+        pool = ModelPool("m", None, size=2, loader=lambda m, s: object())
+        in_use, clashes = set(), []
+        lock = threading.Lock()
+
+        def work():
+            for _ in range(20):
+                with pool.acquire() as model:
+                    with lock:
+                        if id(model) in in_use:
+                            clashes.append(model)
+                        in_use.add(id(model))
+                    time.sleep(0.001)
+                    with lock:
+                        in_use.discard(id(model))
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(clashes, [])
+        self.assertEqual(pool.created, 2)
+
+    def test_failed_load_frees_the_slot(self):
+        attempts = []
+
+        def flaky(model_path, scorer_path):
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise ImportError("deepspeech")
+            return object()
+
+        pool = ModelPool("m", None, size=1, loader=flaky)
+        with self.assertRaises(ImportError):
+            with pool.acquire():
+                pass
+        with pool.acquire() as model:
+            self.assertIsNotNone(model)
+        self.assertEqual(pool.created, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "base-image", "common")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "functions", "stage-object-detector")))
+
+import ort_session
+from ort_session import create_session, optimized_model_path, session_options
+
+
+class FakeInferenceSession:
+    created = []
+
+    def __init__(self, path, sess_options=None, providers=None):
+        self.path = path
+        self.options = sess_options
+        FakeInferenceSession.created.append(self)
+        if sess_options.optimized_model_filepath:
+            Path(sess_options.optimized_model_filepath).write_bytes(b"optimized")
+
+
+class TestSessionOptions(unittest.TestCase):
+    def test_threads_follow_cpu_quota(self):
+        options = session_options(cpu_limit=1.5)
+        self.assertEqual(options.intra_op_num_threads, 2)
+        self.assertEqual(options.inter_op_num_threads, 1)
+        self.assertEqual(options.execution_mode, ort_session.ort.ExecutionMode.ORT_SEQUENTIAL)
+        self.assertEqual(options.graph_optimization_level, ort_session.ort.GraphOptimizationLevel.ORT_ENABLE_ALL)
+
+    def test_cpu_limit_env(self):
+        with patch.dict(os.environ, {"CPU_LIMIT": "0.25"}):
+            self.assertEqual(session_options().intra_op_num_threads, 1)
+
+
+class TestOptimizedModelCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.model = Path(self.tmp.name) / "model.onnx"
+        self.model.write_bytes(b"fp32")
+        self.cache = Path(self.tmp.name) / "cache"
+        FakeInferenceSession.created = []
+
+    def test_first_session_writes_cache_and_later_ones_reuse_it(self):
+        with patch.object(ort_session.ort, "InferenceSession", FakeInferenceSession):
+            first = create_session(str(self.model), self.cache, cpu_limit=2)
+            second = create_session(str(self.model), self.cache, cpu_limit=2)
+
+        cached = optimized_model_path(str(self.model), self.cache)
+        self.assertEqual(cached.read_bytes(), b"optimized")
+        self.assertEqual(first.path, str(self.model))
+        self.assertEqual(second.path, str(cached))
+        self.assertEqual(
+            second.options.graph_optimization_level, ort_session.ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+        )
+        self.assertEqual([p.name for p in self.cache.iterdir()], [cached.name])
+
+    def test_read_only_cache_still_creates_session(self):
+        with patch.object(ort_session.ort, "InferenceSession", FakeInferenceSession), \
+             patch.object(ort_session.os, "access", return_value=False):
+            session = create_session(str(self.model), self.cache, cpu_limit=1)
+        self.assertEqual(session.path, str(self.model))
+        self.assertFalse(session.options.optimized_model_filepath)
+        self.assertEqual(list(self.cache.iterdir()), [])
+
+    def test_cpu_features_are_part_of_the_key(self):
+        with patch.object(ort_session, "cpu_features", return_value="avx,avx2"):
+            build_host = optimized_model_path(str(self.model), self.cache)
+        with patch.object(ort_session, "cpu_features", return_value="avx,avx2,avx512f"):
+            other_node = optimized_model_path(str(self.model), self.cache)
+        self.assertNotEqual(build_host, other_node)
+
+    def test_model_change_invalidates_cache(self):
+        before = optimized_model_path(str(self.model), self.cache)
+        self.model.write_bytes(b"fp32-retrained")
+        self.assertNotEqual(before, optimized_model_path(str(self.model), self.cache))
+
+
+if __name__ == "__main__":
+    unittest.main()
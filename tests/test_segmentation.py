@@ -0,0 +1,110 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "functions", "stage-librosa")))
+
+import librosa
+import soundfile as sf
+
+from segmentation import (
+    balanced_cuts,
+    count_intervals,
+    frame_power,
+    nonsilent_intervals,
+    power_to_db,
+    select_intervals,
+    stream_frame_power,
+)
+
+
+def synthetic_speech(seed=0, sr=22050, bursts=20):
+    """Alternating tone bursts and noise floors of random length and level."""
+    rng = np.random.default_rng(seed)
+    parts = []
+    for _ in range(bursts):
+        parts.append(rng.normal(0, 10 ** rng.uniform(-4, -1), int(sr * rng.uniform(0.2, 2))))
+        parts.append(0.3 * np.sin(np.arange(int(sr * rng.uniform(0.3, 3))) * 0.05))
+    return np.concatenate(parts).astype(np.float32)
+
+
+class TestSegmentation(unittest.TestCase):
+    def test_matches_librosa_split_for_every_threshold(self):
+        y = synthetic_speech()
+        db = power_to_db(frame_power(y))
+        counts = count_intervals(db, range(24, 50))
+        for idx, top_db in enumerate(range(24, 50)):
+            expected = librosa.effects.split(y, top_db=top_db)
+            np.testing.assert_array_equal(nonsilent_intervals(db, top_db, len(y)), expected)
+            self.assertEqual(counts[idx], len(expected))
+
+    def test_select_matches_threshold_loop(self):
+        y = synthetic_speech(seed=3)
+        duration = len(y) / 22050
+        min_clips, max_clips = max(1, duration / 30), max(1, duration / 0.1)
+
+        for top_db in range(24, 50):
+            expected = librosa.effects.split(y, top_db=top_db)
+            if min_clips <= len(expected) <= max_clips:
+                break
+
+        db = power_to_db(frame_power(y))
+        clips, chosen = select_intervals(db, len(y), min_clips, max_clips)
+        self.assertEqual(chosen, top_db)
+        np.testing.assert_array_equal(clips, expected)
+
+    def test_short_signal(self):
+        y = np.zeros(100, dtype=np.float32)
+        db = power_to_db(frame_power(y))
+        np.testing.assert_array_equal(nonsilent_intervals(db, 30, len(y)), librosa.effects.split(y, top_db=30))
+
+    def test_streamed_envelope_matches_in_memory(self):
+        y = synthetic_speech(seed=5)
+        stereo = np.stack([y, 0.5 * y], axis=1)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / "audio.wav"
+            sf.write(path, stereo, 22050, subtype="PCM_16")
+            # Odd block size so hop blocks straddle soundfile blocks.
+            power, sr, n_samples = stream_frame_power(path, block_size=3001)
+            loaded, _ = librosa.load(path, sr=None, mono=True)
+
+        self.assertEqual((sr, n_samples), (22050, len(loaded)))
+        np.testing.assert_allclose(power, frame_power(loaded), rtol=1e-5, atol=1e-12)
+        db = power_to_db(power)
+        np.testing.assert_array_equal(nonsilent_intervals(db, 30, n_samples), librosa.effects.split(loaded, top_db=30))
+
+
+class TestBalancedCuts(unittest.TestCase):
+    SR = 22050
+
+    def test_cuts_are_contiguous_and_even(self):
+        y = synthetic_speech(seed=7, bursts=40)
+        db = power_to_db(frame_power(y))
+        intervals = nonsilent_intervals(db, 30, len(y))
+        cuts = balanced_cuts(intervals, db, len(y), self.SR, target_len=8, min_len=0.1, max_len=30)
+
+        self.assertEqual((cuts[0], cuts[-1]), (0, len(y)))
+        lengths = np.diff(cuts) / self.SR
+        self.assertTrue(np.all(lengths > 0) and np.all(lengths <= 30))
+        self.assertLessEqual(lengths.max(), 2 * 8)
+        voiced = np.diff(intervals, axis=1).ravel()
+        self.assertLess(lengths.std() / lengths.mean(), voiced.std() / voiced.mean())
+        # Every interior cut lands in a silence gap, not inside a voiced interval.
+        for cut in cuts[1:-1]:
+            self.assertFalse(np.any((intervals[:, 0] < cut) & (cut < intervals[:, 1])))
+
+    def test_forces_cut_without_silence(self):
+        n = 70 * self.SR
+        y = (0.3 * np.sin(np.arange(n) * 0.05) * (1 + 0.1 * np.sin(np.arange(n) * 1e-4))).astype(np.float32)
+        db = power_to_db(frame_power(y))
+        cuts = balanced_cuts(np.array([[0, n]]), db, n, self.SR, target_len=40, min_len=0.1, max_len=30)
+        self.assertTrue(np.all(np.diff(cuts) <= 30 * self.SR))
+        self.assertEqual(len(cuts) - 1, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
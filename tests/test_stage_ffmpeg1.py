@@ -0,0 +1,128 @@
+import io
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "base-image", "common")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "functions", "stage-ffmpeg-1")))
+
+os.environ.setdefault("ARTIFACT_BUCKET", "test-bucket")
+
+import stage_ffmpeg1_service as ffmpeg1
+
+
+class TestCutModes(unittest.TestCase):
+    def setUp(self):
+        self.service = ffmpeg1.StageFFmpeg1Service()
+
+    def test_contiguity(self):
+        self.assertTrue(self.service._is_contiguous([("00:00:00", "00:00:04"), ("00:00:04", "00:00:09")]))
+        self.assertTrue(self.service._is_contiguous([("00:00:00.000", "00:00:04.250"), ("00:00:04.250", "00:01:02.5")]))
+        self.assertFalse(self.service._is_contiguous([("00:00:01", "00:00:04")]))
+        self.assertFalse(self.service._is_contiguous([("00:00:00", "00:00:04"), ("00:00:05", "00:00:09")]))
+
+    SPANS = [("00:00:00.000", "00:00:04.250"), ("00:00:04.250", "00:00:09.000"), ("00:00:09.000", "00:01:00.000")]
+
+    @staticmethod
+    def _fake_popen(produced, returncode=0, stderr=b""):
+        def fake_popen(cmd, **kwargs):
+            kwargs["stderr"].write(stderr)
+            kwargs["stderr"].flush()
+            pattern = cmd[-1]
+            for idx in range(produced):
+                Path(pattern % idx).write_bytes(b"mp4")
+            proc = MagicMock(returncode=returncode)
+            proc.__enter__.return_value = proc
+            proc.stdout = io.StringIO("".join(f"{pattern % idx},0.0,1.0\n" for idx in range(produced)))
+            return proc
+
+        return fake_popen
+
+    def test_per_clip_is_default(self):
+        self.assertEqual(self.service.cut_mode, "per_clip")
+
+    def test_segment_mode_runs_ffmpeg_once(self):
+        spans = self.SPANS
+        with tempfile.TemporaryDirectory() as tmp_dir, \
+             patch.object(ffmpeg1.subprocess, "Popen", side_effect=self._fake_popen(len(spans))) as popen:
+            clips = list(self.service._cut_segments("/tmp/video.mp4", spans, Path(tmp_dir)))
+
+        popen.assert_called_once()
+        cmd = popen.call_args.args[0]
+        self.assertEqual(cmd[cmd.index("-segment_times") + 1], "4.250,9.000")
+        self.assertEqual(cmd[cmd.index("-to") + 1], "00:01:00.000")
+        self.assertEqual(cmd[cmd.index("-segment_list") + 1], "pipe:1")
+        self.assertEqual([c.name for c in clips], ["clip_000.mp4", "clip_001.mp4", "clip_002.mp4"])
+
+    def test_segment_failure_keeps_ffmpeg_stderr(self):
+        with tempfile.TemporaryDirectory() as tmp_dir, \
+             patch.object(ffmpeg1.subprocess, "Popen", side_effect=self._fake_popen(0, 1, b"moov atom not found\n")):
+            with self.assertRaises(ffmpeg1.subprocess.CalledProcessError) as ctx:
+                list(self.service._cut_segments("/tmp/video.mp4", self.SPANS, Path(tmp_dir)))
+        self.assertIn("moov atom not found", ctx.exception.stderr)
+
+    def test_collapsed_segments_fall_back_to_per_clip(self):
+        # Two cut points inside one GOP: the muxer writes 2 clips for 3 lines.
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            bundle_dir = Path(tmp_dir)
+            (bundle_dir / "timestamps.txt").write_text("".join(f"{a} {b}\n" for a, b in self.SPANS))
+            per_clip_cmds, uploads = [], {}
+
+            def fake_run(cmd, **_kwargs):
+                per_clip_cmds.append(cmd)
+                Path(cmd[-1]).write_bytes(b"mp4")
+
+            def fake_upload(path, uri, extra_args=None):
+                uploads[uri] = path.name
+                return uri
+
+            payload = ffmpeg1.StagePayload(request_id="r1", stage="stage-ffmpeg-1", input_uri="s3://b/segments.json")
+            with patch.dict(os.environ, {"CUT_MODE": "segment"}):
+                service = ffmpeg1.StageFFmpeg1Service()
+            with patch.object(ffmpeg1, "read_bundle", return_value={"members": {"video.mp4": {"uri": "s3://b/v.mp4"}}}), \
+                 patch.object(ffmpeg1, "fetch_members", return_value={"timestamps.txt": bundle_dir / "timestamps.txt"}), \
+                 patch.object(ffmpeg1, "media_source", return_value="/tmp/video.mp4"), \
+                 patch.object(ffmpeg1.subprocess, "Popen", side_effect=self._fake_popen(2)), \
+                 patch.object(ffmpeg1.subprocess, "run", side_effect=fake_run), \
+                 patch.object(ffmpeg1, "upload_file", side_effect=fake_upload):
+                outputs = service._process(payload)
+
+        self.assertEqual(len(per_clip_cmds), 3)
+        self.assertEqual(per_clip_cmds[1][per_clip_cmds[1].index("-ss") + 1], "00:00:04.250")
+        self.assertEqual([o.metadata["clip_index"] for o in outputs], [0, 1, 2])
+        self.assertEqual(outputs[2].uri, "s3://test-bucket/requests/r1/stage-ffmpeg-1/clip_002.mp4")
+
+    def test_uploads_overlap_with_cutting(self):
+        uploaded = []
+        first_upload_done = threading.Event()
+
+        def fake_upload(path, uri, extra_args=None):
+            uploaded.append(uri)
+            first_upload_done.set()
+            return uri
+
+        def cutter(tmp_path):
+            for idx in range(5):
+                clip = tmp_path / f"clip_{idx:03d}.mp4"
+                clip.write_bytes(b"mp4")
+                if idx == 1:
+                    # The first clip is uploaded while later ones are still being cut.
+                    self.assertTrue(first_upload_done.wait(5))
+                yield clip
+
+        payload = ffmpeg1.StagePayload(request_id="r1", stage="stage-ffmpeg-1", input_uri="s3://b/segments.json")
+        with tempfile.TemporaryDirectory() as tmp_dir, patch.object(ffmpeg1, "upload_file", side_effect=fake_upload):
+            outputs = self.service._upload_clips(cutter(Path(tmp_dir)), payload)
+            self.assertEqual(list(Path(tmp_dir).glob("clip_*.mp4")), [])
+
+        self.assertEqual([o.metadata["clip_index"] for o in outputs], list(range(5)))
+        self.assertEqual(outputs[3].uri, "s3://test-bucket/requests/r1/stage-ffmpeg-1/clip_003.mp4")
+        self.assertEqual(len(uploaded), 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
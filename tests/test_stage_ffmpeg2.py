@@ -0,0 +1,109 @@
+import json
+import os
+import sys
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "base-image", "common")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "functions", "stage-ffmpeg-2")))
+
+os.environ.setdefault("ARTIFACT_BUCKET", "test-bucket")
+
+import stage_ffmpeg2_service as ffmpeg2
+
+
+def fake_run_factory(probe_info, calls):
+    def fake_run(cmd, **_kwargs):
+        calls.append(cmd)
+        if cmd[0] == "ffprobe":
+            return SimpleNamespace(stdout=json.dumps(probe_info).encode())
+        return SimpleNamespace(stdout=b"")
+
+    return fake_run
+
+
+class TestFusedTranscode(unittest.TestCase):
+    def _process(self, probe_info, config=None):
+        calls, bundles = [], []
+
+        def fake_write_bundle(uri, files=None, references=None, metadata=None):
+            bundles.append({"files": sorted(files), "references": references})
+            return uri
+
+        payload = ffmpeg2.StagePayload(
+            request_id="r1",
+            stage="stage-ffmpeg-2",
+            input_uri="s3://b/requests/r1/stage-ffmpeg-1/clip_000.mp4",
+            config=config or {},
+        )
+        with patch.object(ffmpeg2.subprocess, "run", side_effect=fake_run_factory(probe_info, calls)), \
+             patch.object(ffmpeg2, "media_source", side_effect=lambda uri, dest, stream: str(dest)), \
+             patch.object(ffmpeg2, "write_bundle", side_effect=fake_write_bundle):
+            ffmpeg2.StageFFmpeg2Service()._process(payload)
+        return [c for c in calls if c[0] == "ffmpeg"], bundles[0]
+
+    def test_single_ffmpeg_run_with_audio(self):
+        runs, bundle = self._process(
+            {"streams": [{"codec_type": "video"}, {"codec_type": "audio"}], "format": {"duration": "4.2"}},
+            config={"profile": "archival"},
+        )
+        self.assertEqual(len(runs), 1)
+        cmd = runs[0]
+        self.assertNotIn("anullsrc=r=16000:cl=mono", cmd)
+        self.assertEqual(cmd[-1].split("/")[-1], "clip.wav")
+        self.assertIn("0:a:0", cmd[cmd.index("libx264"):])
+        self.assertEqual(bundle["files"], ["clip.wav", "clip_compressed.mp4"])
+        self.assertEqual(bundle["references"], {})
+
+    def test_silent_clip_gets_inline_silence(self):
+        runs, _ = self._process({"streams": [{"codec_type": "video"}], "format": {"duration": "4.2"}}, config={"profile": "archival"})
+        self.assertEqual(len(runs), 1)
+        cmd = runs[0]
+        self.assertEqual(cmd[cmd.index("anullsrc=r=16000:cl=mono") - 2], "4.200")
+        wav_map = len(cmd) - 1 - cmd[::-1].index("-map")
+        self.assertEqual(cmd[wav_map + 1], "1:a:0")
+
+    def test_source_clip_reference_on_request(self):
+        _, bundle = self._process(
+            {"streams": [{"codec_type": "audio"}]}, config={"profile": "archival", "include_source_clip": True}
+        )
+        self.assertEqual(bundle["references"], {"clip.mp4": "s3://b/requests/r1/stage-ffmpeg-1/clip_000.mp4"})
+
+    def test_audio_only_unless_profile_encodes(self):
+        for profile in ("fast", "balanced", "default"):
+            runs, bundle = self._process({"streams": [{"codec_type": "audio"}]}, config={"profile": profile})
+            self.assertEqual(len(runs), 1)
+            self.assertNotIn("libx264", runs[0])
+            self.assertEqual(bundle["files"], ["clip.wav"])
+            # Frame sampling reads the clip stage-ffmpeg-1 already wrote.
+            self.assertEqual(bundle["references"], {"clip.mp4": "s3://b/requests/r1/stage-ffmpeg-1/clip_000.mp4"})
+
+
+class TestEncodingProfiles(unittest.TestCase):
+    def test_unknown_profile_falls_back_to_balanced(self):
+        self.assertEqual(ffmpeg2.StageFFmpeg2Service.resolve_profile("cold")[0], "balanced")
+        self.assertEqual(ffmpeg2.StageFFmpeg2Service.resolve_profile(None)[0], "balanced")
+
+    def test_encode_args(self):
+        with patch.dict(os.environ, {"CPU_LIMIT": "1.5"}):
+            service = ffmpeg2.StageFFmpeg2Service()
+        archival = service._video_encode_args(ffmpeg2.ENCODING_PROFILES["archival"])
+        self.assertEqual(archival, ["-vcodec", "libx264", "-preset", "slow", "-crf", "23", "-threads", "2"])
+        capped = service._video_encode_args({"encode_video": True, "preset": "veryfast", "crf": 32, "max_height": 360})
+        self.assertEqual(capped[capped.index("-vf") + 1], "scale=-2:'min(360,ih)'")
+
+    def test_audio_only_profiles_carry_no_encoder_settings(self):
+        for profile in ffmpeg2.ENCODING_PROFILES.values():
+            if not profile["encode_video"]:
+                self.assertEqual(profile, {"encode_video": False})
+
+    def test_profile_reaches_ffmpeg(self):
+        runs, _ = TestFusedTranscode()._process({"streams": [{"codec_type": "audio"}]}, config={"profile": "archival"})
+        cmd = runs[0]
+        self.assertEqual(cmd[cmd.index("-preset") + 1], "slow")
+        self.assertEqual(cmd[cmd.index("-crf") + 1], "23")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+import io
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock, patch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "base-image", "common")))
+
+os.environ.setdefault("ARTIFACT_BUCKET", "test-bucket")
+
+import storage_helper
+
+
+class TestCopyObject(unittest.TestCase):
+    def _client(self):
+        client = MagicMock()
+        client.create_multipart_upload.return_value = {"UploadId": "up-1"}
+        client.upload_part.side_effect = lambda **kw: {"ETag": f"etag-{kw['PartNumber']}"}
+        client.upload_part_copy.side_effect = lambda **kw: {"CopyPartResult": {"ETag": f"etag-{kw['PartNumber']}"}}
+        return client
+
+    def test_small_object_uses_single_server_side_copy(self):
+        client = self._client()
+        client.head_object.return_value = {"ContentLength": 10}
+        with patch.object(storage_helper, "_s3_client", return_value=client):
+            storage_helper.copy_object("s3://src/a.mp4", "s3://dst/b.mp4", part_size=100)
+        client.copy_object.assert_called_once()
+        client.create_multipart_upload.assert_not_called()
+
+    def test_large_object_uses_upload_part_copy(self):
+        client = self._client()
+        client.head_object.return_value = {"ContentLength": 250, "ContentType": "video/mp4"}
+        with patch.object(storage_helper, "_s3_client", return_value=client):
+            storage_helper.copy_object("s3://src/a.mp4", "s3://dst/b.mp4", part_size=100)
+        ranges = sorted(c.kwargs["CopySourceRange"] for c in client.upload_part_copy.call_args_list)
+        self.assertEqual(ranges, ["bytes=0-99", "bytes=100-199", "bytes=200-249"])
+        parts = client.complete_multipart_upload.call_args.kwargs["MultipartUpload"]["Parts"]
+        self.assertEqual([p["PartNumber"] for p in parts], [1, 2, 3])
+
+    def test_fallback_streams_into_multipart_upload(self):
+        client = self._client()
+        client.head_object.side_effect = storage_helper.ClientError(
+            {"Error": {"Code": "AccessDenied"}, "ResponseMetadata": {"HTTPStatusCode": 403}}, "HeadObject"
+        )
+        payload = bytes(range(256)) * 2
+        client.get_object.return_value = {"Body": io.BytesIO(payload), "ContentType": "video/mp4"}
+        with patch.object(storage_helper, "_s3_client", return_value=client):
+            storage_helper.copy_object("s3://src/a.mp4", "s3://dst/b.mp4", part_size=200)
+
+        uploaded = b"".join(
+            c.kwargs["Body"] for c in sorted(client.upload_part.call_args_list, key=lambda c: c.kwargs["PartNumber"])
+        )
+        self.assertEqual(uploaded, payload)
+        self.assertEqual(client.upload_part.call_count, 3)
+        client.complete_multipart_upload.assert_called_once()
+        client.abort_multipart_upload.assert_not_called()
+
+    def test_cross_endpoint_skips_server_side_copy(self):
+        dst_client = self._client()
+        src_client = MagicMock()
+        src_client.get_object.return_value = {"Body": io.BytesIO(b"tiny"), "ContentType": "video/mp4"}
+
+        with patch.object(storage_helper, "_s3_client", return_value=dst_client), \
+             patch.object(storage_helper, "_source_client", return_value=src_client) as source_client:
+            storage_helper.copy_object("s3://src/a.mp4", "s3://dst/b.mp4", source_endpoint="http://other:9000")
+        source_client.assert_called_once_with("http://other:9000")
+        dst_client.head_object.assert_not_called()
+        dst_client.put_object.assert_called_once()
+        self.assertEqual(dst_client.put_object.call_args.kwargs["Body"], b"tiny")
+
+
+class TestSourceEndpoints(unittest.TestCase):
+    ENV = {
+        "SOURCE_ENDPOINTS": "partner=https://S3.Partner.example/, archive=http://archive:9000",
+        "SOURCE_PARTNER_ACCESS_KEY": "partner-key",
+        "SOURCE_PARTNER_SECRET_KEY": "partner-secret",
+        "ARTIFACT_ACCESS_KEY": "our-key",
+        "ARTIFACT_SECRET_KEY": "our-secret",
+    }
+
+    def setUp(self):
+        storage_helper._source_client.cache_clear()
+        self.addCleanup(storage_helper._source_client.cache_clear)
+
+    def test_allow_listed_endpoint_uses_its_own_credentials(self):
+        with patch.dict(os.environ, self.ENV), patch.object(storage_helper.boto3.session, "Session") as session:
+            storage_helper._source_client("https://s3.partner.example")
+        kwargs = session.return_value.client.call_args.kwargs
+        self.assertEqual(kwargs["endpoint_url"], "https://s3.partner.example")
+        self.assertEqual((kwargs["aws_access_key_id"], kwargs["aws_secret_access_key"]), ("partner-key", "partner-secret"))
+
+    def test_unlisted_endpoint_is_rejected_before_any_request(self):
+        with patch.dict(os.environ, self.ENV), \
+             patch.object(storage_helper.boto3.session, "Session") as session, \
+             patch.object(storage_helper, "_s3_client") as artifact_client:
+            with self.assertRaisesRegex(ValueError, "not in SOURCE_ENDPOINTS"):
+                storage_helper.copy_object("s3://src/a.mp4", "s3://dst/b.mp4", source_endpoint="https://attacker.example")
+        session.assert_not_called()
+        artifact_client.assert_not_called()
+
+    def test_listed_endpoint_without_credentials_is_rejected(self):
+        with patch.dict(os.environ, self.ENV), patch.object(storage_helper.boto3.session, "Session") as session:
+            with self.assertRaisesRegex(ValueError, "SOURCE_ARCHIVE_ACCESS_KEY"):
+                storage_helper._source_client("http://archive:9000")
+        session.assert_not_called()
+
+
+class TestMediaInputs(unittest.TestCase):
+    def test_http_sources_get_reconnect_options(self):
+        self.assertEqual(storage_helper.ffmpeg_input_args("/tmp/a.mp4"), ["-i", "/tmp/a.mp4"])
+        args = storage_helper.ffmpeg_input_args("https://minio/a.mp4?sig=1")
+        self.assertEqual(args[:-2], storage_helper.HTTP_INPUT_ARGS)
+        self.assertEqual(args[-2:], ["-i", "https://minio/a.mp4?sig=1"])
+
+    def test_media_source_streams_or_downloads(self):
+        with patch.object(storage_helper, "presigned_url", return_value="https://minio/a.mp4") as presign, \
+             patch.object(storage_helper, "download_file", side_effect=lambda uri, dest: dest) as download:
+            self.assertEqual(storage_helper.media_source("s3://b/a.mp4", "/tmp/a.mp4", True), "https://minio/a.mp4")
+            self.assertEqual(storage_helper.media_source("s3://b/a.mp4", "/tmp/a.mp4", False), "/tmp/a.mp4")
+        presign.assert_called_once_with("s3://b/a.mp4")
+        download.assert_called_once_with("s3://b/a.mp4", "/tmp/a.mp4")
+
+    def test_stream_inputs_env(self):
+        with patch.dict(os.environ, {"STREAM_INPUTS": "Yes"}):
+            self.assertTrue(storage_helper.stream_inputs_enabled())
+        with patch.dict(os.environ, {"STREAM_INPUTS": "false"}):
+            self.assertFalse(storage_helper.stream_inputs_enabled())
+
+
+if __name__ == "__main__":
+    unittest.main()
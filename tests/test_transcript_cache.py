@@ -0,0 +1,81 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "base-image", "common")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "functions", "stage-deepspeech")))
+
+os.environ.setdefault("ARTIFACT_BUCKET", "test-bucket")
+
+import stage_deepspeech_service as deepspeech
+import transcript_cache
+from model_pool import ModelPool
+from test_transcription import write_wav
+
+
+class CountingModel:
+    calls = 0
+
+    def stt(self, audio):
+        CountingModel.calls += 1
+        return "hello world"
+
+
+class TestTranscriptCache(unittest.TestCase):
+    def setUp(self):
+        self.store = {}
+        self.patches = [
+            patch.object(transcript_cache, "read_json", side_effect=lambda uri: self.store[uri]),
+            patch.object(transcript_cache, "write_json", side_effect=lambda data, uri: self.store.__setitem__(uri, data)),
+        ]
+        for p in self.patches:
+            p.start()
+        CountingModel.calls = 0
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+
+    def test_key_depends_on_audio_and_model(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            model = Path(tmp_dir) / "model.pbmm"
+            model.write_bytes(b"v1")
+            cache = transcript_cache.TranscriptCache("b", str(model), None)
+            audio = np.arange(100, dtype=np.int16)
+            self.assertEqual(cache.key(audio), cache.key(audio.copy()))
+            self.assertNotEqual(cache.key(audio), cache.key(audio[::-1]))
+            model.write_bytes(b"model v2")
+            self.assertNotEqual(cache.key(audio), transcript_cache.TranscriptCache("b", str(model), None).key(audio))
+
+    def test_lru_is_bounded_and_falls_back_to_store(self):
+        cache = transcript_cache.TranscriptCache("b", "m", None, max_entries=2)
+        for idx in range(3):
+            cache.put(f"k{idx}", f"text {idx}")
+        self.assertEqual(list(cache._entries), ["k1", "k2"])
+        self.assertEqual(cache.get("k0"), "text 0")
+        self.assertIn("s3://b/cache/transcripts/k0.json", self.store)
+        self.assertIsNone(cache.get("missing"))
+
+    def test_hit_skips_inference_and_writes_same_transcript(self):
+        service = deepspeech.StageDeepSpeechService()
+        service.model_pool = ModelPool("m", None, size=1, loader=lambda m, s: CountingModel())
+        audio = (np.random.default_rng(0).normal(0, 1000, 16000)).astype(np.int16)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            wav = Path(tmp_dir) / "clip.wav"
+            write_wav(wav, audio)
+            first, second = Path(tmp_dir) / "a.txt", Path(tmp_dir) / "b.txt"
+            service._run_deepspeech(wav, first)
+            service.transcript_cache._entries.clear()
+            service._run_deepspeech(wav, second)
+            self.assertEqual(first.read_text(), "hello world\n")
+            self.assertEqual(second.read_text(), first.read_text())
+        self.assertEqual(CountingModel.calls, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
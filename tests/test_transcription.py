@@ -0,0 +1,87 @@
+import os
+import struct
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "functions", "stage-deepspeech")))
+
+from model_pool import ModelPool
+from transcription import ChunkWorkers, chunk_bounds, open_pcm16, transcribe
+
+SR = 16000
+
+
+def write_wav(path, samples, extra_chunk=b""):
+    data = samples.astype("<i2").tobytes()
+    fmt = struct.pack("<4sIHHIIHH", b"fmt ", 16, 1, 1, SR, SR * 2, 2, 16)
+    body = b"WAVE" + fmt + extra_chunk + struct.pack("<4sI", b"data", len(data)) + data
+    path.write_bytes(struct.pack("<4sI", b"RIFF", len(body)) + body)
+
+
+class FakeModel:
+    def stt(self, audio):
+        # Later chunks finish first, so ordering has to come from the caller.
+        time.sleep(0.001 * (50 - len(audio) % 50))
+        return f"w{int(audio[0])}"
+
+
+def fake_loader(_model_path, _scorer_path):
+    return FakeModel()
+
+
+class TestTranscription(unittest.TestCase):
+    def test_memmap_skips_unknown_chunks(self):
+        samples = (np.arange(1000) - 500).astype(np.int16)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / "clip.wav"
+            write_wav(path, samples, extra_chunk=struct.pack("<4sI", b"LIST", 5) + b"abcde\x00")
+            audio, rate, channels = open_pcm16(path)
+            self.assertIsInstance(audio, np.memmap)
+            np.testing.assert_array_equal(audio, samples)
+            self.assertEqual((rate, channels), (SR, 1))
+            del audio
+
+    def test_cuts_land_in_quiet_gaps(self):
+        rng = np.random.default_rng(0)
+        loud = lambda s: rng.normal(0, 3000, int(s * SR))  # noqa: E731
+        quiet = lambda s: rng.normal(0, 5, int(s * SR))  # noqa: E731
+        audio = np.concatenate([loud(9), quiet(0.3), loud(10), quiet(0.3), loud(9)]).astype(np.int16)
+        bounds = chunk_bounds(audio, SR, chunk_seconds=10)
+        self.assertEqual(len(bounds), 3)
+        self.assertEqual((bounds[0][0], bounds[-1][1]), (0, len(audio)))
+        for (_, end), gap_start in zip(bounds[:-1], (9.0, 19.3)):
+            self.assertTrue(gap_start * SR <= end <= (gap_start + 0.3) * SR)
+
+    def test_short_clip_is_one_chunk(self):
+        self.assertEqual(chunk_bounds(np.zeros(SR * 5, dtype=np.int16), SR, chunk_seconds=10), [(0, SR * 5)])
+        self.assertEqual(chunk_bounds(np.zeros(SR * 50, dtype=np.int16), SR, chunk_seconds=0), [(0, SR * 50)])
+
+    def test_worker_processes_keep_order(self):
+        audio = np.repeat(np.arange(8, dtype=np.int16), 1000 + np.arange(8))
+        starts = np.concatenate(([0], np.cumsum(1000 + np.arange(8))))
+        bounds = [(int(a), int(b)) for a, b in zip(starts[:-1], starts[1:])]
+        pool = ModelPool("m", None, size=1, loader=fake_loader)
+        workers = ChunkWorkers("m", None, workers=3, loader=fake_loader)
+        self.addCleanup(workers.shutdown)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / "clip.wav"
+            write_wav(path, audio)
+            text = transcribe(path, audio, bounds, pool, workers)
+        self.assertEqual(text, " ".join(f"w{i}" for i in range(8)))
+        # Chunks ran in the workers; the in-process pool never loaded a model.
+        self.assertEqual(pool.created, 0)
+
+    def test_single_chunk_stays_in_process(self):
+        audio = np.full(500, 3, dtype=np.int16)
+        pool = ModelPool("m", None, size=1, loader=fake_loader)
+        self.assertEqual(transcribe("unused.wav", audio, [(0, 500)], pool, workers=None), "w3")
+        self.assertEqual(pool.created, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
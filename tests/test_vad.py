@@ -0,0 +1,90 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+import soundfile as sf
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "base-image", "common")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "functions", "stage-librosa")))
+
+os.environ.setdefault("ARTIFACT_BUCKET", "test-bucket")
+
+import stage_librosa_service as librosa_stage
+
+from vad import VAD_SAMPLE_RATE, load_pcm16, merge_regions, speech_intervals
+
+SR = VAD_SAMPLE_RATE
+
+
+def voiced(seconds, sr=SR):
+    t = np.arange(int(seconds * sr)) / sr
+    phase = 2 * np.pi * 140 * t
+    return 0.1 * sum(np.sin(k * phase) / k for k in range(1, 12)) * (0.6 + 0.4 * np.sin(2 * np.pi * 4 * t))
+
+
+class TestMergeRegions(unittest.TestCase):
+    def test_merges_close_regions_and_drops_short_ones(self):
+        regions = np.array([[0, SR], [SR + 1600, 2 * SR], [4 * SR, 4 * SR + 800]])
+        clips = merge_regions(regions, 10 * SR, SR, min_len=0.1, max_len=30, merge_gap=0.3)
+        np.testing.assert_array_equal(clips, [[0, 2 * SR]])
+
+    def test_does_not_merge_past_max_len(self):
+        regions = np.array([[0, 2 * SR], [2 * SR + 100, 4 * SR]])
+        clips = merge_regions(regions, 10 * SR, SR, min_len=0.1, max_len=3, merge_gap=0.3)
+        self.assertEqual(len(clips), 2)
+
+    def test_splits_long_regions(self):
+        clips = merge_regions(np.array([[0, 70 * SR]]), 70 * SR, SR, min_len=0.1, max_len=30)
+        self.assertEqual(len(clips), 3)
+        self.assertTrue(np.all(np.diff(clips, axis=1) <= 30 * SR))
+        self.assertEqual((clips[0, 0], clips[-1, 1]), (0, 70 * SR))
+
+
+class TestSpeechIntervals(unittest.TestCase):
+    def test_separates_speech_from_silence(self):
+        rng = np.random.default_rng(0)
+        quiet = lambda s: rng.normal(0, 1e-4, int(s * SR))  # noqa: E731
+        audio = np.concatenate([quiet(1), voiced(2), quiet(1.5), voiced(3), quiet(1)])
+        pcm = (audio * 32767).astype(np.int16)
+        clips, _ = speech_intervals(pcm, min_len=0.1, max_len=30)
+        self.assertEqual(len(clips), 2)
+        starts = clips[:, 0] / SR
+        np.testing.assert_allclose(starts, [1.0, 4.5], atol=0.2)
+
+    def test_load_pcm16_resamples_stereo(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / "audio.wav"
+            tone = voiced(1, 22050)
+            sf.write(path, np.stack([tone, tone], axis=1), 22050, subtype="PCM_16")
+            pcm = load_pcm16(path)
+        self.assertEqual(pcm.dtype, np.int16)
+        self.assertEqual(len(pcm), SR)
+
+
+class TestVadBackend(unittest.TestCase):
+    def _clips(self, target):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / "audio.wav"
+            sf.write(path, np.concatenate([np.zeros(SR), voiced(2.0), np.zeros(SR)]), SR, subtype="PCM_16")
+            with patch.dict(os.environ, {"CLIP_TARGET_SECONDS": str(target)}):
+                service = librosa_stage.StageLibrosaService()
+            with patch.object(librosa_stage, "frame_power", wraps=librosa_stage.frame_power) as power:
+                result = service._vad_clips(path, 0.1, 30)
+        return result, power.call_count
+
+    def test_envelope_only_computed_for_balanced_cuts(self):
+        (clips, db, _, _), calls = self._clips(0)
+        self.assertEqual(len(clips), 1)
+        self.assertIsNone(db)
+        self.assertEqual(calls, 0)
+        (_, db, _, _), calls = self._clips(10)
+        self.assertIsNotNone(db)
+        self.assertEqual(calls, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
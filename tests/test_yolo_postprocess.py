@@ -0,0 +1,93 @@
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "functions", "stage-object-detector")))
+
+from yolo_postprocess import box_iou, decode_head, fast_nms, postprocess
+
+LABELS = ["person", "bicycle", "car"]
+
+
+def _logit(p):
+    return float(np.log(p / (1 - p)))
+
+
+class TestDecode(unittest.TestCase):
+    def test_raw_nchw_head(self):
+        # One 13x13 head at 416 input (stride 32), 3 anchors x (5 + 3 classes).
+        head = np.full((1, 3, 13, 13, 8), -20.0, dtype=np.float32)
+        head[0, 1, 6, 4, 0:2] = 0.0  # centre of cell (x=4, y=6)
+        head[0, 1, 6, 4, 2:4] = 0.0  # anchor size (135, 169)
+        head[0, 1, 6, 4, 4] = _logit(0.9)
+        head[0, 1, 6, 4, 5 + 2] = _logit(0.8)
+        nchw = head.transpose(0, 1, 4, 2, 3).reshape(1, 24, 13, 13)
+
+        boxes, scores = decode_head(nchw, 416)
+        self.assertEqual(boxes.shape, (1, 13 * 13 * 3, 4))
+        best = int(scores[0].max(axis=1).argmax())
+        self.assertAlmostEqual(float(scores[0, best, 2]), 0.72, places=4)
+        cx, cy = 4.5 * 32, 6.5 * 32
+        expected = np.array([cx - 67.5, cy - 84.5, cx + 67.5, cy + 84.5]) / 416
+        np.testing.assert_allclose(boxes[0, best], expected, atol=1e-5)
+
+    def test_zoo_layout_scores_are_used_as_is(self):
+        head = np.zeros((1, 26, 26, 3, 8), dtype=np.float32)
+        head[0, 0, 0, 0, 4] = 0.5
+        head[0, 0, 0, 0, 5] = 0.5
+        _, scores = decode_head(head, 416)
+        self.assertAlmostEqual(float(scores.max()), 0.25)
+
+
+class TestNms(unittest.TestCase):
+    def test_iou(self):
+        a = np.array([[0, 0, 2, 2], [0, 0, 2, 2]], dtype=np.float32)
+        b = np.array([[1, 1, 3, 3], [5, 5, 6, 6]], dtype=np.float32)
+        iou = box_iou(a, b)
+        self.assertAlmostEqual(float(iou[0]), 1 / 7, places=5)
+        self.assertEqual(float(iou[1]), 0.0)
+
+    def test_overlaps_suppressed_only_within_class(self):
+        boxes = np.array([[0, 0, 1, 1], [0.05, 0, 1, 1], [0, 0, 1, 1], [2, 2, 3, 3]], dtype=np.float32)
+        scores = np.array([0.9, 0.8, 0.7, 0.6], dtype=np.float32)
+        class_ids = np.array([0, 0, 1, 0])
+        self.assertEqual(fast_nms(boxes, scores, class_ids, 0.5).tolist(), [0, 2, 3])
+
+    def test_matches_reference_fast_nms(self):
+        rng = np.random.default_rng(1)
+        boxes = rng.random((200, 4)).astype(np.float32)
+        boxes[:, 2:] = boxes[:, :2] + rng.random((200, 2)) * 0.3
+        scores = rng.random(200).astype(np.float32)
+        class_ids = rng.integers(0, 3, 200)
+        expected = []
+        order = np.argsort(-scores)
+        for pos, j in enumerate(order):
+            earlier = order[:pos][class_ids[order[:pos]] == class_ids[j]]
+            ious = box_iou(boxes[earlier], np.repeat(boxes[j:j + 1], len(earlier), axis=0))
+            if not (ious > 0.45).any():
+                expected.append(j)
+        self.assertEqual(fast_nms(boxes, scores, class_ids, 0.45).tolist(), expected)
+
+
+class TestPostprocess(unittest.TestCase):
+    def test_boxes_confs_layout(self):
+        boxes = np.array([[[[0.1, 0.1, 0.4, 0.4]], [[0.11, 0.1, 0.4, 0.41]], [[0.6, 0.6, 1.2, 0.9]]]], dtype=np.float32)
+        confs = np.zeros((1, 3, 3), dtype=np.float32)
+        confs[0, 0, 0] = 0.9
+        confs[0, 1, 0] = 0.6
+        confs[0, 2, 2] = 0.3
+        (detections,) = postprocess([boxes, confs], 416, labels=LABELS)
+        self.assertEqual([d["label"] for d in detections], ["person", "car"])
+        self.assertEqual(detections[1]["box"], [0.6, 0.6, 1.0, 0.9])
+
+    def test_confidence_filter_and_batch(self):
+        boxes = np.tile(np.array([0.1, 0.1, 0.2, 0.2], dtype=np.float32), (2, 1, 1, 1))
+        confs = np.array([[[0.9, 0, 0]], [[0.1, 0, 0]]], dtype=np.float32)
+        results = postprocess([boxes, confs], 416, labels=LABELS, conf_threshold=0.25)
+        self.assertEqual([len(r) for r in results], [1, 0])
+
+
+if __name__ == "__main__":
+    unittest.main()